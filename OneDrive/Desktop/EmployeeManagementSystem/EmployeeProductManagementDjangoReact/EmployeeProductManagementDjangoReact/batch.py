@@ -0,0 +1,165 @@
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction
+
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from accounts.access import AccessContext
+from .db_routers import read_only_request, record_write
+from .media import serve_media
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 20
+MAX_PARALLEL = 4
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+ALLOWED_METHODS = SAFE_METHODS + ('POST', 'PUT', 'PATCH', 'DELETE')
+# 返回文件流的视图，结果不能放进 JSON
+STREAMING_VIEWS = (serve_media,)
+# 不复制到子请求的请求头：同一个 Idempotency-Key 会让批量里的多个写请求互相冲突
+EXCLUDED_META = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_IDEMPOTENCY_KEY')
+
+
+def _build_request(request, method, path, body):
+    url = urlsplit(path)
+    environ = {
+        key: value for key, value in request.META.items()
+        if not key.startswith('wsgi.') and key not in EXCLUDED_META
+    }
+    payload = json.dumps(body).encode() if body is not None else b''
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': BytesIO(payload),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub_request = WSGIRequest(environ)
+    # 复用批量请求已认证的用户和 token，子请求不再查 token 表
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def _dispatch(request, item, access):
+    method = item['method']
+    path = item['path']
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        return {'status': 404, 'body': {'detail': 'Not found.'}}
+
+    sub_request = _build_request(request, method, path, item.get('body'))
+    sub_request.access = access
+    # 一个子请求出错只影响它自己的结果
+    try:
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    except Http404:
+        return {'status': 404, 'body': {'detail': 'Not found.'}}
+    except PermissionDenied:
+        return {'status': 403, 'body': {'detail': 'Permission denied.'}}
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", method, path)
+        return {'status': 500, 'body': {'error': 'internal server error'}}
+    if response.streaming:
+        response.close()
+        return {'status': 400, 'body': {'error': f'streaming responses are not supported: {path}'}}
+
+    body = None
+    if response.content:
+        if response.get('Content-Type', '').startswith('application/json'):
+            body = json.loads(response.content)
+        else:
+            body = response.content.decode(response.charset, errors='replace')
+    return {'status': response.status_code, 'body': body}
+
+
+def _dispatch_in_thread(request, item, access):
+    try:
+        return _dispatch(request, item, access)
+    finally:
+        connections.close_all()
+
+
+def _validate(items):
+    if not isinstance(items, list) or not items:
+        raise ValidationError({'error': 'requests must be a non-empty list'})
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValidationError({'error': f'at most {MAX_BATCH_SIZE} requests per batch'})
+    cleaned = []
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            raise ValidationError({'error': 'each request needs a path'})
+        method = str(item.get('method', 'GET')).upper()
+        path = item['path']
+        if method not in ALLOWED_METHODS:
+            raise ValidationError({'error': f'unsupported method {method}'})
+        if not path.startswith('/api/') or urlsplit(path).path.rstrip('/') == '/api/batch':
+            raise ValidationError({'error': f'path not allowed: {path}'})
+        try:
+            view = resolve(urlsplit(path).path).func
+        except Resolver404:
+            view = None
+        # 异步视图返回协程、文件视图返回流，都不能在批量里同步执行
+        if view is not None and (iscoroutinefunction(view) or view in STREAMING_VIEWS):
+            raise ValidationError({'error': f'path not allowed in batch: {path}'})
+        cleaned.append({'method': method, 'path': path, 'body': item.get('body')})
+    return cleaned
+
+
+@api_view(['POST'])
+def batch(request):
+    """
+    一次请求执行多个 API 调用：
+    {"requests": [{"method": "GET", "path": "/api/projects/"}, ...], "parallel": true}
+    返回 {"responses": [{"status": 200, "body": ...}, ...]}，顺序与请求一致。
+    """
+    items = _validate(request.data.get('requests'))
+    all_safe = all(item['method'] in SAFE_METHODS for item in items)
+
+    if all_safe:
+        # 批量接口本身是 POST，但全是只读子请求时按 GET 的规则读副本（子线程复制的上下文也一样）
+        with read_only_request(request):
+            if request.data.get('parallel') and len(items) > 1:
+                # 只读子请求并发执行；每个线程使用自己的数据库连接，复制当前上下文以保留读路由
+                with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL, len(items))) as executor:
+                    futures = [
+                        executor.submit(
+                            contextvars.copy_context().run, _dispatch_in_thread, request, item, request.access,
+                        )
+                        for item in items
+                    ]
+                    responses = [future.result() for future in futures]
+            else:
+                responses = [_dispatch(request, item, request.access) for item in items]
+        record_write(request, False)
+    else:
+        # 顺序执行，共用当前请求的数据库连接；写入之后重新计算权限缓存
+        access = request.access
+        responses = []
+        wrote = False
+        for item in items:
+            response = _dispatch(request, item, access)
+            responses.append(response)
+            if item['method'] not in SAFE_METHODS and response['status'] < 400:
+                wrote = True
+                access = AccessContext(request.user)
+        # 只有子请求真的写入成功，之后的读才需要粘在主库
+        record_write(request, wrote)
+    return Response({'responses': responses})
@@ -0,0 +1,210 @@
+"""
+响应压缩。
+
+按 Accept-Encoding 在 COMPRESSION_ENCODINGS 里协商编码（br/zstd 需要安装 brotli/zstandard，
+没装就跳过），只压缩 COMPRESSIBLE_TYPES 里的文本类响应：
+- 小于 COMPRESSION_MIN_SIZE 字节的响应不压缩，压缩头和 CPU 开销不划算；
+- 已有 Content-Encoding、部分内容（206）以及图片等二进制响应（头像）原样返回，不会重复压缩；
+- 流式响应逐块压缩并 flush，客户端不用等到最后一块；
+- 防 BREACH：渲染过 CSRF token 的响应，以及用 exclude_from_compression 标记的含凭证响应（登录返回的 token）
+  不压缩，否则攻击者可以通过反射输入和压缩后长度逐字节猜出秘密。
+压缩级别由 COMPRESSION_LEVELS 配置，级别越高越省流量但越耗 CPU，
+用 python manage.py benchmark_compression 对比各接口的效果。
+"""
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/',
+)
+DEFAULT_LEVELS = {'br': 4, 'zstd': 3, 'gzip': 6}
+
+_ACCEPT_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*')
+
+
+class _Gzip:
+    def __init__(self, level):
+        # wbits=31：带 gzip 头和校验
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, level):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class _Zstd:
+    def __init__(self, level):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+ENCODERS = {'gzip': _Gzip}
+if brotli is not None:
+    ENCODERS['br'] = _Brotli
+if zstandard is not None:
+    ENCODERS['zstd'] = _Zstd
+
+
+def available_encodings():
+    """按服务端偏好排序、且已安装依赖的编码"""
+    preferred = getattr(settings, 'COMPRESSION_ENCODINGS', ('br', 'zstd', 'gzip'))
+    return [name for name in preferred if name in ENCODERS]
+
+
+def level_for(encoding):
+    return getattr(settings, 'COMPRESSION_LEVELS', {}).get(encoding, DEFAULT_LEVELS[encoding])
+
+
+def compress(encoding, data, level=None):
+    encoder = ENCODERS[encoding](level_for(encoding) if level is None else level)
+    return encoder.compress(data) + encoder.finish()
+
+
+def parse_accept_encoding(accept_encoding):
+    """Accept-Encoding -> {编码: q}"""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        match = _ACCEPT_RE.fullmatch(item)
+        if not match:
+            continue
+        try:
+            accepted[match.group(1).lower()] = float(match.group(2) or 1)
+        except ValueError:
+            continue
+    return accepted
+
+
+def is_accepted(accepted, encoding):
+    return accepted.get(encoding, accepted.get('*', 0)) > 0
+
+
+def negotiate(accept_encoding):
+    """从 Accept-Encoding 里选出客户端接受（q>0）且服务端最偏好的编码"""
+    accepted = parse_accept_encoding(accept_encoding)
+    for name in available_encodings():
+        if is_accepted(accepted, name):
+            return name
+    return None
+
+
+def exclude_from_compression(response):
+    """响应里有 token 等秘密时调用，这个响应不压缩"""
+    response.compression_exempt = True
+    return response
+
+
+def _is_compressible(request, response):
+    if response.has_header('Content-Encoding') or response.status_code == 206:
+        return False
+    # get_token() 被调用过说明响应里可能带着 CSRF token
+    if getattr(response, 'compression_exempt', False) or request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if not _is_compressible(request, response):
+            return response
+        # 流式响应只有带 Content-Length（如 FileResponse）时才知道大小
+        size = len(response.content) if not response.streaming else response.get('Content-Length')
+        if size is not None and int(size) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        # 不管这次是否压缩，缓存都要按 Accept-Encoding 区分
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        encoder = ENCODERS[encoding](level_for(encoding))
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async(encoder, response.streaming_content)
+            else:
+                response.streaming_content = self._compress_stream(encoder, response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = encoder.compress(response.content) + encoder.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # 压缩后字节不同，强 ETag 改为弱 ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def _compress_stream(encoder, chunks):
+        for chunk in chunks:
+            data = encoder.compress(chunk)
+            if data:
+                yield data
+        yield encoder.finish()
+
+    @staticmethod
+    async def _compress_async(encoder, chunks):
+        async for chunk in chunks:
+            data = encoder.compress(chunk)
+            if data:
+                yield data
+        yield encoder.finish()
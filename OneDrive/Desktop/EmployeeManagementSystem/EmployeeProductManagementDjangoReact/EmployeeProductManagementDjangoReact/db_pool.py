@@ -0,0 +1,29 @@
+from django.db import connections
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+
+def pool_stats():
+    """每个数据库别名的连接池状态；未启用连接池的别名返回 None"""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            stats[alias] = None
+            continue
+        raw = pool.get_stats()
+        in_use = raw.get('pool_size', 0) - raw.get('pool_available', 0)
+        stats[alias] = {
+            **raw,
+            'in_use': in_use,
+            # 占用率接近 1 且 requests_waiting > 0 说明池已饱和
+            'saturation': round(in_use / pool.max_size, 3) if pool.max_size else None,
+        }
+    return stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def db_pool_metrics(request):
+    return Response(pool_stats())
@@ -0,0 +1,222 @@
+import contextvars
+import hashlib
+import logging
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .tenancy import tenant_database
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'primary'
+REPLICA = 'replica'
+
+# 当前上下文的读路由：None/PRIMARY 读主库，REPLICA 读副本
+_read_target = contextvars.ContextVar('db_read_target', default=None)
+
+STICKY_COOKIE = 'db_primary_pin'
+
+_replica_health = {}
+
+
+def replica_aliases():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def _replica_is_healthy(alias):
+    now = time.monotonic()
+    healthy, checked_at = _replica_health.get(alias, (True, None))
+    if checked_at is not None and now - checked_at < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+        return healthy
+    try:
+        connections[alias].ensure_connection()
+        healthy = True
+    except Exception:
+        logger.warning("Replica %s is unavailable, falling back", alias, exc_info=True)
+        healthy = False
+    _replica_health[alias] = (healthy, now)
+    return healthy
+
+
+def choose_replica():
+    candidates = [alias for alias in replica_aliases() if _replica_is_healthy(alias)]
+    return random.choice(candidates) if candidates else None
+
+
+@contextmanager
+def pin_to_primary():
+    """在此范围内的读也走主库"""
+    token = _read_target.set(PRIMARY)
+    try:
+        yield
+    finally:
+        _read_target.reset(token)
+
+
+def use_primary(view_func):
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        with pin_to_primary():
+            return view_func(*args, **kwargs)
+    return wrapper
+
+
+# 账号、认证、幂等键和同步墓碑等全局数据始终在默认库：认证发生在确定租户之前，
+# 墓碑和自动补全也都按 tenant_id 过滤。独立数据库的租户在自己的库里另有一份本租户的用户行，
+# 供项目、通知等外键引用，由 accounts.signals 在用户保存时同步
+SHARED_APPS = {'accounts', 'admin', 'auth', 'authtoken', 'contenttypes', 'idempotency', 'sessions', 'sync'}
+
+
+def is_shared(model):
+    return model._meta.app_label in SHARED_APPS
+
+
+class TenantRouter:
+    """当前租户在 TENANT_DATABASES 里有独立数据库时，业务数据的读写都走该库；否则交给后面的路由"""
+
+    def db_for_read(self, model, **hints):
+        if is_shared(model):
+            # 从租户库的对象出发访问用户（project.employer、项目成员等），读同一个库里的副本
+            instance = hints.get('instance')
+            if instance is not None and instance._state.db in settings.TENANT_DATABASES.values():
+                return instance._state.db
+            return None
+        return tenant_database()
+
+    def db_for_write(self, model, **hints):
+        if is_shared(model):
+            return None
+        return tenant_database()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        tenant_aliases = set(settings.TENANT_DATABASES.values())
+        if obj1._state.db in tenant_aliases or obj2._state.db in tenant_aliases:
+            # 租户库里有用户的副本，业务数据可以引用默认库里的用户
+            return obj1._state.db == obj2._state.db or is_shared(type(obj1)) or is_shared(type(obj2))
+        return None
+
+
+class PrimaryReplicaRouter:
+    """写入和事务内的读走主库，只读请求的读走健康的副本"""
+
+    def db_for_read(self, model, **hints):
+        if _read_target.get() != REPLICA or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return choose_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def _sticky_key(request):
+    credential = request.headers.get('Authorization') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return 'db:sticky:' + hashlib.sha256(credential.encode()).hexdigest()
+
+
+def is_sticky(request):
+    """该客户端最近写过，读仍走主库"""
+    if request.COOKIES.get(STICKY_COOKIE):
+        return True
+    key = _sticky_key(request)
+    return key is not None and cache.get(key) is not None
+
+
+@contextmanager
+def read_only_request(request):
+    """
+    按只读请求的规则路由读：用于方法本身不安全、实际只读的请求（如全是 GET 的批量请求）。
+    该客户端最近写过时仍读主库。
+    """
+    if not replica_aliases() or is_sticky(request):
+        yield
+        return
+    token = _read_target.set(REPLICA)
+    try:
+        yield
+    finally:
+        _read_target.reset(token)
+
+
+def record_write(request, wrote):
+    """告诉中间件这个请求是否真的写入了数据，决定之后的读要不要粘在主库"""
+    # DRF 的 Request 包着中间件看到的 HttpRequest
+    getattr(request, '_request', request).db_wrote = wrote
+
+
+class ReplicaRoutingMiddleware:
+    """
+    GET/HEAD/OPTIONS 请求读副本。写请求之后的一段时间内（REPLICA_STICKY_SECONDS），
+    同一客户端的读仍走主库，保证能读到自己刚写入的数据。
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _read_target_for(self, request):
+        safe = request.method in self.SAFE_METHODS
+        return REPLICA if safe and not is_sticky(request) else PRIMARY
+
+    def _wrote(self, request, response):
+        # 视图可以用 record_write 说明实际情况，否则按请求方法和状态码判断
+        wrote = getattr(request, 'db_wrote', None)
+        if wrote is None:
+            wrote = request.method not in self.SAFE_METHODS and response.status_code < 400
+        return wrote
+
+    def _after_response(self, request, response):
+        if self._wrote(request, response):
+            seconds = settings.REPLICA_STICKY_SECONDS
+            key = _sticky_key(request)
+            if key:
+                cache.set(key, 1, seconds)
+            # 登录等请求之后客户端才拿到新凭证，再加一个短期 cookie
+            response.set_cookie(STICKY_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+        token = _read_target.set(self._read_target_for(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_target.reset(token)
+        return self._after_response(request, response)
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+        token = _read_target.set(self._read_target_for(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_target.reset(token)
+        return self._after_response(request, response)
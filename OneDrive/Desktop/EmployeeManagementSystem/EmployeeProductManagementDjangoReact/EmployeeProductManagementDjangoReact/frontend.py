@@ -0,0 +1,142 @@
+"""
+生产环境下由 Django 提供构建好的 React 前端。
+
+前端用 `npm run build` 输出到 frontend/dist（Vite 的 base 为 /static/），
+再执行 python manage.py collectstatic：
+- CompressedManifestStaticFilesStorage 给文件名加内容哈希，并为文本类文件生成 .gz/.br 预压缩副本
+  （.br 需要安装 brotli），请求时不用再压缩；
+- serve_static 按 Accept-Encoding 选择预压缩副本，带哈希的文件永久缓存，其余 no-cache；
+- frontend_index 返回 index.html（no-cache，资源地址换成带哈希的文件名），前端路由都落到这里。
+这样再次访问时只需用 ETag 验证 index.html，JS/CSS 直接读浏览器缓存。
+"""
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from .compression import COMPRESSIBLE_TYPES, ENCODERS, compress, is_accepted, parse_accept_encoding
+from .media import IMMUTABLE_CACHE_CONTROL, serve_media
+
+NO_CACHE_CONTROL = 'no-cache'
+# 预压缩副本：编码 -> 文件后缀，按服务端偏好排序
+PRECOMPRESSED = {'br': '.br', 'gzip': '.gz'}
+# Vite 自己输出的带哈希文件名（动态 import 的 chunk 引用的是这些名字）
+VITE_HASHED_RE = re.compile(r'^assets/.+-[\w-]{8}\.\w+$')
+INDEX_ASSET_RE = re.compile(r'(?P<attr>src|href)="/static/(?P<path>[^"?#]+)"')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """collectstatic 时在带哈希的文件旁边生成 .gz/.br 预压缩副本"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            self._precompress(name)
+
+    def _precompress(self, name):
+        content_type, encoding = mimetypes.guess_type(name)
+        if encoding or not content_type or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return
+        with self.open(name) as file:
+            data = file.read()
+        if len(data) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return
+        levels = getattr(settings, 'STATIC_COMPRESSION_LEVELS', {})
+        for encoding, suffix in PRECOMPRESSED.items():
+            if encoding not in ENCODERS:
+                continue
+            compressed = compress(encoding, data, levels.get(encoding))
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+    @property
+    def hashed_names(self):
+        """manifest 里所有带哈希的文件名；manifest 重新加载（hashed_files 被替换）后才重建"""
+        if getattr(self, '_hashed_names_source', None) is not self.hashed_files:
+            self._hashed_names = frozenset(self.hashed_files.values())
+            self._hashed_names_source = self.hashed_files
+        return self._hashed_names
+
+
+def _is_hashed(path):
+    if VITE_HASHED_RE.match(path):
+        return True
+    return path in getattr(staticfiles_storage, 'hashed_names', ())
+
+
+def _precompressed(request, path):
+    """客户端接受、且 collectstatic 生成过的预压缩副本；没有则返回原文件"""
+    accepted = parse_accept_encoding(request.headers.get('Accept-Encoding', ''))
+    for encoding, suffix in PRECOMPRESSED.items():
+        if is_accepted(accepted, encoding) and os.path.isfile(os.path.join(settings.STATIC_ROOT, path + suffix)):
+            return path + suffix
+    return path
+
+
+@require_safe
+def serve_static(request, path):
+    response = serve_media(request, _precompressed(request, path), document_root=settings.STATIC_ROOT)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if _is_hashed(path) else NO_CACHE_CONTROL
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+_index_cache = {}
+
+
+def _render_index():
+    """collectstatic 后的 index.html，/static/ 下的资源地址换成带哈希的文件名；按文件修改时间缓存"""
+    path = os.path.join(settings.STATIC_ROOT, 'index.html')
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        raise Http404('前端尚未构建')
+    if _index_cache.get('mtime') != mtime:
+        with open(path, encoding='utf-8') as file:
+            html = file.read()
+
+        def hashed_url(match):
+            try:
+                # DEBUG 下 url() 默认返回原文件名，这里读的是 collectstatic 的产物，始终用带哈希的名字
+                url = staticfiles_storage.url(match.group('path'), force=True)
+            except ValueError:
+                return match.group(0)
+            return f'{match.group("attr")}="{url}"'
+
+        content = INDEX_ASSET_RE.sub(hashed_url, html).encode()
+        _index_cache.update(
+            mtime=mtime,
+            content=content,
+            etag='"%s"' % hashlib.md5(content, usedforsecurity=False).hexdigest(),
+        )
+    return _index_cache['content'], _index_cache['etag']
+
+
+@require_safe
+def frontend_index(request, path=''):
+    content, etag = _render_index()
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type='text/html; charset=utf-8')
+    response['ETag'] = etag
+    # 每次都向服务器验证，保证发布后立刻拿到新的资源地址
+    response['Cache-Control'] = NO_CACHE_CONTROL
+    return response
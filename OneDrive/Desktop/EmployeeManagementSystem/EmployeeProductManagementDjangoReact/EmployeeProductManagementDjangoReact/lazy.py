@@ -0,0 +1,48 @@
+"""
+不常用路径的延迟加载，缩短 worker 启动到能处理第一个请求的时间（见 profile_startup 命令）：
+- admin：INSTALLED_APPS 用 SimpleAdminConfig，不在启动时 autodiscover，
+  第一次解析 /admin/ 下的地址时才加载各应用的 admin 模块并生成 URL；
+- lazy_view：按点分路径引用视图，第一次请求时才导入所在模块。
+头像处理用到的 Pillow 本来就在 avatars.py 的函数里导入。
+"""
+import threading
+from functools import cached_property
+
+from django.utils.module_loading import import_string
+
+
+class LazyAdminURLConf:
+    """
+    urlpatterns 第一次被访问时才 autodiscover。和 admin.site.urls 一样以
+    (urlconf, app_name, namespace) 直接传给 path()；include() 会立即读取 urlpatterns，不能用。
+    """
+
+    @cached_property
+    def urlpatterns(self):
+        from django.contrib import admin
+
+        admin.autodiscover()
+        return admin.site.get_urls()
+
+
+def lazy_view(dotted_path, csrf_exempt=False):
+    """
+    第一次调用时才导入的视图。CsrfViewMiddleware 在调用视图前检查 csrf_exempt，
+    DRF 的视图（自己做 CSRF 校验）需要显式传 csrf_exempt=True。
+    """
+    view = None
+    lock = threading.Lock()
+
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            with lock:
+                if view is None:
+                    view = import_string(dotted_path)
+        return view(request, *args, **kwargs)
+
+    wrapper.__name__ = dotted_path.rsplit('.', 1)[-1]
+    wrapper.__qualname__ = wrapper.__name__
+    wrapper.__module__ = dotted_path.rsplit('.', 1)[0]
+    wrapper.csrf_exempt = csrf_exempt
+    return wrapper
@@ -0,0 +1,194 @@
+import atexit
+import json
+import logging
+import os
+import queue as _queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+SENSITIVE_KEYS = frozenset({
+    'password', 'new_password', 'old_password', 'token', 'key',
+    'authorization', 'secret', 'csrfmiddlewaretoken',
+})
+REDACTED = '***'
+
+
+def sanitize(value, max_chars=1000, max_items=20, depth=3):
+    """复制一份可安全写日志的数据：脱敏、截断长字符串、只保留列表前若干项"""
+    if hasattr(value, 'getlist') and hasattr(value, 'lists'):
+        # QueryDict
+        value = {k: v[0] if len(v) == 1 else v for k, v in value.lists()}
+    if isinstance(value, dict):
+        if depth <= 0:
+            return f'<dict with {len(value)} keys>'
+        items = list(value.items())
+        result = {
+            k: REDACTED if str(k).lower() in SENSITIVE_KEYS
+            else sanitize(v, max_chars, max_items, depth - 1)
+            for k, v in items[:max_items]
+        }
+        if len(items) > max_items:
+            result['...'] = f'+{len(items) - max_items} more keys'
+        return result
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = list(value)
+        if depth <= 0:
+            return f'<{type(value).__name__} of {len(items)} items>'
+        result = [sanitize(v, max_chars, max_items, depth - 1) for v in items[:max_items]]
+        if len(items) > max_items:
+            result.append(f'... +{len(items) - max_items} more')
+        return result
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    if hasattr(value, 'read') and hasattr(value, 'name'):
+        return f'<file {value.name}>'
+    text = str(value)
+    if len(text) > max_chars:
+        return f'{text[:max_chars]}... ({len(text)} chars)'
+    return text
+
+
+class RedactingFilter(logging.Filter):
+    def __init__(self, max_chars=1000, max_items=20):
+        super().__init__()
+        self.max_chars = max_chars
+        self.max_items = max_items
+
+    def filter(self, record):
+        if record.args:
+            if isinstance(record.args, dict):
+                record.args = sanitize(record.args, self.max_chars, self.max_items)
+            else:
+                record.args = tuple(sanitize(arg, self.max_chars, self.max_items) for arg in record.args)
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    按 logger 名前缀限速（令牌桶）。rates 形如 {'accounts': 20}，单位为每 per 秒条数；
+    WARNING 及以上不限速。被丢弃的条数附在下一条放行的日志上。
+    """
+
+    def __init__(self, rates=None, default_rate=None, per=1.0):
+        super().__init__()
+        self.rates = sorted((rates or {}).items(), key=lambda item: -len(item[0]))
+        self.default_rate = default_rate
+        self.per = per
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _rate_for(self, name):
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + '.'):
+                return prefix, rate
+        return '', self.default_rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        prefix, rate = self._rate_for(record.name)
+        if not rate:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, dropped = self._buckets.get(prefix, (rate, now, 0))
+            tokens = min(rate, tokens + (now - updated) * rate / self.per)
+            if tokens < 1:
+                self._buckets[prefix] = (tokens, now, dropped + 1)
+                return False
+            self._buckets[prefix] = (tokens - 1, now, 0)
+        if dropped:
+            record.suppressed = dropped
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        suppressed = getattr(record, 'suppressed', None)
+        if suppressed:
+            data['suppressed'] = suppressed
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """
+    请求线程只把日志记录放进有界队列，格式化和写 stderr 在后台线程完成。
+    队列满时直接丢弃并计数，不会阻塞请求。
+
+    LOGGING 里用 '()' 构造：用 'class' 时 Python 3.12+ 的 dictConfig 会按 QueueHandler 特殊处理
+    （要求 handlers、自己创建 listener），3.11 及以前又不认这些配置项。
+    也接受 dictConfig 传入的 queue / handlers，以及它挂上来的 listener：写入的目标就用它们。
+    """
+
+    def __init__(self, queue=None, handlers=None, queue_size=10000, respect_handler_level=True):
+        super().__init__(queue if queue is not None else _queue.Queue(queue_size))
+        # 没有指定目标 handler 时写 stderr，格式化器由 setFormatter 交给它
+        self._own_target = not handlers
+        self.targets = list(handlers) if handlers else [logging.StreamHandler()]
+        self.respect_handler_level = respect_handler_level
+        self.listener = None
+        self.dropped = 0
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def setFormatter(self, fmt):
+        # 格式化在后台线程里由目标 handler 做
+        if self._own_target:
+            self.targets[0].setFormatter(fmt)
+        else:
+            super().setFormatter(fmt)
+
+    def start(self):
+        """启动后台线程；fork 出的 worker 进程里线程不存在，需要重新启动"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                # dictConfig 创建的 listener 带着它解析好的目标 handler
+                handlers = self.listener.handlers if self.listener is not None else self.targets
+                self.listener = QueueListener(
+                    self.queue, *handlers, respect_handler_level=self.respect_handler_level,
+                )
+                self.listener.start()
+                self._pid = os.getpid()
+
+    def prepare(self, record):
+        # 此时参数已经脱敏截断，只做廉价的 % 拼接，JSON 序列化留给后台线程
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self.start()
+        try:
+            self.queue.put_nowait(record)
+        except _queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """处理完队列里剩下的记录后停止后台线程"""
+        if self._pid == os.getpid():
+            self.listener.stop()
+            self._pid = None
+
+    def close(self):
+        # dictConfig 重新配置时会关闭旧的 handler
+        self.stop()
+        super().close()
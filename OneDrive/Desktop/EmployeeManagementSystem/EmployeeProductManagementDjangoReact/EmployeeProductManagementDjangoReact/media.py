@@ -0,0 +1,143 @@
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# avatars.py 生成的内容哈希文件名，内容不会再变，可以永久缓存
+HASHED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{20}(_\w+)?\.\w+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+BLOCK_SIZE = 64 * 1024
+
+
+class _RangeFile:
+    """只读取文件中 [start, start + length) 的一段"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _etag(path, st):
+    if HASHED_NAME_RE.search(path):
+        return '"%s"' % os.path.basename(path)
+    return '"%x-%x"' % (int(st.st_mtime), st.st_size)
+
+
+def _cache_control(path):
+    if HASHED_NAME_RE.search(path):
+        return IMMUTABLE_CACHE_CONTROL
+    return 'public, max-age=%d' % getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)
+
+
+def _not_modified(request, etag, st):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        # 弱比较：压缩中间件可能把 ETag 改成了 W/"..."
+        return if_none_match.strip() == '*' or etag in [
+            tag.strip().removeprefix('W/') for tag in if_none_match.split(',')
+        ]
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and int(st.st_mtime) <= if_modified_since
+
+
+def _parse_range(header, size):
+    """解析单段 Range，返回 (start, end)；不满足返回 False，忽略时返回 None"""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+@require_safe
+def serve_media(request, path, document_root=None):
+    try:
+        fullpath = safe_join(document_root or settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('文件不存在')
+    try:
+        st = os.stat(fullpath)
+    except OSError:
+        raise Http404('文件不存在')
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404('文件不存在')
+
+    etag = _etag(path, st)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(st.st_mtime),
+        'Cache-Control': _cache_control(path),
+        'Accept-Ranges': 'bytes',
+    }
+    if _not_modified(request, etag, st):
+        response = HttpResponseNotModified()
+        for key in ('ETag', 'Last-Modified', 'Cache-Control'):
+            response[key] = headers[key]
+        return response
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+
+    # 交给前置代理发送文件内容，Django 只负责校验和响应头
+    accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', None)
+    if accel_prefix or getattr(settings, 'MEDIA_USE_X_SENDFILE', False):
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if accel_prefix:
+            response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + path.lstrip('/')
+        else:
+            response['X-Sendfile'] = fullpath
+        return response
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (if_range is None or if_range.strip() in (etag, headers['Last-Modified'])):
+        byte_range = _parse_range(range_header, st.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416, headers=headers)
+            response['Content-Range'] = 'bytes */%d' % st.st_size
+            return response
+
+    file = open(fullpath, 'rb')
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(_RangeFile(file, start, end - start + 1), status=206,
+                                content_type=content_type, headers=headers)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, st.st_size)
+    else:
+        # 完整文件：WSGI 服务器提供 wsgi.file_wrapper 时走 sendfile 零拷贝
+        response = FileResponse(file, content_type=content_type, headers=headers)
+    response.block_size = BLOCK_SIZE
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
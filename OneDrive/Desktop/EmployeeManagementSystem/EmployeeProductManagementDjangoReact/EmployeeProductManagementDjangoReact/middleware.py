@@ -1,20 +1,23 @@
-from django.http import JsonResponse
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from accounts.access import AccessContext
+
 
 class RoleMiddleware:
+    """
+    提供 request.access。DRF 的 Token 认证在视图里才执行，这里只放一个惰性对象，
+    真正用到时按当时的 request.user 解析；Token 认证成功后会直接替换成已认证用户的上下文。
+    """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        if request.path.startswith('/api/'):
-            user = request.user
-            if user.is_authenticated:
-                # Check user type and permissions
-                if hasattr(user, 'employer_profile'):
-                    request.user_type = 'employer'
-                elif hasattr(user, 'employee_profile'):
-                    request.user_type = 'employee'
-                else:
-                    return JsonResponse({'error': 'Invalid user type'}, status=403)
-            
-        response = self.get_response(request)
-        return response
\ No newline at end of file
+        request.access = SimpleLazyObject(lambda: AccessContext(request.user))
+        # 异步链路下 get_response 返回协程，由调用方 await
+        return self.get_response(request)
@@ -0,0 +1,170 @@
+"""
+查询计划回归测试工具。
+
+各应用 tests.py 里的 QueryPlanTestCase 子类对热点查询集执行 EXPLAIN，并与提交在
+<app>/query_plans/<数据库类型>/<名称>.txt 的快照比较：
+- 计划结构变化（例如索引查找变成全表扫描）时测试失败，并给出差异；
+- 受保护的表（Notification、NotificationRecipient、ProjectMember）出现全表扫描时直接失败；
+- Postgres 上估算成本超过快照的 PLAN_COST_TOLERANCE 倍时失败。
+
+默认用 SQLite 运行：
+    DB_ENGINE=django.db.backends.sqlite3 python manage.py test
+有 Postgres 时按 settings 的 DB_* 环境变量连接即可，快照按数据库类型分目录保存。
+缺少快照时测试失败；新增查询、有意修改查询或索引后，用 UPDATE_QUERY_PLANS=1 生成快照并提交。
+"""
+import difflib
+import inspect
+import os
+import re
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.db import connection
+from django.test import TestCase
+
+PLAN_COST_TOLERANCE = 3.0
+
+_PG_COST_RE = re.compile(r'\s*\(cost=([\d.]+)\.\.([\d.]+) rows=\d+ width=\d+\)')
+_PG_SEQ_SCAN_RE = re.compile(r'Seq Scan on (\w+)')
+_SQLITE_SCAN_RE = re.compile(r'^\s*SCAN (\w+)')
+
+
+def explain(queryset):
+    """返回 (规范化后的计划文本, 估算总成本或 None)"""
+    if connection.vendor == 'postgresql':
+        return _explain_postgres(queryset)
+    if connection.vendor == 'sqlite':
+        return _explain_sqlite(queryset), None
+    return queryset.explain(), None
+
+
+def _explain_sqlite(queryset):
+    # 每行格式为 "id parent notused detail"，按 parent 还原缩进
+    depth = {0: -1}
+    lines = []
+    for line in queryset.explain().splitlines():
+        node_id, parent, _, detail = line.split(' ', 3)
+        depth[int(node_id)] = depth.get(int(parent), -1) + 1
+        lines.append('  ' * depth[int(node_id)] + detail)
+    return '\n'.join(lines)
+
+
+def _explain_postgres(queryset):
+    lines = queryset.explain().splitlines()
+    match = _PG_COST_RE.search(lines[0])
+    cost = float(match.group(2)) if match else None
+    return '\n'.join(_PG_COST_RE.sub('', line).rstrip() for line in lines), cost
+
+
+def full_scans(plan):
+    """计划里被整表扫描的表名"""
+    if connection.vendor == 'postgresql':
+        return set(_PG_SEQ_SCAN_RE.findall(plan))
+    return {match.group(1) for match in map(_SQLITE_SCAN_RE.match, plan.splitlines()) if match}
+
+
+def seed_dataset(tenants=5, employees=100, projects=40, members_per_project=8,
+                 notifications=600, recipients_per_notification=20):
+    """按固定规律生成多个租户、有一定规模的数据，让优化器的选择接近生产环境。
+    返回第一个租户的雇主和一名员工"""
+    from accounts.models import User
+    from notification.models import Notification, NotificationRecipient
+    from product.models import Project, ProjectMember
+
+    today = date.today()
+    for t in range(tenants):
+        employer = User.objects.create_user(username=f'plan_employer{t}', password='x', role='employer')
+        User.objects.bulk_create([
+            User(username=f'plan_employee{t}_{i}', role='employee', department='技术部', tenant_id=employer.pk)
+            for i in range(employees)
+        ])
+        staff = list(User.objects.filter(tenant_id=employer.pk, role='employee').values_list('pk', flat=True))
+
+        Project.objects.bulk_create([
+            Project(
+                ProjectName=f'项目{t}_{i}',
+                StartDate=today + timedelta(days=i % 30),
+                EndDate=today + timedelta(days=i % 30 + 90),
+                Status='active',
+                manager_id=staff[i % len(staff)],
+                employer=employer,
+            )
+            for i in range(projects)
+        ])
+        ProjectMember.objects.bulk_create([
+            ProjectMember(project_id=project_id, employee_id=staff[(i * 7 + j) % len(staff)], role='developer')
+            for i, project_id in enumerate(Project.objects.filter(employer=employer).values_list('pk', flat=True))
+            for j in range(members_per_project)
+        ])
+
+        Notification.objects.bulk_create([
+            Notification(Message=f'通知{t}_{i}', NotificationType='info', Sender=employer, tenant_id=employer.pk)
+            for i in range(notifications)
+        ])
+        NotificationRecipient.objects.bulk_create([
+            NotificationRecipient(
+                notification_id=notification_id,
+                recipient_id=staff[(i * 13 + j) % len(staff)],
+                read=j % 3 == 0,
+            )
+            for i, notification_id in enumerate(
+                Notification.objects.filter(Sender=employer).values_list('pk', flat=True)
+            )
+            for j in range(recipients_per_notification)
+        ], ignore_conflicts=True)
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    employer = User.objects.get(username='plan_employer0')
+    return employer, User.objects.get(username='plan_employee0_0')
+
+
+class QueryPlanTestCase(TestCase):
+    # 这些表上出现全表扫描即视为回归
+    indexed_tables = (
+        'notification_notification',
+        'notification_notificationrecipient',
+        'product_project',
+        'product_projectmember',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employer, cls.employee = seed_dataset()
+
+    def snapshot_path(self, name):
+        app_dir = Path(inspect.getfile(type(self))).parent
+        return app_dir / 'query_plans' / connection.vendor / f'{name}.txt'
+
+    def assertQueryPlan(self, name, queryset):
+        plan, cost = explain(queryset)
+
+        scanned = full_scans(plan) & set(self.indexed_tables)
+        self.assertFalse(scanned, f'{name}: full scan on {", ".join(sorted(scanned))}\n{plan}')
+
+        path = self.snapshot_path(name)
+        snapshot = f'# cost: {cost}\n{plan}\n' if cost is not None else f'{plan}\n'
+        if os.environ.get('UPDATE_QUERY_PLANS'):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(snapshot, encoding='utf-8')
+            return
+        # 缺少快照说明新查询没有提交快照（或数据库类型不同），不能悄悄记录下来当作通过
+        self.assertTrue(path.exists(), f'{name}: no snapshot at {path} (run with UPDATE_QUERY_PLANS=1 to record it)')
+
+        expected = path.read_text(encoding='utf-8')
+        expected_cost = None
+        if expected.startswith('# cost: '):
+            header, expected = expected.split('\n', 1)
+            expected_cost = float(header[len('# cost: '):]) if header[len('# cost: '):] != 'None' else None
+            snapshot = snapshot.split('\n', 1)[1]
+
+        if snapshot != expected:
+            diff = '\n'.join(difflib.unified_diff(
+                expected.splitlines(), snapshot.splitlines(), 'snapshot', 'current', lineterm=''
+            ))
+            self.fail(f'{name}: query plan changed (rerun with UPDATE_QUERY_PLANS=1 if intended)\n{diff}')
+        if cost is not None and expected_cost:
+            self.assertLessEqual(
+                cost, expected_cost * PLAN_COST_TOLERANCE,
+                f'{name}: estimated cost {cost} exceeds snapshot {expected_cost} x{PLAN_COST_TOLERANCE}',
+            )
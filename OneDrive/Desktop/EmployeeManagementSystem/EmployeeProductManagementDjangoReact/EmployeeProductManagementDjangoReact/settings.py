@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,7 +33,8 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # 不在启动时 autodiscover，见 EmployeeProductManagementDjangoReact/lazy.py
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -42,11 +45,19 @@ INSTALLED_APPS = [
     'accounts.apps.AccountsConfig',
     'product',
     'notification',
+    'search',
+    'sync',
+    'idempotency',
+    'audit',
     'rest_framework.authtoken',
 ]
 
 MIDDLEWARE = [
+    'EmployeeProductManagementDjangoReact.db_routers.ReplicaRoutingMiddleware',
+    'EmployeeProductManagementDjangoReact.tenancy.TenantMiddleware',
+    'audit.context.AuditContextMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'EmployeeProductManagementDjangoReact.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,15 +94,85 @@ WSGI_APPLICATION = "EmployeeProductManagementDjangoReact.wsgi.application"
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'EMPS',
-        'USER': 'postgres',
-        'PASSWORD': '020311',
-        'HOST': '127.0.0.1',
-        'PORT': '5432',
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.postgresql'),
+        'NAME': os.environ.get('DB_NAME', 'EMPS'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', '020311'),
+        'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Postgres 连接池（psycopg 3 + psycopg_pool），WSGI 线程和 ASGI 下都安全。
+# DB_POOL_MAX_SIZE=0 时关闭连接池，改用 DB_CONN_MAX_AGE 秒的持久连接（ASGI 下不建议）
+if DATABASES['default']['ENGINE'].endswith('postgresql'):
+    _pool_max_size = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+    if _pool_max_size > 0:
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': _pool_max_size,
+                # 池满时等待空闲连接的秒数，超时报错而不是无限排队
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+                'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+# 只读副本：DB_REPLICAS 为逗号分隔的副本主机（Postgres）或数据库文件（SQLite），
+# 例如本地用两个 SQLite 文件测试：
+#   DB_ENGINE=django.db.backends.sqlite3 DB_NAME=primary.sqlite3 DB_REPLICAS=replica.sqlite3
+REPLICA_DATABASES = []
+for _i, _replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    _key = 'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST'
+    DATABASES[f'replica{_i}'] = {
+        **DATABASES['default'],
+        _key: _replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(f'replica{_i}')
+
+# 独立数据库的租户（雇主）：DB_TENANTS 为逗号分隔的 "雇主id=库名"（SQLite 为文件），
+# 例如 DB_TENANTS=12=tenant12.sqlite3，再执行 python manage.py migrate --database tenant12
+# （迁移后自动把该租户的用户复制过去）。账号和 token 仍在默认库，见 db_routers.SHARED_APPS
+TENANT_DATABASES = {}
+for _item in filter(None, os.environ.get('DB_TENANTS', '').split(',')):
+    _tenant, _, _name = _item.partition('=')
+    _alias = f'tenant{int(_tenant)}'
+    DATABASES[_alias] = {**DATABASES['default'], 'NAME': _name.strip()}
+    TENANT_DATABASES[int(_tenant)] = _alias
+
+DATABASE_ROUTERS = [
+    'EmployeeProductManagementDjangoReact.db_routers.TenantRouter',
+    'EmployeeProductManagementDjangoReact.db_routers.PrimaryReplicaRouter',
+]
+
+# 缓存：时间线的失效版本号、读己之写标记等需要在所有 worker 间共享，
+# 多进程部署时用 CACHE_URL 指定 Redis（如 redis://127.0.0.1:6379/1，需要安装 redis）；
+# 不设置时为进程内缓存，只适合单进程开发（manage.py check --deploy 会提示）
+if os.environ.get('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# 写请求之后同一客户端继续读主库的秒数（读己之写），多进程部署时需要共享缓存
+REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+# 副本不可用时，隔多久再尝试
+REPLICA_HEALTH_CHECK_INTERVAL = int(os.environ.get('DB_REPLICA_HEALTH_CHECK_INTERVAL', 30))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -127,10 +208,44 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 
 STATIC_URL = "static/"
+# collectstatic 的输出目录；前端 `npm run build` 的产物（frontend/dist）一并收集
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATICFILES_DIRS = [BASE_DIR / 'frontend' / 'dist'] if (BASE_DIR / 'frontend' / 'dist').is_dir() else []
+# 文件名带内容哈希，并生成 .gz/.br 预压缩副本（见 EmployeeProductManagementDjangoReact/frontend.py）
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'EmployeeProductManagementDjangoReact.frontend.CompressedManifestStaticFilesStorage',
+    },
+}
+# 预压缩在 collectstatic 时离线完成，可以用最高级别
+STATIC_COMPRESSION_LEVELS = {'br': 11, 'gzip': 9}
+# 由 Django 提供 /static/ 和前端页面；前置 nginx/CDN 直接提供 STATIC_ROOT 时关掉
+SERVE_FRONTEND = True
 
 # Media files (User uploaded files)
 MEDIA_URL = '/avatars/'
 MEDIA_ROOT = BASE_DIR / 'avatars'
+# 非内容哈希文件名的缓存时间（秒）
+MEDIA_CACHE_MAX_AGE = 3600
+# 由前置代理发送文件：nginx 配置 internal location 前缀，或 Apache/lighttpd 打开 X-Sendfile
+MEDIA_ACCEL_REDIRECT_PREFIX = None
+MEDIA_USE_X_SENDFILE = False
+
+# 本地后台任务线程（头像缩略图等），EAGER 时在事务提交后同步执行
+BACKGROUND_WORKERS = 2
+BACKGROUND_TASKS_EAGER = False
+
+# 响应压缩：按顺序协商（br/zstd 需安装 brotli/zstandard），小于阈值的响应不压缩；
+# 级别越高越省流量、越耗 CPU，可用 benchmark_compression 对比后调整
+COMPRESSION_ENCODINGS = ('br', 'zstd', 'gzip')
+COMPRESSION_LEVELS = {'br': 4, 'zstd': 3, 'gzip': 6}
+COMPRESSION_MIN_SIZE = 1024
+
+# 后台删除用户时每批删除的行数
+USER_DELETION_BATCH_SIZE = 1000
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -149,40 +264,92 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-tenant-id',
 ]
 
 # REST Framework设置
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.RoleTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
 
+# 日志：请求线程只入队，后台线程输出 JSON；参数脱敏截断，按 logger 限速
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'redact': {
+            '()': 'EmployeeProductManagementDjangoReact.logutils.RedactingFilter',
+            'max_chars': 1000,
+            'max_items': 20,
+        },
+        'rate_limit': {
+            '()': 'EmployeeProductManagementDjangoReact.logutils.RateLimitFilter',
+            # 每秒最多条数（按 logger 名前缀），WARNING 及以上不限
+            'rates': {
+                'django.request': 50,
+                'accounts': 20,
+                'product': 20,
+                'notification': 20,
+            },
+            'default_rate': 100,
+            'per': 1.0,
+        },
+    },
     'formatters': {
         'verbose': {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'EmployeeProductManagementDjangoReact.logutils.JsonFormatter',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'background': {
+            # 用 '()' 而不是 'class'，原因见 BackgroundQueueHandler
+            '()': 'EmployeeProductManagementDjangoReact.logutils.BackgroundQueueHandler',
+            'formatter': 'json',
+            'filters': ['rate_limit', 'redact'],
+            'queue_size': 10000,
+        },
     },
     'loggers': {
         'django': {
-            'handlers': ['console'],
+            'handlers': ['background'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'accounts': {
+            'handlers': ['background'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'product': {
+            'handlers': ['background'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'notification': {
+            'handlers': ['background'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'EmployeeProductManagementDjangoReact': {
+            'handlers': ['background'],
             'level': 'INFO',
             'propagate': False,
         },
@@ -190,3 +357,28 @@ LOGGING = {
 }
 
 AUTH_USER_MODEL = 'accounts.User'
+
+# 增量同步墓碑保留天数，游标早于此期限的客户端需要全量同步
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+
+# Idempotency-Key：记录保留时间、并发重复请求的最长等待时间、处理中记录被视为失效的时间
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+IDEMPOTENCY_WAIT_SECONDS = 10
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# 项目截止提醒：截止日前几天、当天几点发送
+PROJECT_DEADLINE_REMINDER_DAYS = 3
+PROJECT_DEADLINE_REMINDER_HOUR = 9
+
+# 已读通知超过这个天数后由 archive_notifications 移到归档表
+NOTIFICATION_ARCHIVE_AFTER_DAYS = 180
+
+# 审计记录：内存队列长度、每批写入条数、后台线程最长等待秒数；
+# 队列满时请求线程最多等待 AUDIT_ENQUEUE_TIMEOUT 秒，之后改为同步写入
+AUDIT_BUFFER_SIZE = 10000
+AUDIT_BATCH_SIZE = 500
+AUDIT_FLUSH_INTERVAL = 1.0
+AUDIT_ENQUEUE_TIMEOUT = 0.5
+AUDIT_FLUSH_RETRIES = 3
+# 运行测试时不启动后台写入线程，提交后同步写入：SQLite 测试库上后台线程的写入会和测试争锁
+AUDIT_EAGER = sys.argv[1:2] == ['test']
@@ -0,0 +1,45 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .tenancy import get_current_tenant, tenant_context, tenant_database
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+            thread_name_prefix='background',
+        )
+    return _executor
+
+
+def _run(tenant_id, func, args, kwargs):
+    try:
+        # 工作线程不继承请求的 contextvar，显式带上租户
+        with tenant_context(tenant_id):
+            func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", func.__name__)
+    finally:
+        # 工作线程有自己的数据库连接，任务结束就归还
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """事务提交后把任务交给本地工作线程执行，不占用请求线程"""
+    tenant_id = get_current_tenant()
+    # 账号数据在默认库、业务数据可能在租户库，挂到正处于事务中的那个库上
+    aliases = [alias for alias in (tenant_database(tenant_id), DEFAULT_DB_ALIAS) if alias]
+    using = next((alias for alias in aliases if connections[alias].in_atomic_block), DEFAULT_DB_ALIAS)
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        transaction.on_commit(lambda: func(*args, **kwargs), using=using)
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run, tenant_id, func, args, kwargs), using=using)
@@ -0,0 +1,109 @@
+"""
+租户 = 雇主。每个用户、项目、通知都属于一个雇主租户（User.tenant / Project.employer / Notification.tenant）。
+当前租户保存在 contextvar 里，只由认证成功的用户确定（见 accounts/authentication.py 的 bind_tenant）：
+普通用户就是自己的租户；X-Tenant-ID 请求头只是超级用户切换租户用的，未认证的请求不会读取它。
+各模型的 scoped 管理器按当前租户自动过滤，没有租户时什么也查不到；
+管理命令、迁移等需要跨租户的地方用不过滤的 objects，或用 tenant_context 指定租户。
+"""
+import contextvars
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import models
+from django.http import JsonResponse
+
+TENANT_HEADER = 'X-Tenant-ID'
+
+_current_tenant = contextvars.ContextVar('current_tenant', default=None)
+# 请求头里指定的租户，认证成功后才决定是否采用
+_requested_tenant = contextvars.ContextVar('requested_tenant', default=None)
+
+
+def get_current_tenant():
+    return _current_tenant.get()
+
+
+def set_current_tenant(tenant_id):
+    return _current_tenant.set(tenant_id)
+
+
+def get_requested_tenant():
+    return _requested_tenant.get()
+
+
+@contextmanager
+def tenant_context(tenant_id):
+    token = _current_tenant.set(tenant_id)
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+
+def tenant_database(tenant_id=None):
+    """租户的独立数据库别名；没有单独配置的租户返回 None（使用默认库）"""
+    if tenant_id is None:
+        tenant_id = get_current_tenant()
+    return settings.TENANT_DATABASES.get(tenant_id)
+
+
+class TenantManager(models.Manager):
+    """按当前租户自动过滤的管理器，tenant_field 为指向雇主的外键；没有当前租户时返回空结果"""
+
+    def __init__(self, tenant_field='tenant'):
+        super().__init__()
+        self.tenant_field = tenant_field
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        tenant_id = get_current_tenant()
+        if tenant_id is None:
+            # 没有租户上下文时不返回任何数据，避免漏掉认证的代码路径看到所有租户
+            return queryset.none()
+        return queryset.filter(**{f'{self.tenant_field}_id': tenant_id})
+
+
+@contextmanager
+def _request_scope(requested_tenant):
+    # 每个请求都从没有租户开始，认证成功后由 bind_tenant 设置
+    current, requested = _current_tenant.set(None), _requested_tenant.set(requested_tenant)
+    try:
+        yield
+    finally:
+        _requested_tenant.reset(requested)
+        _current_tenant.reset(current)
+
+
+class TenantMiddleware:
+    """记下请求头里指定的租户；请求期间设置的当前租户在结束后恢复，避免线程复用时串租户"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _tenant_from(self, request):
+        value = request.headers.get(TENANT_HEADER)
+        return int(value) if value else None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            tenant_id = self._tenant_from(request)
+        except ValueError:
+            return JsonResponse({'error': f'{TENANT_HEADER} must be an integer'}, status=400)
+        with _request_scope(tenant_id):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        try:
+            tenant_id = self._tenant_from(request)
+        except ValueError:
+            return JsonResponse({'error': f'{TENANT_HEADER} must be an integer'}, status=400)
+        with _request_scope(tenant_id):
+            return await self.get_response(request)
@@ -0,0 +1,64 @@
+"""
+多数据库测试工具。
+
+MultiDatabaseTestCase 在默认测试库之外，临时加入 extra_databases 列出的 SQLite 文件库
+（建在临时目录里并执行迁移），每个测试结束后恢复为刚迁移完的文件，测试类结束后删除。
+这样本地用两个 SQLite 文件就能测试副本路由和独立数据库的租户：
+    DB_ENGINE=django.db.backends.sqlite3 python manage.py test
+用 TransactionTestCase：TestCase 会让默认库始终处于事务中，事务内的读都走主库。
+"""
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TransactionTestCase
+
+
+class MultiDatabaseTestCase(TransactionTestCase):
+    extra_databases = ()
+
+    @classmethod
+    def setUpClass(cls):
+        cls._database_dir = tempfile.mkdtemp()
+        for alias in cls.extra_databases:
+            connections.settings[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(cls._database_dir, f'{alias}.sqlite3'),
+            }
+        connections.configure_settings(connections.settings)
+        try:
+            for alias in cls.extra_databases:
+                call_command('migrate', database=alias, verbosity=0)
+                connections[alias].close()
+                shutil.copyfile(cls._path(alias), cls._path(alias) + '.migrated')
+            cls.databases = {DEFAULT_DB_ALIAS, *cls.extra_databases}
+            super().setUpClass()
+        except Exception:
+            cls._remove_databases()
+            raise
+
+    @classmethod
+    def _path(cls, alias):
+        return connections.settings[alias]['NAME']
+
+    def _fixture_teardown(self):
+        super()._fixture_teardown()
+        # flush 只清空路由允许迁移的表（副本上一个也没有），直接换回迁移后的文件
+        for alias in self.extra_databases:
+            connections[alias].close()
+            shutil.copyfile(self._path(alias) + '.migrated', self._path(alias))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._remove_databases()
+
+    @classmethod
+    def _remove_databases(cls):
+        for alias in cls.extra_databases:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        shutil.rmtree(cls._database_dir, ignore_errors=True)
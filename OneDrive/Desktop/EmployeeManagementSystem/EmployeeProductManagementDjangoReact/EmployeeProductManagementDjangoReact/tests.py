@@ -0,0 +1,434 @@
+import io
+import json
+import logging
+import logging.config
+import os
+import shutil
+import tempfile
+import zlib
+from contextlib import redirect_stderr
+from datetime import date, timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db.models import ProtectedError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts.deletion import purge_user
+from accounts.signals import copy_users
+from accounts.views import AuthViewSet
+from accounts.models import User, UserDeletionJob
+from product.models import Project, ProjectMember
+from . import frontend
+from .compression import CompressionMiddleware, exclude_from_compression
+from .media import serve_media
+from .db_routers import STICKY_COOKIE, ReplicaRoutingMiddleware, _replica_health, _sticky_key
+from .tenancy import TENANT_HEADER, tenant_context
+from .testing import MultiDatabaseTestCase
+
+
+def list_users(request):
+    if request.method == 'POST':
+        User.objects.create_user(username=request.POST['username'], password='x', role='employee')
+    usernames = list(User.objects.order_by('username').values_list('username', flat=True))
+    with transaction.atomic():
+        in_transaction = list(User.objects.order_by('username').values_list('username', flat=True))
+    return JsonResponse({'users': usernames, 'in_transaction': in_transaction})
+
+
+@override_settings(REPLICA_DATABASES=['replica1'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(MultiDatabaseTestCase):
+    """主库和副本是两个 SQLite 文件；副本里多一个用户，用来区分读到的是哪个库"""
+    extra_databases = ('replica1',)
+
+    def setUp(self):
+        _replica_health.clear()
+        User.objects.db_manager('default').create_user(username='primary_user', password='x', role='employee')
+        User.objects.db_manager('replica1').create_user(username='replica_user', password='x', role='employee')
+        self.factory = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(list_users)
+
+    def get(self, **headers):
+        return json.loads(self.middleware(self.factory.get('/api/users/', **headers)).content)
+
+    def test_safe_methods_read_from_replica(self):
+        self.assertEqual(self.get()['users'], ['replica_user'])
+
+    def test_reads_inside_a_transaction_use_primary(self):
+        self.assertEqual(self.get()['in_transaction'], ['primary_user'])
+
+    def test_writes_go_to_primary(self):
+        request = self.factory.post('/api/users/', {'username': 'new_user'}, HTTP_AUTHORIZATION='Token abc')
+        data = json.loads(self.middleware(request).content)
+        self.assertEqual(data['users'], ['new_user', 'primary_user'])
+        self.assertFalse(User.objects.using('replica1').filter(username='new_user').exists())
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        request = self.factory.post('/api/users/', {'username': 'new_user'}, HTTP_AUTHORIZATION='Token abc')
+        response = self.middleware(request)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        # 同一凭证（共享缓存里的标记）或带着粘滞 cookie 的读都走主库
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Token abc')['users'], ['new_user', 'primary_user'])
+        self.factory.cookies[STICKY_COOKIE] = '1'
+        self.assertEqual(self.get()['users'], ['new_user', 'primary_user'])
+        del self.factory.cookies[STICKY_COOKIE]
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Token other')['users'], ['replica_user'])
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        replica = connections['replica1']
+        name = replica.settings_dict['NAME']
+        replica.close()
+        replica.settings_dict['NAME'] = '/nonexistent/replica.sqlite3'
+        try:
+            with self.assertLogs('EmployeeProductManagementDjangoReact.db_routers', 'WARNING'):
+                self.assertEqual(self.get()['users'], ['primary_user'])
+        finally:
+            replica.settings_dict['NAME'] = name
+
+
+@override_settings(REPLICA_DATABASES=['replica1'], REPLICA_STICKY_SECONDS=5)
+class BatchTests(MultiDatabaseTestCase):
+    """副本里多一个本租户的员工，用来区分子请求读的是哪个库"""
+    extra_databases = ('replica1',)
+
+    def setUp(self):
+        _replica_health.clear()
+        cache.clear()
+        self.employer = User.objects.create_user(username='batch_boss', password='x', role='employer')
+        self.other = User.objects.create_user(username='batch_other', password='x', role='employer')
+        copy_users([self.employer], 'replica1')
+        User.objects.db_manager('replica1').create_user(
+            username='replica_emp', password='x', role='employee', tenant_id=self.employer.pk,
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.employer).key)
+
+    def _batch(self, requests, parallel=False):
+        response = self.client.post('/api/batch/', {'requests': requests, 'parallel': parallel}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def _pinned(self, response):
+        return STICKY_COOKIE in response.cookies or cache.get(_sticky_key(response.wsgi_request)) is not None
+
+    def test_read_only_batch_reads_replica_without_pinning(self):
+        for parallel in (False, True):
+            response = self._batch([
+                {'method': 'GET', 'path': '/api/auth/'},
+                {'method': 'GET', 'path': '/api/auth/profile/'},
+            ], parallel)
+            first, second = response.json()['responses']
+            self.assertEqual(sorted(u['username'] for u in first['body']), ['batch_boss', 'replica_emp'])
+            self.assertEqual((second['status'], second['body']['username']), (200, 'batch_boss'))
+            self.assertFalse(self._pinned(response))
+
+    def test_successful_write_pins_later_reads(self):
+        response = self._batch([
+            {'method': 'POST', 'path': '/api/auth/', 'body': {'username': 'batch_new', 'password': 'x', 'role': 'employee'}},
+            {'method': 'GET', 'path': '/api/auth/'},
+        ])
+        created, listed = response.json()['responses']
+        self.assertEqual(created['status'], 201)
+        # 写入之后的子请求读主库，能看到刚创建的员工
+        self.assertEqual(sorted(u['username'] for u in listed['body']), ['batch_boss', 'batch_new'])
+        self.assertTrue(self._pinned(response))
+
+    def test_failed_writes_do_not_pin(self):
+        response = self._batch([{'method': 'DELETE', 'path': f'/api/auth/{self.other.pk}/'}])
+        self.assertEqual(response.json()['responses'][0]['status'], 403)
+        self.assertFalse(self._pinned(response))
+
+    def test_errors_stay_with_their_sub_request(self):
+        requests = [
+            {'method': 'GET', 'path': '/api/no-such-endpoint/'},
+            {'method': 'GET', 'path': '/api/auth/999999/'},
+            {'method': 'GET', 'path': '/api/auth/profile/'},
+            {'method': 'GET', 'path': '/api/auth/'},
+        ]
+        with mock.patch.object(AuthViewSet, 'profile', side_effect=RuntimeError('boom'), create=False):
+            for parallel in (False, True):
+                with self.assertLogs('EmployeeProductManagementDjangoReact.batch', 'ERROR'):
+                    responses = self._batch(requests, parallel).json()['responses']
+                self.assertEqual([r['status'] for r in responses], [404, 404, 500, 200])
+                self.assertEqual(responses[2]['body'], {'error': 'internal server error'})
+
+
+class TenantIsolationTests(TestCase):
+    def setUp(self):
+        self.employer = User.objects.create_user(username='tenant_boss', password='x', role='employer')
+        self.other = User.objects.create_user(username='other_boss', password='x', role='employer')
+        self.employee = User.objects.create_user(username='tenant_emp', password='x', role='employee', tenant=self.employer)
+        self.client = APIClient()
+
+    def _register(self, role, **headers):
+        return self.client.post('/api/auth/', {'username': f'new_{role}', 'password': 'x', 'role': role}, **headers)
+
+    def test_scoped_managers_fail_closed_without_tenant(self):
+        self.assertFalse(User.scoped.exists())
+        with tenant_context(self.employer.pk):
+            self.assertEqual(set(User.scoped.all()), {self.employer, self.employee})
+
+    def test_anonymous_requests_cannot_choose_a_tenant(self):
+        header = {f'HTTP_{TENANT_HEADER.upper().replace("-", "_")}': str(self.employer.pk)}
+        self.assertEqual(self._register('employee', **header).status_code, 403)
+        self.assertFalse(User.objects.filter(username='new_employee').exists())
+        self.assertEqual(self._register('employer', **header).status_code, 201)
+        employer = User.objects.get(username='new_employer')
+        self.assertEqual(employer.tenant_id, employer.pk)
+
+    def test_employees_are_created_in_the_creators_tenant(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.employer).key)
+        self.assertEqual(self._register('employee').status_code, 201)
+        self.assertEqual(User.objects.get(username='new_employee').tenant_id, self.employer.pk)
+
+    def test_header_cannot_switch_to_another_tenant(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.employee).key,
+            **{f'HTTP_{TENANT_HEADER.upper().replace("-", "_")}': str(self.other.pk)},
+        )
+        self.assertEqual(self.client.get('/api/auth/').status_code, 401)
+
+    def test_employer_with_tenant_users_is_protected(self):
+        with self.assertRaises(ProtectedError):
+            self.employer.delete()
+
+
+class TenantDatabaseTests(MultiDatabaseTestCase):
+    """独立数据库的租户：账号和 token 在默认库，业务数据在租户库，租户库里有用户的副本"""
+    extra_databases = ('tenant_a',)
+
+    def setUp(self):
+        self.employer = User.objects.create_user(username='db_boss', password='x', role='employer')
+        override = override_settings(TENANT_DATABASES={self.employer.pk: 'tenant_a'})
+        override.enable()
+        self.addCleanup(override.disable)
+        # 配置独立数据库之前就存在的雇主，迁移后补到租户库
+        self.employer.save()
+        self.employee = User.objects.create_user(
+            username='db_emp', password='x', role='employee', tenant=self.employer, name='小王',
+        )
+        self.client = APIClient()
+
+    def _login(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+
+    def test_auth_on_default_and_business_data_in_tenant_database(self):
+        self._login(self.employer)
+        response = self.client.post('/api/projects/', {
+            'ProjectName': '租户库项目', 'StartDate': date.today(), 'EndDate': date.today() + timedelta(days=30),
+            'Status': 'active', 'employer': self.employer.pk, 'member_ids': [self.employee.pk],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertFalse(Project.objects.using('default').exists())
+        self.assertTrue(Token.objects.using('default').filter(user=self.employer).exists())
+        self.assertFalse(Token.objects.using('tenant_a').exists())
+        # 用户的索引在默认库，项目的索引在租户库
+        results = self.client.get('/api/search/', {'q': '小王'}).json()['results']
+        self.assertEqual([(r['type'], r['id']) for r in results], [('user', self.employee.pk)])
+        results = self.client.get('/api/search/', {'q': '租户'}).json()['results']
+        self.assertIn('project', [r['type'] for r in results])
+
+        self._login(self.employee)
+        projects = self.client.get('/api/projects/').json()
+        self.assertEqual([p['ProjectName'] for p in projects], ['租户库项目'])
+        employees = self.client.get('/api/projects/availability/', {'start': date.today(), 'end': date.today()})
+        self.assertEqual([e['project_count'] for e in employees.json()], [1])
+
+    def test_availability_by_department_in_tenant_database(self):
+        developer = User.objects.create_user(
+            username='db_dev', password='x', role='employee', tenant=self.employer, department='研发部/后端组',
+        )
+        with tenant_context(self.employer.pk):
+            project = Project.objects.create(
+                ProjectName='p', StartDate=date.today(), EndDate=date.today(), employer=self.employer,
+            )
+            ProjectMember.objects.create(project=project, employee=developer, role='developer')
+        department = developer.department_node.parent
+        self._login(self.employer)
+        response = self.client.get('/api/projects/availability/', {
+            'start': date.today(), 'end': date.today(), 'department': department.pk,
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([(e['username'], e['project_count']) for e in response.json()], [('db_dev', 1)])
+
+    def test_user_rows_are_copied_to_tenant_database(self):
+        copies = User.objects.using('tenant_a')
+        self.assertEqual(set(copies.values_list('username', flat=True)), {'db_boss', 'db_emp'})
+        self.employee.name = '小李'
+        self.employee.save()
+        self.assertEqual(copies.get(pk=self.employee.pk).name, '小李')
+
+    def test_deleting_employer_clears_both_databases(self):
+        with tenant_context(self.employer.pk):
+            project = Project.objects.create(
+                ProjectName='p', StartDate=date.today(), EndDate=date.today(), employer=self.employer,
+            )
+            ProjectMember.objects.create(project=project, employee=self.employee, role='developer')
+            job = UserDeletionJob.objects.create(user_id=self.employer.pk, username=self.employer.username)
+            purge_user(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done', job.error)
+        for alias in ('default', 'tenant_a'):
+            self.assertFalse(User.objects.using(alias).exists(), alias)
+            self.assertFalse(Project.objects.using(alias).exists(), alias)
+
+
+class LoggingConfigTests(SimpleTestCase):
+    def setUp(self):
+        # 测试结束后按原配置重建，handler 重新绑定真正的 stderr
+        self.addCleanup(logging.config.dictConfig, settings.LOGGING)
+
+    def test_logging_settings_configure_background_handler(self):
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            logging.config.dictConfig(settings.LOGGING)
+        logger = logging.getLogger('accounts')
+        logger.info('login %s', {'username': 'alice', 'password': 'secret'})
+        logger.handlers[0].stop()
+
+        record = json.loads(stderr.getvalue())
+        self.assertEqual(record['logger'], 'accounts')
+        self.assertIn("'password': '***'", record['message'])
+        self.assertNotIn('secret', stderr.getvalue())
+
+
+class MediaTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.content = bytes(range(100))
+        with open(os.path.join(self.root, 'doc.bin'), 'wb') as f:
+            f.write(self.content)
+        self.factory = RequestFactory()
+
+    def get(self, **headers):
+        response = serve_media(self.factory.get('/api/avatars/doc.bin', headers=headers), 'doc.bin', self.root)
+        self.addCleanup(response.close)
+        return response
+
+    def test_single_range(self):
+        response = self.get(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+    def test_suffix_range(self):
+        response = self.get(Range='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 95-99/100')
+        self.assertEqual(b''.join(response.streaming_content), self.content[95:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range='bytes=200-300')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        etag = response['ETag']
+        self.assertEqual(self.get(If_None_Match=etag).status_code, 304)
+        # 压缩中间件改写成的弱 ETag 也算匹配
+        self.assertEqual(self.get(If_None_Match=f'W/{etag}').status_code, 304)
+        self.assertEqual(self.get(If_None_Match='"other"').status_code, 200)
+
+
+class StaticCacheControlTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.storage = frontend.CompressedManifestStaticFilesStorage(location=root)
+        self.storage.hashed_files = {'app.css': 'app.0123456789ab.css'}
+        patcher = mock.patch.object(frontend, 'staticfiles_storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hashed_names_come_from_the_manifest(self):
+        self.assertTrue(frontend._is_hashed('app.0123456789ab.css'))
+        self.assertTrue(frontend._is_hashed('assets/index-AbCd12_-.js'))
+        self.assertFalse(frontend._is_hashed('app.css'))
+        self.assertFalse(frontend._is_hashed('index.html'))
+
+    def test_set_is_built_once_and_rebuilt_when_manifest_reloads(self):
+        names = self.storage.hashed_names
+        self.assertIs(self.storage.hashed_names, names)
+        self.storage.hashed_files = {'app.css': 'app.ba9876543210.css'}
+        self.assertTrue(frontend._is_hashed('app.ba9876543210.css'))
+        self.assertFalse(frontend._is_hashed('app.0123456789ab.css'))
+
+
+@override_settings(COMPRESSION_ENCODINGS=('gzip',), COMPRESSION_MIN_SIZE=1024)
+class CompressionTests(SimpleTestCase):
+    body = json.dumps([{'username': f'user{i}', 'role': 'employee'} for i in range(100)]).encode()
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def process(self, response, accept='gzip', **meta):
+        request = self.factory.get('/api/auth/', HTTP_ACCEPT_ENCODING=accept, **meta)
+        return CompressionMiddleware(lambda request: response).process_response(request, response)
+
+    def json_response(self, body=None, **kwargs):
+        return HttpResponse(self.body if body is None else body, content_type='application/json', **kwargs)
+
+    def test_negotiates_accept_encoding(self):
+        response = self.process(self.json_response())
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(zlib.decompress(response.content, 31), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(self.process(self.json_response(), 'br, *;q=0.5')['Content-Encoding'], 'gzip')
+        for accept in ('gzip;q=0', 'br', 'identity', '*;q=0', ''):
+            self.assertFalse(self.process(self.json_response(), accept).has_header('Content-Encoding'), accept)
+
+    def test_vary_even_when_not_compressed(self):
+        for accept in ('gzip', 'gzip;q=0'):
+            self.assertEqual(self.process(self.json_response(), accept)['Vary'], 'Accept-Encoding')
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.process(self.json_response(b'{"ok": true}'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{"ok": true}')
+
+    def test_partial_encoded_and_binary_responses_pass_through(self):
+        responses = [
+            self.json_response(status=206),
+            self.json_response(headers={'Content-Encoding': 'br'}),
+            HttpResponse(self.body, content_type='image/png'),
+        ]
+        for response in responses:
+            processed = self.process(response)
+            self.assertEqual(processed.content, self.body)
+            self.assertNotEqual(processed.get('Content-Encoding'), 'gzip')
+
+    def test_streaming_responses_are_compressed_incrementally(self):
+        chunks = [self.body[i:i + 500] for i in range(0, len(self.body), 500)]
+        response = self.process(StreamingHttpResponse(iter(chunks), content_type='application/json'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(zlib.decompress(b''.join(response.streaming_content), 31), self.body)
+
+    def test_responses_with_secrets_are_not_compressed(self):
+        # BREACH：带 token 的响应和渲染过 CSRF token 的响应都原样返回
+        self.assertFalse(self.process(exclude_from_compression(self.json_response())).has_header('Content-Encoding'))
+        response = self.process(self.json_response(), CSRF_COOKIE_NEEDS_UPDATE=True)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+@override_settings(COMPRESSION_ENCODINGS=('gzip',), COMPRESSION_MIN_SIZE=0)
+class LoginCompressionTests(TestCase):
+    def test_login_response_with_token_is_not_compressed(self):
+        User.objects.create_user(username='zip_boss', password='x', role='employer')
+        client = APIClient(HTTP_ACCEPT_ENCODING='gzip')
+        response = client.post('/api/auth/login/', {'username': 'zip_boss', 'password': 'x'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('token', response.json())
+        # 其他接口照常压缩
+        client.credentials(HTTP_AUTHORIZATION='Token ' + response.json()['token'])
+        self.assertEqual(client.get('/api/auth/profile/')['Content-Encoding'], 'gzip')
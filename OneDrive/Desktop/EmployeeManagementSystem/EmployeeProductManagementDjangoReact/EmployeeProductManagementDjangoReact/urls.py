@@ -14,24 +14,51 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from product.views import ProjectViewSet
 from notification.views import NotificationViewSet
-from accounts.views import AuthViewSet
-from django.views.static import serve
+from accounts.views import AuthViewSet, DepartmentViewSet
+from accounts import async_views as account_async_views
+from notification import async_views as notification_async_views
+from product import async_views as product_async_views
+from search.views import SearchViewSet
+from sync.views import SyncViewSet
+from audit.views import AuditEventViewSet
+from EmployeeProductManagementDjangoReact.media import serve_media
+from EmployeeProductManagementDjangoReact.frontend import frontend_index, serve_static
+from EmployeeProductManagementDjangoReact.lazy import LazyAdminURLConf, lazy_view
 
 router = DefaultRouter()
 router.register(r'projects', ProjectViewSet)
 router.register(r'notifications', NotificationViewSet)
 router.register(r'auth', AuthViewSet, basename='auth')
 router.register(r'users', AuthViewSet, basename='user')
+router.register(r'search', SearchViewSet, basename='search')
+router.register(r'sync', SyncViewSet, basename='sync')
+router.register(r'departments', DepartmentViewSet)
+router.register(r'audit', AuditEventViewSet)
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # admin、批量接口、运维指标不常用，第一次访问时才加载
+    path('admin/', (LazyAdminURLConf(), 'admin', 'admin')),
     path('api/', include(router.urls)),
-    path('api/avatars/<path:path>', serve, {'document_root': settings.MEDIA_ROOT}),
+    re_path(r'^api/batch/?$', lazy_view('EmployeeProductManagementDjangoReact.batch.batch', csrf_exempt=True)),
+    path('api/metrics/db-pool/', lazy_view('EmployeeProductManagementDjangoReact.db_pool.db_pool_metrics', csrf_exempt=True)),
+    # ASGI 下的原生异步只读接口
+    path('api/async/projects/', product_async_views.project_list),
+    path('api/async/projects/<int:pk>/', product_async_views.project_detail),
+    path('api/async/notifications/', notification_async_views.inbox),
+    path('api/async/notifications/unread_count/', notification_async_views.unread_count),
+    path('api/async/auth/profile/', account_async_views.profile),
+    path('api/avatars/<path:path>', serve_media, {'document_root': settings.MEDIA_ROOT}, name='avatar'),
 ]
+
+if settings.SERVE_FRONTEND:
+    urlpatterns += [
+        path('static/<path:path>', serve_static),
+        # 前端路由（/login、/projects/1 等）都返回 index.html
+        re_path(r'^(?!api/|admin/|static/)(?P<path>.*)$', frontend_index),
+    ]
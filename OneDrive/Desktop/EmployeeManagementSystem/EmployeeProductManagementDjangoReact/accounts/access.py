@@ -0,0 +1,58 @@
+from django.utils.functional import cached_property
+
+from product.models import Project
+
+
+class AccessContext:
+    """
+    当前请求用户的角色和派生权限。
+    由认证类在认证成功时创建（见 authentication.py），各项只在第一次用到时查询，
+    同一请求内的权限类和视图共用结果。
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def role(self):
+        if not self.user or not self.user.is_authenticated:
+            return None
+        return self.user.role
+
+    @property
+    def is_employer(self):
+        return self.role == 'employer'
+
+    @property
+    def is_employee(self):
+        return self.role == 'employee'
+
+    @cached_property
+    def visible_project_ids(self):
+        if self.role is None:
+            return frozenset()
+        return frozenset(Project.scoped.visible_to(self.user).order_by().values_list('pk', flat=True))
+
+    @cached_property
+    def owned_project_ids(self):
+        # 雇主：自己创建的项目；员工：自己担任经理的项目
+        if self.is_employer:
+            return self.visible_project_ids
+        if self.is_employee:
+            return frozenset(Project.scoped.filter(manager=self.user).values_list('pk', flat=True))
+        return frozenset()
+
+    @cached_property
+    def employer_scope(self):
+        """可见数据所属的雇主 id"""
+        if self.is_employer:
+            return frozenset([self.user.pk])
+        return frozenset(
+            Project.scoped.filter(pk__in=self.visible_project_ids)
+            .values_list('employer_id', flat=True).distinct()
+        )
+
+    def projects(self):
+        if self.is_employer:
+            return Project.scoped.filter(employer=self.user)
+        return Project.scoped.filter(pk__in=self.visible_project_ids)
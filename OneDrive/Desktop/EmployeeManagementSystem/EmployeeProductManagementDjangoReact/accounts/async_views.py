@@ -0,0 +1,13 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from .async_auth import JSON_PARAMS, async_login_required
+from .models import User
+from .serializers import UserSerializer
+
+
+@require_safe
+@async_login_required
+async def profile(request):
+    user = await User.objects.prefetch_related(*UserSerializer.prefetches()).aget(pk=request.user.pk)
+    return JsonResponse(UserSerializer(user).data, json_dumps_params=JSON_PARAMS)
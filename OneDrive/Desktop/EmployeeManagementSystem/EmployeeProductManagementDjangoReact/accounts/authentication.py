@@ -0,0 +1,36 @@
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from audit.context import set_actor
+from EmployeeProductManagementDjangoReact.tenancy import get_requested_tenant, set_current_tenant
+from .access import AccessContext
+
+
+def bind_tenant(user):
+    """
+    认证成功后确定当前租户：用户自己的租户；超级用户可以用 X-Tenant-ID 切换到别的租户，
+    其他用户指定了别的租户则拒绝
+    """
+    requested = get_requested_tenant()
+    if requested is not None and requested != user.tenant_id:
+        if not user.is_superuser:
+            return False
+        # TenantMiddleware 在请求结束时恢复
+        set_current_tenant(requested)
+    else:
+        set_current_tenant(user.tenant_id)
+    return True
+
+
+class RoleTokenAuthentication(TokenAuthentication):
+    """Token 认证成功后，在请求上挂好该用户的 AccessContext，并确定当前租户和审计操作者"""
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            if not bind_tenant(result[0]):
+                raise AuthenticationFailed('用户不属于该租户')
+            request._request.access = AccessContext(result[0])
+            # AuditContextMiddleware 在请求结束时恢复
+            set_actor(result[0])
+        return result
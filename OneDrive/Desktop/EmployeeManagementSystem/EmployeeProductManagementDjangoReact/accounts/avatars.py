@@ -0,0 +1,134 @@
+import hashlib
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.urls import reverse
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+AVATAR_DIR = 'avatars'
+AVATAR_SIZES = (32, 64, 256)
+AVATAR_MAX_SIZE = 1024
+# (扩展名, Pillow 格式, 保存参数)
+AVATAR_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+# 接受的上传格式 -> 原图的扩展名；扩展名按 Pillow 识别的格式决定，不用客户端给的文件名
+UPLOAD_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+
+
+class InvalidAvatar(ValueError):
+    pass
+
+
+def content_hash(upload):
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()[:20]
+
+
+def store_upload(upload):
+    """校验并按内容哈希保存上传的原图，返回存储名"""
+    from PIL import Image
+
+    try:
+        with Image.open(upload) as image:
+            image.verify()
+            ext = UPLOAD_EXTENSIONS.get(image.format)
+    except Exception:
+        raise InvalidAvatar('不支持的图片格式')
+    if ext is None:
+        raise InvalidAvatar('不支持的图片格式')
+    upload.seek(0)
+
+    name = f"{AVATAR_DIR}/{content_hash(upload)}{ext}"
+    if not default_storage.exists(name):
+        name = default_storage.save(name, upload)
+    return name
+
+
+def _encode(image, fmt, options):
+    buffer = io.BytesIO()
+    # 不传 exif/icc 等参数，重新编码后元数据即被去除
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def _save(name, content):
+    if not default_storage.exists(name):
+        default_storage.save(name, content)
+    return name
+
+
+def process_avatar(user_id, source_name):
+    """生成去除元数据的全尺寸图和 32/64/256 缩略图"""
+    from PIL import Image, ImageOps
+
+    stem = os.path.splitext(source_name)[0]
+    with default_storage.open(source_name, 'rb') as source, Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    full = image.copy()
+    full.thumbnail((AVATAR_MAX_SIZE, AVATAR_MAX_SIZE), Image.LANCZOS)
+    full_name = _save(f"{stem}_full.jpg", _encode(full, 'JPEG', AVATAR_FORMATS[1][2]))
+
+    square = ImageOps.fit(image, (AVATAR_SIZES[-1], AVATAR_SIZES[-1]), Image.LANCZOS)
+    variants = {}
+    for size in AVATAR_SIZES:
+        resized = square if size == square.width else square.resize((size, size), Image.LANCZOS)
+        variants[str(size)] = {
+            ext: _save(f"{stem}_{size}.{ext}", _encode(resized, fmt, options))
+            for ext, fmt, options in AVATAR_FORMATS
+        }
+
+    with transaction.atomic():
+        user = User.objects.select_for_update().filter(pk=user_id).first()
+        current = user is not None and user.avatar.name == source_name
+        if current:
+            user.avatar = full_name
+            user.avatar_variants = variants
+            user.save(update_fields=['avatar', 'avatar_variants', 'updated_at'])
+    if not current:
+        # 期间用户又上传了新头像，本次结果作废
+        discard_avatar_files({source_name, full_name, *variant_names(variants)})
+        return
+
+    # 同一张图可能被多个用户上传过，没人引用时才删除原图
+    if full_name != source_name and not User.objects.filter(avatar=source_name).exists():
+        default_storage.delete(source_name)
+    logger.info("Processed avatar for user %s", user_id)
+
+
+def avatar_url(name):
+    """头像文件的访问地址：由 api/avatars/ 提供（MEDIA_URL 下没有文件服务），与前端拼接的地址相同"""
+    return reverse('avatar', kwargs={'path': name}) if name else None
+
+
+def variant_names(variants):
+    return [name for formats in variants.values() for name in formats.values()]
+
+
+def avatar_files(user):
+    """用户当前头像用到的所有文件"""
+    names = set(variant_names(user.avatar_variants or {}))
+    if user.avatar:
+        names.add(user.avatar.name)
+    return names
+
+
+def discard_avatar_files(names):
+    """删除不再被任何用户引用的头像文件；文件按内容哈希命名，同一张图可能被多个用户共用"""
+    for name in names:
+        # avatars/<hash>.png、avatars/<hash>_full.jpg、avatars/<hash>_32.webp 属于同一张图
+        stem = os.path.splitext(name)[0].split('_', 1)[0]
+        if not User.objects.filter(avatar__startswith=stem).exists():
+            default_storage.delete(name)
@@ -0,0 +1,175 @@
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from EmployeeProductManagementDjangoReact.tasks import run_in_background
+from notification.models import Notification, NotificationRecipient
+from product.models import Project, ProjectMember
+from search.backends import remove_objects
+from sync.signals import record_deletions
+from .models import Department, User, UserDeletionJob
+
+logger = logging.getLogger(__name__)
+
+# 删除项目会级联成员和提醒，批次要小一些
+PROJECT_BATCH_SIZE = 100
+
+
+def _batches(queryset, size=None):
+    size = size or settings.USER_DELETION_BATCH_SIZE
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+
+
+def _raw_delete(model, ids):
+    # 没有需要触发的信号：墓碑和搜索索引由调用方批量处理，直接发 DELETE，不走 Python 端级联收集
+    queryset = model.objects.filter(pk__in=ids)
+    return queryset._raw_delete(queryset.db)
+
+
+def _delete_receipts(ids):
+    record_deletions(NotificationRecipient, ids)
+    return _raw_delete(NotificationRecipient, ids)
+
+
+def _uncount_receipts(ids):
+    # 通知还在，接收数和已读数随接收记录一起减掉，不等每晚的校正；按减量分组，每组一条 UPDATE
+    groups = defaultdict(list)
+    rows = (
+        NotificationRecipient.objects.filter(pk__in=ids).order_by().values('notification_id')
+        .annotate(received=Count('pk'), read=Count('pk', filter=Q(read=True)))
+    )
+    for row in rows:
+        groups[row['received'], row['read']].append(row['notification_id'])
+    now = timezone.now()
+    for (received, read), notification_ids in groups.items():
+        Notification.objects.filter(pk__in=notification_ids).update(
+            recipient_count=Greatest(F('recipient_count') - received, 0),
+            read_count=Greatest(F('read_count') - read, 0),
+            updated_at=now,
+        )
+
+
+def delete_received(user_id):
+    for ids in _batches(NotificationRecipient.objects.filter(recipient_id=user_id)):
+        with transaction.atomic():
+            _uncount_receipts(ids)
+            deleted = _delete_receipts(ids)
+        yield deleted
+
+
+def _delete_notifications(queryset):
+    for ids in _batches(queryset):
+        for receipt_ids in _batches(NotificationRecipient.objects.filter(notification_id__in=ids)):
+            _delete_receipts(receipt_ids)
+        record_deletions(Notification, ids)
+        remove_objects(Notification, ids, router.db_for_write(Notification))
+        yield _raw_delete(Notification, ids)
+
+
+def delete_sent_notifications(user_id):
+    yield from _delete_notifications(Notification.objects.filter(Sender_id=user_id))
+
+
+def delete_tenant_notifications(user_id):
+    # 租户里其他人发的通知（tenant 外键是级联删除），不能留给最后删除用户时逐条收集
+    yield from _delete_notifications(Notification.objects.filter(tenant_id=user_id))
+
+
+def delete_memberships(user_id):
+    # 成员变化要刷新时间线缓存和截止提醒，走普通 delete 触发信号
+    for ids in _batches(ProjectMember.objects.filter(employee_id=user_id)):
+        yield ProjectMember.objects.filter(pk__in=ids).delete()[0]
+
+
+def clear_managed_projects(user_id):
+    for ids in _batches(Project.objects.filter(manager_id=user_id)):
+        yield Project.objects.filter(pk__in=ids).update(manager=None, updated_at=timezone.now())
+
+
+def delete_employer_projects(user_id):
+    for ids in _batches(Project.objects.filter(employer_id=user_id), PROJECT_BATCH_SIZE):
+        Project.objects.filter(pk__in=ids).delete()
+        yield len(ids)
+
+
+def delete_tenant_departments(user_id):
+    # 部门数量有限，闭包表和成员的 department_node 由级联处理
+    yield Department.objects.filter(tenant_id=user_id).delete()[0]
+
+
+def delete_tenant_users(user_id):
+    # 删除雇主就是删除整个租户：租户下的其他账号连同各自的数据一并删除
+    for ids in _batches(User.objects.filter(tenant_id=user_id).exclude(pk=user_id), PROJECT_BATCH_SIZE):
+        for member_id in ids:
+            for step, delete in DELETION_STEPS:
+                for _ in delete(member_id):
+                    pass
+            _delete_user(member_id)
+        yield len(ids)
+
+
+DELETION_STEPS = [
+    ('received_notifications', delete_received),
+    ('sent_notifications', delete_sent_notifications),
+    ('tenant_notifications', delete_tenant_notifications),
+    ('project_memberships', delete_memberships),
+    ('managed_projects', clear_managed_projects),
+    ('employer_projects', delete_employer_projects),
+    ('tenant_users', delete_tenant_users),
+    ('tenant_departments', delete_tenant_departments),
+]
+
+
+def _delete_user(user_id):
+    # 依赖数据已清空；雇主的 tenant 指向自己，先断开，剩下的级联（token、权限、分组等）很小
+    User.objects.filter(pk=user_id, tenant_id=user_id).update(tenant=None)
+    User.objects.filter(pk=user_id).delete()
+
+
+def request_deletion(user, requested_by):
+    """立即停用账号并撤销 token，依赖数据交给后台分批删除"""
+    job = UserDeletionJob.objects.filter(user_id=user.pk, status__in=['pending', 'running']).first()
+    if job:
+        return job
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active', 'updated_at'])
+        # 雇主的租户随之停用，后台删除期间租户里的人也不能再登录
+        members = User.objects.filter(tenant_id=user.pk).exclude(pk=user.pk)
+        members.update(is_active=False, updated_at=timezone.now())
+        Token.objects.filter(Q(user=user) | Q(user__in=members)).delete()
+        job = UserDeletionJob.objects.create(user_id=user.pk, username=user.username, requested_by=requested_by)
+        run_in_background(purge_user, job.pk)
+    logger.info("User %s deactivated, deletion job %s queued", user.pk, job.pk)
+    return job
+
+
+def purge_user(job_id):
+    job = UserDeletionJob.objects.get(pk=job_id)
+    job.status = 'running'
+    job.save(update_fields=['status'])
+    try:
+        for step, delete in DELETION_STEPS:
+            job.progress.setdefault(step, 0)
+            for count in delete(job.user_id):
+                job.progress[step] += count
+                job.save(update_fields=['progress'])
+        _delete_user(job.user_id)
+    except Exception as e:
+        logger.exception("Deletion job %s failed", job_id)
+        job.status = 'failed'
+        job.error = str(e)
+    else:
+        job.status = 'done'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.access import AccessContext
+from accounts.models import User
+from EmployeeProductManagementDjangoReact.compression import ENCODERS, compress
+from EmployeeProductManagementDjangoReact.tenancy import tenant_context
+
+DEFAULT_ENDPOINTS = ['/api/users/', '/api/notifications/', '/api/projects/', '/api/sync/']
+BENCHMARK_LEVELS = {'gzip': (1, 6, 9), 'br': (1, 4, 11), 'zstd': (1, 3, 19)}
+
+
+class Command(BaseCommand):
+    help = '按接口对比各压缩编码和级别节省的字节数与增加的 CPU 时间'
+
+    def add_arguments(self, parser):
+        parser.add_argument('endpoints', nargs='*', default=DEFAULT_ENDPOINTS)
+        parser.add_argument('--user', help='以该用户身份请求，默认第一个雇主')
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def _render(self, user, path):
+        request = APIRequestFactory().get(path)
+        force_authenticate(request, user=user)
+        request.access = AccessContext(user)
+        match = resolve(path)
+        start = time.process_time()
+        response = match.func(request, *match.args, **match.kwargs)
+        response.render()
+        return response, (time.process_time() - start) * 1000
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(role='employer').order_by('pk').first()
+        if user is None:
+            raise CommandError('找不到用户，先运行 create_test_data 或用 --user 指定')
+        iterations = options['iterations']
+
+        self.stdout.write(f"user {user.username}, {iterations} iterations, encodings: {', '.join(ENCODERS)}")
+        with tenant_context(user.tenant_id):
+            for path in options['endpoints']:
+                response, render_ms = self._render(user, path)
+                body = response.content
+                if response.status_code != 200 or not body:
+                    self.stdout.write(self.style.WARNING(f"{path}: HTTP {response.status_code}, skipped"))
+                    continue
+
+                self.stdout.write(f"\n{path}  {len(body)} bytes, view {render_ms:.2f} ms CPU")
+                for encoding in ENCODERS:
+                    for level in BENCHMARK_LEVELS[encoding]:
+                        start = time.process_time()
+                        for _ in range(iterations):
+                            compressed = compress(encoding, body, level)
+                        cpu_ms = (time.process_time() - start) * 1000 / iterations
+                        saved = len(body) - len(compressed)
+                        self.stdout.write(
+                            f"  {encoding:<5} level {level:<3} {len(compressed):>9} bytes  "
+                            f"saved {saved:>9} ({saved / len(body):6.1%})  "
+                            f"+{cpu_ms:7.3f} ms CPU ({cpu_ms / render_ms if render_ms else 0:6.1%} of view)"
+                        )
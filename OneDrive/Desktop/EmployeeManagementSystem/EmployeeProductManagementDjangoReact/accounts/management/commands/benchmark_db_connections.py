@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = '对比每次请求新建连接与连接池/持久连接的耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--database', default='default')
+
+    def _report(self, label, samples):
+        samples = sorted(samples)
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        self.stdout.write(
+            f"{label:<10} mean {statistics.mean(samples):8.3f} ms  "
+            f"p50 {statistics.median(samples):8.3f} ms  p95 {p95:8.3f} ms"
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        iterations = options['iterations']
+
+        # 每次都建立新的数据库连接（相当于 CONN_MAX_AGE=0 且没有连接池）
+        params = connection.get_connection_params()
+        direct = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            # 直接用驱动连接，绕开 Django 的连接池
+            raw = connection.Database.connect(**params)
+            cursor = raw.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            cursor.close()
+            raw.close()
+            direct.append((time.perf_counter() - start) * 1000)
+
+        # 模拟请求结束：close() 把连接还给连接池（或保留持久连接）
+        pooled = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            connection.close_if_unusable_or_obsolete()
+            if getattr(connection, 'pool', None) is not None:
+                connection.close()
+            pooled.append((time.perf_counter() - start) * 1000)
+
+        mode = 'pool' if getattr(connection, 'pool', None) is not None else 'persistent'
+        self.stdout.write(f"{connection.vendor} / {options['database']}, {iterations} iterations")
+        self._report('connect', direct)
+        self._report(mode, pooled)
+        self.stdout.write(
+            f"saved per request: {statistics.median(direct) - statistics.median(pooled):.3f} ms (p50)"
+        )
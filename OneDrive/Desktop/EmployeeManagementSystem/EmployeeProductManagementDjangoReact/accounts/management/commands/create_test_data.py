@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from product.models import Project, ProjectMember
-from notification.models import Notification, NotificationRecipient
+from notification.models import Notification
+from notification.delivery import fan_out
 from datetime import date, timedelta
 
 User = get_user_model()
@@ -12,7 +13,8 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         self.stdout.write('开始创建测试数据...')
         
-        # 清理现有数据
+        # 清理现有数据；User.tenant 是 PROTECT，先断开租户关系
+        User.objects.update(tenant=None)
         User.objects.all().delete()
         Project.objects.all().delete()
         Notification.objects.all().delete()
@@ -44,7 +46,8 @@ class Command(BaseCommand):
                 role='employee',
                 phone=f'138{len(employees):08d}',
                 address='深圳市南山区',
-                department='技术部'
+                department='技术部',
+                tenant=employer
             )
             employees.append(user)
 
@@ -89,11 +92,6 @@ class Command(BaseCommand):
             )
             
             # 添加所有用户为接收者
-            for user in User.objects.all():
-                if user != employer:
-                    NotificationRecipient.objects.create(
-                        notification=notification,
-                        recipient=user
-                    )
+            fan_out(notification)
 
         self.stdout.write(self.style.SUCCESS('测试数据创建成功！')) 
\ No newline at end of file
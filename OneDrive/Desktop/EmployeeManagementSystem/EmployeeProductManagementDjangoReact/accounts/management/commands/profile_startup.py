@@ -0,0 +1,142 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PHASES = ('setup', 'middleware', 'urlconf', 'request')
+
+# 在全新的解释器里模拟 worker 启动：加载应用和模型、中间件、URLconf，再处理第一个请求
+BOOT_SCRIPT = r'''
+import importlib, io, json, sys, time
+
+# -X importtime 只记录 import 语句，importlib.import_module（INSTALLED_APPS、admin autodiscover、
+# ROOT_URLCONF 都经过它）导入的模块本身不会出现，改为走 __import__
+_import_module = importlib.import_module
+
+def import_module(name, package=None):
+    if name.startswith('.'):
+        return _import_module(name, package)
+    __import__(name)
+    return sys.modules[name]
+
+importlib.import_module = import_module
+
+start = time.perf_counter()
+marks = {}
+import django
+django.setup()
+marks['setup'] = time.perf_counter()
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+application = WSGIHandler()
+marks['middleware'] = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+marks['urlconf'] = time.perf_counter()
+host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*',) and not h.startswith('.')), 'localhost')
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+    'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host, 'SERVER_PROTOCOL': 'HTTP/1.1',
+    'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+}
+status = []
+body = application(environ, lambda s, headers, exc_info=None: status.append(s))
+b''.join(body)
+body.close()
+marks['request'] = time.perf_counter()
+previous, timings = start, {}
+for phase, moment in marks.items():
+    timings[phase] = (moment - previous) * 1000
+    previous = moment
+timings['total'] = (previous - start) * 1000
+print(json.dumps({'timings': timings, 'status': status[0]}))
+'''
+
+
+def parse_importtime(text):
+    """
+    解析 -X importtime 的输出为树：[{'name', 'self_ms', 'cumulative_ms', 'children'}]。
+    子模块先于父模块输出，缩进（每级两个空格）表示嵌套深度。
+    """
+    pending = {}
+    for line in text.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        node = {
+            'name': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'children': pending.pop(depth + 1, []),
+        }
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+def iter_modules(nodes):
+    for node in nodes:
+        yield node['name']
+        yield from iter_modules(node['children'])
+
+
+def measure_startup(path='/api/', importtime=False):
+    """在子进程里启动一次，返回各阶段耗时（毫秒）；importtime=True 时附带导入树"""
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', BOOT_SCRIPT, path]
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+    result = subprocess.run(command, capture_output=True, text=True, env=env, cwd=settings.BASE_DIR)
+    if result.returncode != 0:
+        raise CommandError(f'启动失败：\n{result.stderr[-2000:]}')
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+    if importtime:
+        data['imports'] = parse_importtime(result.stderr)
+    return data
+
+
+class Command(BaseCommand):
+    help = '测量新 worker 的模块导入耗时（-X importtime）和处理第一个请求前的耗时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/', help='第一个请求的路径')
+        parser.add_argument('--runs', type=int, default=5, help='计时的启动次数，取中位数')
+        parser.add_argument('--min-ms', type=float, default=5.0, help='只显示累计导入耗时不低于此值的模块')
+        parser.add_argument('--depth', type=int, default=3, help='导入树的显示深度')
+        parser.add_argument('--json', action='store_true', help='输出 JSON')
+
+    def _print_tree(self, nodes, min_ms, depth, level=0):
+        for node in sorted(nodes, key=lambda n: -n['cumulative_ms']):
+            if node['cumulative_ms'] < min_ms:
+                continue
+            self.stdout.write(
+                f"{node['cumulative_ms']:9.1f} ms {node['self_ms']:8.1f} ms  {'  ' * level}{node['name']}"
+            )
+            if level + 1 < depth:
+                self._print_tree(node['children'], min_ms, depth, level + 1)
+
+    def handle(self, *args, **options):
+        # 计时单独跑，不受 -X importtime 自身开销影响
+        runs = [measure_startup(options['path'])['timings'] for _ in range(max(1, options['runs']))]
+        timings = {phase: statistics.median(run[phase] for run in runs) for phase in (*PHASES, 'total')}
+        profiled = measure_startup(options['path'], importtime=True)
+
+        if options['json']:
+            self.stdout.write(json.dumps({'timings': timings, 'imports': profiled['imports']}))
+            return
+
+        self.stdout.write(f"time to first request ({options['path']} -> {profiled['status']}), "
+                          f"median of {len(runs)} runs:")
+        for phase in (*PHASES, 'total'):
+            self.stdout.write(f"  {phase:<11}{timings[phase]:9.1f} ms")
+
+        total_imports = sum(node['cumulative_ms'] for node in profiled['imports'])
+        self.stdout.write(f"\nimports: {total_imports:.1f} ms in {len(set(iter_modules(profiled['imports'])))} modules "
+                          f"(cumulative >= {options['min_ms']} ms, depth {options['depth']})")
+        self.stdout.write(f"{'cumulative':>12} {'self':>11}  module")
+        self._print_tree(profiled['imports'], options['min_ms'], options['depth'])
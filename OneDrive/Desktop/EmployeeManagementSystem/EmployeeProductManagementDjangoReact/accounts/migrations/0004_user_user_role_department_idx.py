@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0003_user_avatar"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["role", "department"], name="user_role_department_idx"
+            ),
+        ),
+    ]
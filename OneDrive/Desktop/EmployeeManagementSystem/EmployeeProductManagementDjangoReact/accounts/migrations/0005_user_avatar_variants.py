@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0004_user_user_role_department_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def departments_from_strings(apps, schema_editor):
+    # 把已有的 department 字符串（可用 "/" 表示层级）转换成部门树
+    User = apps.get_model("accounts", "User")
+    Department = apps.get_model("accounts", "Department")
+    DepartmentClosure = apps.get_model("accounts", "DepartmentClosure")
+
+    nodes = {}
+    for path in (
+        User.objects.exclude(department="")
+        .values_list("department", flat=True)
+        .distinct()
+    ):
+        parent, ancestors = None, []
+        for name in [part.strip() for part in path.split("/") if part.strip()]:
+            key = (parent.pk if parent else None, name)
+            if key not in nodes:
+                node = Department.objects.create(name=name, parent=parent)
+                DepartmentClosure.objects.bulk_create(
+                    [DepartmentClosure(ancestor=node, descendant=node, depth=0)]
+                    + [
+                        DepartmentClosure(
+                            ancestor=ancestor, descendant=node, depth=len(ancestors) - i
+                        )
+                        for i, ancestor in enumerate(ancestors)
+                    ]
+                )
+                nodes[key] = node
+            parent = nodes[key]
+            ancestors.append(parent)
+        if parent:
+            User.objects.filter(department=path).update(department_node=parent)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0007_userdeletionjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Department",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                (
+                    "parent",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="children",
+                        to="accounts.department",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+                "unique_together": {("parent", "name")},
+            },
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="department_node",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="members",
+                to="accounts.department",
+            ),
+        ),
+        migrations.CreateModel(
+            name="DepartmentClosure",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("depth", models.PositiveSmallIntegerField()),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="accounts.department",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="accounts.department",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("ancestor", "descendant")},
+            },
+        ),
+        migrations.RunPython(departments_from_strings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Q, Subquery
+
+
+def assign_tenants(apps, schema_editor):
+    # 雇主的租户是自己；员工归属其参与或管理的项目的雇主
+    User = apps.get_model("accounts", "User")
+    Project = apps.get_model("product", "Project")
+    User.objects.filter(role="employer").update(tenant_id=F("pk"))
+    employers = (
+        Project.objects.filter(Q(members=OuterRef("pk")) | Q(manager=OuterRef("pk")))
+        .order_by("employer")
+        .values("employer")[:1]
+    )
+    User.objects.filter(tenant__isnull=True).exclude(role="employer").update(
+        tenant_id=Subquery(employers)
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0008_department_tree"),
+        ("product", "0003_project_updated_at_projectmember_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="tenant",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="tenant_users",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(assign_tenants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:46
+
+from django.db import migrations, models
+
+
+def rename_duplicate_roots(apps, schema_editor):
+    # 并发创建可能留下同名的顶级部门，保留最早的一个，其余改名后再加约束
+    Department = apps.get_model("accounts", "Department")
+    seen = set()
+    for department in Department.objects.filter(parent__isnull=True).order_by("pk"):
+        if department.name in seen:
+            department.name = f"{department.name} ({department.pk})"[:100]
+            department.save(update_fields=["name"])
+        seen.add(department.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0009_user_tenant"),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_roots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="department",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("parent__isnull", True)),
+                fields=("name",),
+                name="department_root_name_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0010_department_root_name_unique"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="tenant",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="tenant_users",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:59
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def split_departments_by_tenant(apps, schema_editor):
+    """
+    原来各租户共用一棵部门树。按成员的租户拆开：第一个用到某个部门的租户直接认领它，
+    其他租户得到一份同名副本，成员改挂到自己租户的副本上；没有成员的部门保持无租户。
+    历史模型没有 Department.save 里的闭包表维护，拆完后按 parent 重建闭包表。
+    """
+    Department = apps.get_model("accounts", "Department")
+    DepartmentClosure = apps.get_model("accounts", "DepartmentClosure")
+    User = apps.get_model("accounts", "User")
+    departments = {department.pk: department for department in Department.objects.all()}
+    copies = {}
+
+    def copy_for(tenant_id, pk):
+        if (tenant_id, pk) not in copies:
+            original = departments[pk]
+            parent_id = copy_for(tenant_id, original.parent_id) if original.parent_id else None
+            if original.tenant_id is None and original.parent_id == parent_id:
+                original.tenant_id = tenant_id
+                original.save(update_fields=["tenant"])
+                copy = original
+            else:
+                copy = Department.objects.create(name=original.name, parent_id=parent_id, tenant_id=tenant_id)
+            copies[(tenant_id, pk)] = copy.pk
+        return copies[(tenant_id, pk)]
+
+    members = User.objects.filter(department_node__isnull=False, tenant__isnull=False).order_by("pk")
+    for user in members.only("pk", "tenant_id", "department_node_id"):
+        node_id = copy_for(user.tenant_id, user.department_node_id)
+        if node_id != user.department_node_id:
+            User.objects.filter(pk=user.pk).update(department_node_id=node_id)
+
+    children = defaultdict(list)
+    for pk, parent_id in Department.objects.values_list("pk", "parent_id"):
+        children[parent_id].append(pk)
+    links = []
+    pending = [(pk, []) for pk in children[None]]
+    while pending:
+        pk, ancestors = pending.pop()
+        links.append(DepartmentClosure(ancestor_id=pk, descendant_id=pk, depth=0))
+        links += [
+            DepartmentClosure(ancestor_id=ancestor_id, descendant_id=pk, depth=depth)
+            for depth, ancestor_id in enumerate(ancestors, 1)
+        ]
+        pending += [(child, [pk, *ancestors]) for child in children[pk]]
+    DepartmentClosure.objects.all().delete()
+    DepartmentClosure.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0011_user_tenant_protect"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="department",
+            name="department_root_name_unique",
+        ),
+        migrations.AddField(
+            model_name="department",
+            name="tenant",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(split_departments_by_tenant, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="department",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("parent__isnull", True)),
+                fields=("tenant", "name"),
+                name="department_root_name_unique",
+            ),
+        ),
+    ]
@@ -1,7 +1,98 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.db import models, transaction
 
-class CustomUserManager(BaseUserManager):
+from EmployeeProductManagementDjangoReact.tenancy import TenantManager
+
+class DepartmentQuerySet(models.QuerySet):
+    def subtree(self, department_id):
+        # 子树（含自身），任意深度都只是一次闭包表连接
+        return self.filter(ancestor_links__ancestor_id=department_id)
+
+    def for_path(self, path, tenant_id):
+        """在租户的部门树里按 "研发部/后端组" 这样的路径逐级查找或创建部门，返回最末级"""
+        department = None
+        for name in [part.strip() for part in path.split('/') if part.strip()]:
+            department, _ = self.get_or_create(parent=department, name=name, tenant_id=tenant_id)
+        return department
+
+class Department(models.Model):
+    name = models.CharField(max_length=100)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    # 所属租户（雇主），每个租户有自己的部门树
+    tenant = models.ForeignKey(
+        'User', on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+
+    objects = DepartmentQuerySet.as_manager()
+    scoped = TenantManager.from_queryset(DepartmentQuerySet)()
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        old_parent_id = None
+        if self.pk:
+            old_parent_id = Department.objects.filter(pk=self.pk).values_list('parent_id', flat=True).first()
+        is_new = self.pk is None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                self._link_to_ancestors()
+            elif old_parent_id != self.parent_id:
+                self._move_subtree()
+
+    def _link_to_ancestors(self):
+        links = [DepartmentClosure(ancestor=self, descendant=self, depth=0)]
+        if self.parent_id:
+            links += [
+                DepartmentClosure(ancestor_id=ancestor_id, descendant=self, depth=depth + 1)
+                for ancestor_id, depth in DepartmentClosure.objects.filter(
+                    descendant_id=self.parent_id
+                ).values_list('ancestor_id', 'depth')
+            ]
+        DepartmentClosure.objects.bulk_create(links)
+
+    def _move_subtree(self):
+        subtree = list(DepartmentClosure.objects.filter(ancestor=self).values_list('descendant_id', 'depth'))
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+        if self.parent_id in subtree_ids:
+            raise ValueError('不能把部门移动到自己的下级部门')
+        # 断开子树与原祖先的连接，再接到新父部门的所有祖先下
+        DepartmentClosure.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+        if self.parent_id:
+            ancestors = DepartmentClosure.objects.filter(descendant_id=self.parent_id).values_list('ancestor_id', 'depth')
+            DepartmentClosure.objects.bulk_create([
+                DepartmentClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=up + down + 1)
+                for ancestor_id, up in ancestors
+                for descendant_id, down in subtree
+            ])
+
+    class Meta:
+        ordering = ['name']
+        unique_together = ['parent', 'name']
+        constraints = [
+            # unique_together 对 parent 为 NULL 的行不生效，顶级部门单独约束
+            models.UniqueConstraint(
+                fields=['tenant', 'name'], condition=models.Q(parent__isnull=True),
+                name='department_root_name_unique',
+            ),
+        ]
+
+class DepartmentClosure(models.Model):
+    """部门树的闭包表：每对（祖先, 后代）一行，包括自身（depth=0）"""
+    ancestor = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ['ancestor', 'descendant']
+
+class UserQuerySet(models.QuerySet):
+    def in_department(self, department_id):
+        """部门子树下的所有用户"""
+        return self.filter(department_node__ancestor_links__ancestor_id=department_id)
+
+class CustomUserManager(BaseUserManager.from_queryset(UserQuerySet)):
     def create_user(self, username, password=None, **extra_fields):
         if not username:
             raise ValueError('The Username field must be set')
@@ -26,15 +117,84 @@ class User(AbstractUser):
     phone = models.CharField(max_length=30, blank=True)
     address = models.CharField(max_length=30, blank=True)
     department = models.CharField(max_length=30, blank=True)
+    # 部门树中的节点；department 字符串保留为显示名称
+    department_node = models.ForeignKey(
+        Department, on_delete=models.SET_NULL, null=True, blank=True, related_name='members'
+    )
     name = models.CharField(max_length=100, blank=True)
     position = models.CharField(max_length=50, blank=True)
     hire_date = models.DateField(auto_now_add=True)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    # 头像缩略图 {'32': {'webp': 'avatars/<hash>_32.webp', 'jpg': ...}, ...}
+    avatar_variants = models.JSONField(default=dict, blank=True)
+    # 增量同步（/api/sync/）按此字段扫描变更
+    # 所属租户（雇主）；雇主的租户是自己。租户里还有人时不能直接删除雇主，
+    # 删除雇主由后台任务先删除整个租户的数据（见 deletion.py）
+    tenant = models.ForeignKey(
+        'self', on_delete=models.PROTECT, null=True, blank=True, related_name='tenant_users'
+    )
+
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     objects = CustomUserManager()
+    scoped = TenantManager.from_queryset(UserQuerySet)()
 
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # 只填了部门名称、或只改了部门名称没改节点时，挂到本租户部门树里对应的节点上
+        resolve_department = (update_fields is None or 'department' in update_fields) and (
+            (self.department and self.department_node_id is None) or self._department_renamed()
+        )
+        new_tenant = self.role == 'employer' and self.tenant_id is None
+        if resolve_department and not new_tenant:
+            self._resolve_department()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'department_node'}
+        super().save(*args, **kwargs)
+        if new_tenant:
+            # 新雇主保存后才有 id，也就是自己的租户 id
+            self.tenant_id = self.pk
+            fields = ['tenant']
+            if resolve_department:
+                self._resolve_department()
+                fields.append('department_node')
+            super().save(update_fields=fields)
+
+    def _resolve_department(self):
+        self.department_node = Department.objects.for_path(self.department, self.tenant_id) if self.department else None
+
+    def _department_renamed(self):
+        if self.pk is None:
+            return False
+        old = User.objects.filter(pk=self.pk).values_list('department', 'department_node_id').first()
+        return old is not None and old[0] != self.department and old[1] == self.department_node_id
+
     class Meta:
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['role', 'department'], name='user_role_department_idx'),
+        ]
+
+class UserDeletionJob(models.Model):
+    """后台删除用户的进度记录；用户本身最后才删除，所以不用外键"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    user_id = models.BigIntegerField(db_index=True)
+    username = models.CharField(max_length=150)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    # 每一步已删除的行数
+    progress = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"delete {self.username} ({self.status})"
@@ -1,5 +1,7 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import User
+from .avatars import avatar_url
+from .models import Department, User, UserDeletionJob
 from product.models import Project, ProjectMember
 
 class UserSerializer(serializers.ModelSerializer):
@@ -7,11 +9,16 @@ class UserSerializer(serializers.ModelSerializer):
     projects = serializers.SerializerMethodField()
     managed_projects = serializers.SerializerMethodField()
     avatar = serializers.CharField(required=False)
+    avatar_variants = serializers.SerializerMethodField()
+    department_id = serializers.PrimaryKeyRelatedField(
+        source='department_node', queryset=Department.scoped, required=False, allow_null=True
+    )
 
     class Meta:
         model = User
         fields = ('id', 'username', 'password', 'role', 'phone', 'address', 'department',
-                 'name', 'position', 'hire_date', 'is_superuser', 'projects', 'managed_projects','avatar')
+                 'name', 'position', 'hire_date', 'is_superuser', 'projects', 'managed_projects','avatar', 'avatar_variants',
+                 'department_id')
         read_only_fields = ('hire_date', 'is_superuser')
 
     def validate(self, data):
@@ -20,6 +27,9 @@ class UserSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError({'username': 'Username is required for new users'})
             if not data.get('password'):
                 raise serializers.ValidationError({'password': 'Password is required for new users'})
+        # department 字符串与部门树节点保持一致；只改了 department 时由 User.save 在用户的租户里查找节点
+        if data.get('department_node'):
+            data['department'] = data['department_node'].name[:30]
         return data
 
     def create(self, validated_data):
@@ -40,6 +50,15 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+    # 列表/详情查询时预取，序列化时不再逐个用户查询项目
+    @staticmethod
+    def prefetches():
+        return [
+            Prefetch('projectmember_set', queryset=ProjectMember.objects.select_related('project')),
+            # 按 (manager, -StartDate) 排序走复合索引，每个经理的项目仍按开始时间倒序
+            Prefetch('managed_projects', queryset=Project.objects.order_by('manager_id', '-StartDate')),
+        ]
+
     def get_projects(self, obj):
         if obj.role != 'employee':
             return []
@@ -48,7 +67,14 @@ class UserSerializer(serializers.ModelSerializer):
             'name': member.project.ProjectName,
             'role': member.role,
             'status': member.project.Status
-        } for member in ProjectMember.objects.filter(employee=obj)]
+        } for member in obj.projectmember_set.all()]
+
+    def get_avatar_variants(self, obj):
+        # {'32': {'webp': '/api/avatars/avatars/<hash>_32.webp', 'jpg': ...}, ...}
+        return {
+            size: {ext: avatar_url(name) for ext, name in formats.items()}
+            for size, formats in (obj.avatar_variants or {}).items()
+        }
 
     def get_managed_projects(self, obj):
         if obj.role != 'employee':
@@ -57,4 +83,22 @@ class UserSerializer(serializers.ModelSerializer):
             'id': project.ProjectID,
             'name': project.ProjectName,
             'status': project.Status
-        } for project in Project.objects.filter(manager=obj)]
\ No newline at end of file
+        } for project in obj.managed_projects.all()]
+
+class UserDeletionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserDeletionJob
+        fields = ('id', 'user_id', 'username', 'status', 'progress', 'error', 'created_at', 'finished_at')
+
+class DepartmentSerializer(serializers.ModelSerializer):
+    parent = serializers.PrimaryKeyRelatedField(queryset=Department.scoped, required=False, allow_null=True)
+
+    class Meta:
+        model = Department
+        fields = ('id', 'name', 'parent')
+
+    def validate(self, data):
+        parent = data.get('parent')
+        if self.instance and parent and Department.objects.subtree(self.instance.pk).filter(pk=parent.pk).exists():
+            raise serializers.ValidationError({'error': '不能把部门移动到自己的下级部门'})
+        return data
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from EmployeeProductManagementDjangoReact.tenancy import tenant_database
+from .directory import user_changed
+from .models import User
+
+
+def copy_users(users, alias):
+    """把默认库里的用户行写到租户库（已存在则更新），不触发信号"""
+    copies = User.objects.using(alias)
+    for user in users:
+        # 部门树只在默认库
+        values = {field.attname: getattr(user, field.attname) for field in User._meta.concrete_fields}
+        values['department_node_id'] = None
+        if not copies.filter(pk=user.pk).update(**values):
+            copies.bulk_create([User(**values)])
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, using, **kwargs):
+    if using != DEFAULT_DB_ALIAS:
+        return
+    user_changed(instance)
+    alias = tenant_database(instance.tenant_id) if instance.tenant_id else None
+    if alias:
+        copy_users([instance], alias)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, using, **kwargs):
+    if using != DEFAULT_DB_ALIAS:
+        return
+    user_changed(instance, deleted=True)
+    # 删除雇主前会先断开指向自己的 tenant（见 deletion.py），这时雇主自己的 id 就是租户 id
+    alias = tenant_database(instance.tenant_id or instance.pk)
+    if alias:
+        copies = User._base_manager.using(alias).filter(pk=instance.pk)
+        copies.update(tenant=None)
+        copies.delete()
+
+
+@receiver(post_migrate)
+def copy_tenant_users(sender, using, **kwargs):
+    # 给已有的租户新配置独立数据库时，migrate --database 之后把该租户的用户补过去
+    if sender.label != 'accounts':
+        return
+    for tenant_id, alias in settings.TENANT_DATABASES.items():
+        if alias == using:
+            copy_users(User.objects.using(DEFAULT_DB_ALIAS).filter(tenant_id=tenant_id).order_by('pk'), alias)
@@ -0,0 +1,252 @@
+import io
+import os
+import shutil
+import statistics
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from EmployeeProductManagementDjangoReact.media import serve_media
+from EmployeeProductManagementDjangoReact.query_plans import QueryPlanTestCase
+from EmployeeProductManagementDjangoReact.tenancy import tenant_context
+from notification.models import Notification, NotificationRecipient
+from sync.models import Tombstone
+from . import directory
+from .deletion import purge_user
+from .management.commands.profile_startup import iter_modules, measure_startup
+from product.models import Project, ProjectMember
+from .models import Department, User, UserDeletionJob
+
+# Create your tests here.
+
+class UserListQueryPlanTests(QueryPlanTestCase):
+    def setUp(self):
+        self.user_ids = list(User.objects.values_list('pk', flat=True)[:50])
+
+    def test_user_list(self):
+        self.assertQueryPlan('user_list', User.objects.all()[:50])
+
+    def test_user_projects_prefetch(self):
+        # UserSerializer.prefetches() 的两条预取查询
+        self.assertQueryPlan(
+            'user_projects_prefetch',
+            ProjectMember.objects.filter(employee__in=self.user_ids).select_related('project'),
+        )
+
+    def test_user_managed_projects_prefetch(self):
+        self.assertQueryPlan(
+            'user_managed_projects_prefetch',
+            Project.objects.filter(manager__in=self.user_ids).order_by('manager_id', '-StartDate'),
+        )
+
+
+class DirectoryTests(TestCase):
+    def setUp(self):
+        directory._directories.clear()
+        self.employer = User.objects.create_user(username='dir_boss', password='x', role='employer')
+        self.user = User.objects.create_user(
+            username='alice', password='x', role='employee', avatar='avatars/a.jpg', tenant=self.employer,
+        )
+
+    def _other_process(self):
+        # 模拟另一个 worker 的修改：不经过本进程的信号，只改数据库
+        directory.directory_for('default').checked_at = None
+
+    def _autocomplete(self, prefix):
+        with tenant_context(self.employer.pk):
+            return directory.autocomplete(prefix)
+
+    def test_sees_changes_made_by_other_processes(self):
+        avatar = self._autocomplete('ali')[0]['avatar']
+        self.assertEqual(avatar, '/api/avatars/avatars/a.jpg')
+        self.assertEqual(resolve(avatar).func, serve_media)
+        User.objects.filter(pk=self.user.pk).update(username='bob', updated_at=timezone.now())
+        self._other_process()
+        self.assertEqual(self._autocomplete('ali'), [])
+        self.assertEqual([row['id'] for row in self._autocomplete('bob')], [self.user.pk])
+
+    def test_removes_users_deleted_by_other_processes(self):
+        self._autocomplete('ali')
+        Tombstone.objects.create(model='user', object_id=self.user.pk)
+        self._other_process()
+        self.assertEqual(self._autocomplete('ali'), [])
+
+    def test_only_returns_users_of_the_current_tenant(self):
+        other = User.objects.create_user(username='other_boss', password='x', role='employer')
+        User.objects.create_user(username='alicia', password='x', role='employee', tenant=other)
+        self.assertEqual(directory.autocomplete('ali'), [])
+        self.assertEqual([row['username'] for row in self._autocomplete('ali')], ['alice'])
+        with tenant_context(other.pk):
+            self.assertEqual([row['username'] for row in directory.autocomplete('ali')], ['alicia'])
+
+
+class AvatarTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root, BACKGROUND_TASKS_EAGER=True)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='avatar_user', password='x', role='employer')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+
+    def _upload(self, color):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (300, 200), color).save(buffer, 'PNG')
+        upload = SimpleUploadedFile('avatar.png', buffer.getvalue(), content_type='image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/auth/{self.user.pk}/upload_avatar/', {'avatar': upload})
+        self.assertEqual(response.status_code, 200, response.content)
+        return self.client.get(f'/api/auth/{self.user.pk}/').json()['avatar_variants']
+
+    def _serve(self, url):
+        # 路由里的 document_root 是启动时的 MEDIA_ROOT，这里换成测试用的目录
+        match = resolve(url)
+        self.assertEqual(match.func, serve_media)
+        kwargs = {**match.kwargs, 'document_root': settings.MEDIA_ROOT}
+        return match.func(RequestFactory().get(url), **kwargs)
+
+    def test_variant_urls_are_served_and_replaced_files_are_removed(self):
+        variants = self._upload('red')
+        self.assertEqual(set(variants), {'32', '64', '256'})
+        urls = [url for formats in variants.values() for url in formats.values()]
+        self.assertEqual(len(urls), 6)
+        for url in urls:
+            self.assertTrue(url.startswith('/api/avatars/avatars/'), url)
+            self.assertEqual(self._serve(url).status_code, 200, url)
+
+        # 换一张图后，没有人再引用的旧文件由 discard_avatar_files 删除
+        self._upload('blue')
+        for url in urls:
+            self.assertFalse(default_storage.exists(resolve(url).kwargs['path']), url)
+
+
+class DepartmentTests(TestCase):
+    def setUp(self):
+        self.employer = User.objects.create_user(username='dept_boss', password='x', role='employer')
+
+    def test_root_names_are_unique_per_tenant(self):
+        root = Department.objects.for_path('研发部', self.employer.pk)
+        self.assertEqual(Department.objects.for_path('研发部/后端组', self.employer.pk).parent, root)
+        other = User.objects.create_user(username='dept_other', password='x', role='employer', department='研发部')
+        self.assertNotEqual(other.department_node, root)
+        self.assertEqual(other.department_node.tenant_id, other.pk)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Department.objects.create(name='研发部', tenant=self.employer)
+
+    def test_changing_department_moves_user_to_new_node(self):
+        user = User.objects.create_user(
+            username='dept_user', password='x', role='employee', department='研发部', tenant=self.employer,
+        )
+        user.department = '市场部'
+        user.save()
+        user.refresh_from_db()
+        self.assertEqual(user.department_node, Department.objects.get(name='市场部', tenant=self.employer))
+
+        # 同时指定了节点时以节点为准
+        node = Department.objects.for_path('研发部/后端组', self.employer.pk)
+        user.department, user.department_node = '后端组', node
+        user.save(update_fields=['department', 'department_node'])
+        user.refresh_from_db()
+        self.assertEqual(user.department_node, node)
+
+    def test_departments_api_is_scoped_to_tenant(self):
+        own = Department.objects.for_path('研发部', self.employer.pk)
+        other = User.objects.create_user(username='dept_other', password='x', role='employer', department='市场部')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.employer).key)
+        self.assertEqual([d['id'] for d in client.get('/api/departments/').json()], [own.pk])
+        self.assertEqual(client.get(f'/api/departments/{other.department_node_id}/').status_code, 404)
+        response = client.post('/api/departments/', {'name': '后端组', 'parent': other.department_node_id})
+        self.assertEqual(response.status_code, 400)
+        response = client.post('/api/departments/', {'name': '后端组', 'parent': own.pk})
+        self.assertEqual(Department.objects.get(pk=response.json()['id']).tenant_id, self.employer.pk)
+
+
+class UserDeletionTests(TestCase):
+    def test_deleting_employer_removes_tenant(self):
+        employer = User.objects.create_user(username='del_boss', password='x', role='employer')
+        employee = User.objects.create_user(username='del_emp', password='x', role='employee', tenant=employer)
+        project = Project.objects.create(
+            ProjectName='p', StartDate=timezone.now().date(), EndDate=timezone.now().date(), employer=employer,
+        )
+        ProjectMember.objects.create(project=project, employee=employee, role='developer')
+        # 员工发给雇主的通知，只通过 tenant 关联到雇主
+        notification = Notification.objects.create(
+            Message='hi', NotificationType='info', Sender=employee, tenant_id=employer.pk,
+        )
+        NotificationRecipient.objects.create(notification=notification, recipient=employer)
+        job = UserDeletionJob.objects.create(user_id=employer.pk, username=employer.username)
+
+        purge_user(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done', job.error)
+        self.assertEqual(job.progress['tenant_users'], 1)
+        self.assertFalse(User.objects.filter(pk__in=[employer.pk, employee.pk]).exists())
+        self.assertFalse(Notification.objects.exists())
+        self.assertTrue(Tombstone.objects.filter(model='notification', object_id=notification.pk).exists())
+
+
+    def _delete(self, actor, target):
+        client = APIClient()
+        client.force_authenticate(actor)
+        return client.delete(f'/api/auth/{target.pk}/')
+
+    def test_only_self_or_own_employer_can_delete(self):
+        employer = User.objects.create_user(username='del_boss', password='x', role='employer')
+        employee = User.objects.create_user(username='del_emp', password='x', role='employee', tenant=employer)
+        coworker = User.objects.create_user(username='del_mate', password='x', role='employee', tenant=employer)
+        other = User.objects.create_user(username='other_boss', password='x', role='employer')
+        outsider = User.objects.create_user(username='other_emp', password='x', role='employee', tenant=other)
+
+        self.assertEqual(self._delete(employee, employer).status_code, 403)
+        self.assertEqual(self._delete(employee, coworker).status_code, 403)
+        self.assertEqual(self._delete(other, employee).status_code, 403)
+        self.assertEqual(self._delete(employer, outsider).status_code, 403)
+        self.assertFalse(UserDeletionJob.objects.exists())
+        self.assertTrue(User.objects.get(pk=employer.pk).is_active)
+
+        self.assertEqual(self._delete(employer, employee).status_code, 202)
+        self.assertEqual(self._delete(coworker, coworker).status_code, 202)
+        self.assertEqual(
+            set(UserDeletionJob.objects.values_list('user_id', flat=True)), {employee.pk, coworker.pk},
+        )
+
+
+class StartupTests(SimpleTestCase):
+    """新 worker 的启动耗时和延迟加载的模块"""
+    # 这些模块只在对应路径第一次被访问时加载
+    lazy_modules = (
+        'PIL',
+        'EmployeeProductManagementDjangoReact.batch',
+        'EmployeeProductManagementDjangoReact.db_pool',
+        'django.contrib.auth.admin',
+        'rest_framework.authtoken.admin',
+    )
+
+    # 耗时取决于机器，只在显式给出预算（如固定规格的 CI 机器）时检查
+    @unittest.skipUnless('STARTUP_BUDGET_MS' in os.environ, 'set STARTUP_BUDGET_MS to check the startup budget')
+    def test_time_to_first_request_within_budget(self):
+        budget_ms = float(os.environ['STARTUP_BUDGET_MS'])
+        total = statistics.median(measure_startup()['timings']['total'] for _ in range(3))
+        self.assertLessEqual(total, budget_ms, f'time to first request {total:.0f} ms')
+
+    def test_rarely_used_modules_are_not_imported_at_startup(self):
+        modules = set(iter_modules(measure_startup(importtime=True)['imports']))
+        self.assertEqual(modules & set(self.lazy_modules), set())
+
+    def test_lazy_admin_urls_resolve(self):
+        self.assertEqual(reverse('admin:index'), '/admin/')
@@ -3,21 +3,52 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import PermissionDenied
 from django.contrib.auth import authenticate
-from .serializers import UserSerializer
-from .models import User
+from django.shortcuts import get_object_or_404
+from .serializers import DepartmentSerializer, UserDeletionJobSerializer, UserSerializer
+from .models import Department, User, UserDeletionJob
+from .authentication import bind_tenant
+from .deletion import request_deletion
+from . import directory
+from .avatars import InvalidAvatar, avatar_files, discard_avatar_files, process_avatar, store_upload
+from EmployeeProductManagementDjangoReact.compression import exclude_from_compression
+from EmployeeProductManagementDjangoReact.tasks import run_in_background
+from EmployeeProductManagementDjangoReact.tenancy import get_current_tenant
+from idempotency.decorators import idempotent
+from product.views import IsEmployerOrReadOnly, parse_department
 import logging
 
 logger = logging.getLogger(__name__)
 
+class CanDeleteUser(permissions.BasePermission):
+    message = '只能删除自己的账号或本租户的员工'
+
+    def has_object_permission(self, request, view, obj):
+        # 删除雇主会清空整个租户：除了管理员，只有雇主本人可以
+        user = request.user
+        if user.is_staff or obj.pk == user.pk:
+            return True
+        return user.role == 'employer' and obj.role == 'employee' and obj.tenant_id == user.pk
+
 class AuthViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        queryset = User.scoped.prefetch_related(*UserSerializer.prefetches())
+        department = self.request.query_params.get('department')
+        if department and self.action == 'list':
+            # 部门及其所有下级部门的员工
+            queryset = queryset.in_department(parse_department(department))
+        return queryset
+
     def get_permissions(self):
         if self.action in ['login', 'create']:
             return [AllowAny()]
+        if self.action == 'destroy':
+            return [*super().get_permissions(), CanDeleteUser()]
         return super().get_permissions()
 
     @action(detail=False, methods=['post'])
@@ -25,12 +56,14 @@ class AuthViewSet(viewsets.ModelViewSet):
         username = request.data.get('username')
         password = request.data.get('password')
         
-        logger.info(f"Login attempt for user: {username}")
+        logger.info("Login attempt for user: %s", username)
         
         user = authenticate(username=username, password=password)
-        logger.info(f"Authentication result for {username}: {'success' if user else 'failed'}")
+        logger.info("Authentication result for %s: %s", username, 'success' if user else 'failed')
         
         if user:
+            if not bind_tenant(user):
+                return Response({'error': '用户不属于该租户'}, status=status.HTTP_403_FORBIDDEN)
             token, _ = Token.objects.get_or_create(user=user)
             serializer = UserSerializer(user)
             data = serializer.data
@@ -40,10 +73,10 @@ class AuthViewSet(viewsets.ModelViewSet):
                 'role': user.role,
                 'username': user.username
             })
-            logger.info(f"Login successful for user: {username}")
-            return Response(data)
+            logger.info("Login successful for user: %s", username)
+            return exclude_from_compression(Response(data))
             
-        logger.warning(f"Invalid credentials for user: {username}")
+        logger.warning("Invalid credentials for user: %s", username)
         return Response(
             {'error': 'Invalid credentials'},
             status=status.HTTP_400_BAD_REQUEST
@@ -60,14 +93,36 @@ class AuthViewSet(viewsets.ModelViewSet):
             return Response({'status': 'password changed'})
         return Response({'error': 'new password required'}, status=400)
 
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            return Response([])
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            limit = 10
+        role = request.query_params.get('role')
+        return Response(directory.autocomplete(q, limit, role))
+
     @action(detail=False, methods=['get'])
     def profile(self, request):
         user = request.user
         serializer = self.get_serializer(user)
         return Response(serializer.data)
 
+    def perform_create(self, serializer):
+        # 新雇主自成一个租户；新员工归入创建者（已登录用户）的租户，匿名注册不能自行加入租户
+        if serializer.validated_data.get('role') == 'employer':
+            serializer.save()
+        elif self.request.user.is_authenticated:
+            serializer.save(tenant_id=get_current_tenant())
+        else:
+            raise PermissionDenied("员工账号需要由雇主创建")
+
+    @idempotent
     def create(self, request, *args, **kwargs):
-        logger.info(f"Creating user with data: {request.data}")
+        logger.info("Creating user with data: %s", request.data)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
@@ -75,7 +130,7 @@ class AuthViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def update(self, request, *args, **kwargs):
-        logger.info(f"Updating user with data: {request.data}")
+        logger.info("Updating user with data: %s", request.data)
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
@@ -83,6 +138,21 @@ class AuthViewSet(viewsets.ModelViewSet):
         self.perform_update(serializer)
         return Response(serializer.data)
 
+    def destroy(self, request, *args, **kwargs):
+        # 不限租户查找，别的租户的账号返回 403 而不是当作不存在
+        user = get_object_or_404(User, pk=kwargs['pk'])
+        self.check_object_permissions(request, user)
+        # 立即停用，关联数据由后台任务分批删除，进度见 deletion_jobs/<id>/
+        job = request_deletion(user, request.user)
+        return Response(UserDeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'deletion_jobs/(?P<job_id>[0-9]+)')
+    def deletion_job(self, request, job_id=None):
+        job = UserDeletionJob.objects.filter(pk=job_id).first()
+        if job is None or (job.requested_by_id != request.user.pk and not request.user.is_staff):
+            return Response({'error': '删除任务不存在'}, status=404)
+        return Response(UserDeletionJobSerializer(job).data)
+
     @action(detail=True, methods=['post'])
     def upload_avatar(self, request, pk=None):
         user = request.user
@@ -91,8 +161,36 @@ class AuthViewSet(viewsets.ModelViewSet):
         if not avatar:
             return Response({'error': '请选择要上传的头像'}, status=400)
             
-        user.avatar = avatar
+        try:
+            name = store_upload(avatar)
+        except InvalidAvatar as e:
+            return Response({'error': str(e)}, status=400)
+
+        # 上一次上传可能刚在后台处理完，按数据库里的头像确定要替换的文件
+        user.refresh_from_db(fields=['avatar', 'avatar_variants'])
+        superseded = avatar_files(user)
+        user.avatar = name
+        user.avatar_variants = {}
         user.save()
+        # 缩略图和去除元数据在后台线程完成，旧头像的文件没人引用时删除
+        run_in_background(process_avatar, user.pk, name)
+        run_in_background(discard_avatar_files, superseded)
         
         serializer = self.get_serializer(user)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+class DepartmentViewSet(viewsets.ModelViewSet):
+    queryset = Department.objects.all()
+    serializer_class = DepartmentSerializer
+    permission_classes = [permissions.IsAuthenticated, IsEmployerOrReadOnly]
+
+    def get_queryset(self):
+        return Department.scoped.all()
+
+    def perform_create(self, serializer):
+        serializer.save(tenant_id=get_current_tenant())
+
+    @action(detail=True, methods=['get'])
+    def subtree(self, request, pk=None):
+        departments = Department.scoped.subtree(self.get_object().pk)
+        return Response(self.get_serializer(departments, many=True).data)
@@ -0,0 +1,144 @@
+"""
+审计记录的内存缓冲区。
+
+请求线程在事务提交后把 AuditEvent 放进有界队列，后台线程按批 bulk_create，
+不给写请求增加额外的插入延迟：
+- 队列满时最多等待 AUDIT_ENQUEUE_TIMEOUT 秒（背压），仍然满就在调用线程里直接写入，不丢记录；
+- 写入失败时重试 AUDIT_FLUSH_RETRIES 次，仍失败才记错误日志；
+- 进程退出时（atexit）停止后台线程并写完队列里剩余的记录。
+AUDIT_EAGER=True 时不经过队列，提交后同步写入（开发和测试用）。
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class AuditBuffer:
+    def __init__(self, size=10000, batch_size=500, flush_interval=1.0, enqueue_timeout=0.5, retries=3):
+        self.queue = queue.Queue(size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.retries = retries
+        # 队列满时改为同步写入的条数
+        self.overflowed = 0
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def _ensure_thread(self):
+        # fork 出的 worker 进程里后台线程不存在，需要重新启动
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name='audit-flusher', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def put(self, using, event):
+        self._ensure_thread()
+        try:
+            self.queue.put((using, event), timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.overflowed += 1
+            logger.warning("Audit buffer full, writing event synchronously")
+            self._write([(using, event)])
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._write(batch)
+                    return
+                batch.append(item)
+            self._write(batch)
+            connections.close_all()
+
+    def _write(self, batch):
+        by_database = defaultdict(list)
+        for using, event in batch:
+            by_database[using].append(event)
+        for using, events in by_database.items():
+            for attempt in range(1, self.retries + 1):
+                try:
+                    AuditEvent.objects.using(using).bulk_create(events, batch_size=self.batch_size)
+                    break
+                except Exception:
+                    if attempt == self.retries:
+                        logger.exception("Failed to write %d audit events to %s", len(events), using)
+                    else:
+                        time.sleep(0.1 * 2 ** attempt)
+
+    def flush(self):
+        """在调用线程里写完队列中当前的记录"""
+        batch = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        if batch:
+            self._write(batch)
+
+    def stop(self):
+        if self._thread is not None and self._pid == os.getpid():
+            try:
+                self.queue.put(_STOP, timeout=10)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=10)
+            self._thread = None
+            self._pid = None
+        self.flush()
+
+
+_buffer = None
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        _buffer = AuditBuffer(
+            size=getattr(settings, 'AUDIT_BUFFER_SIZE', 10000),
+            batch_size=getattr(settings, 'AUDIT_BATCH_SIZE', 500),
+            flush_interval=getattr(settings, 'AUDIT_FLUSH_INTERVAL', 1.0),
+            enqueue_timeout=getattr(settings, 'AUDIT_ENQUEUE_TIMEOUT', 0.5),
+            retries=getattr(settings, 'AUDIT_FLUSH_RETRIES', 3),
+        )
+    return _buffer
+
+
+def record(event, using):
+    """事务提交后把审计记录交给缓冲区；事务回滚则不记录"""
+    if getattr(settings, 'AUDIT_EAGER', False):
+        transaction.on_commit(lambda: event.save(using=using), using=using)
+        return
+    transaction.on_commit(lambda: get_buffer().put(using, event), using=using)
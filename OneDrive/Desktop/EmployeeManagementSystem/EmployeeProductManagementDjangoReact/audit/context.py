@@ -0,0 +1,48 @@
+"""
+当前操作者保存在 contextvar 里：Token 认证成功后设置，AuditContextMiddleware 在请求结束时恢复。
+管理命令、后台任务里没有操作者，记录的 actor 为空。
+"""
+import contextvars
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+_current_actor = contextvars.ContextVar('audit_actor', default=None)
+
+
+def get_actor():
+    return _current_actor.get()
+
+
+def set_actor(user):
+    return _current_actor.set(user)
+
+
+@contextmanager
+def actor_context(user):
+    token = _current_actor.set(user)
+    try:
+        yield
+    finally:
+        _current_actor.reset(token)
+
+
+class AuditContextMiddleware:
+    """请求结束后清掉操作者，避免线程复用时记到别人头上"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with actor_context(None):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with actor_context(None):
+            return await self.get_response(request)
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+# Create your models here.
+
+class AuditEvent(models.Model):
+    """只追加的审计记录，由 audit.buffer 在后台批量写入"""
+    ACTION_CHOICES = (
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+        ('password_change', 'Password change'),
+    )
+    # 被删除的用户的审计记录也要保留，所以不加数据库外键约束
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    actor_name = models.CharField(max_length=150, blank=True)
+    tenant_id = models.BigIntegerField(null=True, blank=True)
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    # create/delete 为 {字段: 值}，update 为 {字段: [旧值, 新值]}
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    # 变更发生的时间，而不是写入时间
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.action} {self.model}#{self.object_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('审计记录不可修改')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('审计记录不可删除')
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['actor', '-created_at'], name='audit_actor_idx'),
+            models.Index(fields=['model', 'object_id', '-created_at'], name='audit_object_idx'),
+            models.Index(fields=['tenant_id', '-created_at'], name='audit_tenant_idx'),
+        ]
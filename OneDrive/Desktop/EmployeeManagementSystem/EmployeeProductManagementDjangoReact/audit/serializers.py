@@ -0,0 +1,7 @@
+from rest_framework import serializers
+from .models import AuditEvent
+
+class AuditEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditEvent
+        fields = ['id', 'actor', 'actor_name', 'action', 'model', 'object_id', 'changes', 'created_at']
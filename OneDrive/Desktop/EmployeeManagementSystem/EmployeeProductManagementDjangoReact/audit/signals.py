@@ -0,0 +1,94 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from EmployeeProductManagementDjangoReact.tenancy import get_current_tenant
+from product.models import Project, ProjectMember
+
+from .buffer import record
+from .context import get_actor
+from .models import AuditEvent
+
+# 模型 -> (审计记录中的名字, 记录的字段)；updated_at、last_login 这类字段不记录
+AUDITED_MODELS = {
+    User: ('user', (
+        'username', 'name', 'role', 'department', 'position',
+        'is_active', 'is_staff', 'is_superuser', 'password',
+    )),
+    Project: ('project', (
+        'ProjectName', 'StartDate', 'EndDate', 'Status', 'manager_id', 'employer_id',
+    )),
+    ProjectMember: ('project_member', ('project_id', 'employee_id', 'role')),
+}
+# 只记录“改过了”，不记录值
+REDACTED_FIELDS = {'password'}
+REDACTED = '***'
+
+
+def _snapshot(instance, fields):
+    # only()/defer() 没加载的字段不在 __dict__ 里，跳过
+    return {name: instance.__dict__[name] for name in fields if name in instance.__dict__}
+
+
+def _display(name, value):
+    return REDACTED if name in REDACTED_FIELDS else value
+
+
+def _tenant_of(instance):
+    tenant_id = get_current_tenant()
+    if tenant_id is None:
+        tenant_id = getattr(instance, 'tenant_id', None) or getattr(instance, 'employer_id', None)
+    return tenant_id
+
+
+def _record(instance, action, changes, using):
+    actor = get_actor()
+    event = AuditEvent(
+        actor_id=actor.pk if actor else None,
+        actor_name=actor.username if actor else '',
+        tenant_id=_tenant_of(instance),
+        action=action,
+        model=AUDITED_MODELS[type(instance)][0],
+        object_id=instance.pk,
+        changes=changes,
+    )
+    record(event, using)
+
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=Project)
+@receiver(post_init, sender=ProjectMember)
+def remember_loaded(sender, instance, **kwargs):
+    # 加载时记下原值，保存时比较差异，不需要额外查询
+    instance._audit_snapshot = _snapshot(instance, AUDITED_MODELS[sender][1])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ProjectMember)
+def audit_saved(sender, instance, created, using, update_fields=None, **kwargs):
+    fields = AUDITED_MODELS[sender][1]
+    current = _snapshot(instance, fields)
+    if created:
+        _record(instance, 'create', {name: _display(name, value) for name, value in current.items()}, using)
+    else:
+        before = getattr(instance, '_audit_snapshot', {})
+        changed = [
+            name for name, value in current.items()
+            if name in before and before[name] != value
+            and (update_fields is None or name in update_fields or name.removesuffix('_id') in update_fields)
+        ]
+        if changed:
+            action = 'password_change' if changed == ['password'] else 'update'
+            _record(instance, action, {
+                name: [_display(name, before[name]), _display(name, current[name])] for name in changed
+            }, using)
+    instance._audit_snapshot = current
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=ProjectMember)
+def audit_deleted(sender, instance, using, **kwargs):
+    current = _snapshot(instance, AUDITED_MODELS[sender][1])
+    _record(instance, 'delete', {name: _display(name, value) for name, value in current.items()}, using)
@@ -0,0 +1,88 @@
+import threading
+from datetime import date, timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .buffer import AuditBuffer
+from .models import AuditEvent
+
+# Create your tests here.
+
+def _event(object_id):
+    return AuditEvent(action='create', model='project', object_id=object_id)
+
+
+class AuditBufferThreadTests(SimpleTestCase):
+    """后台线程的批量、定时和退出时写入；_write 换成记录批次，不碰数据库"""
+
+    def setUp(self):
+        self.batches = []
+        self.written = threading.Event()
+        patcher = mock.patch.object(AuditBuffer, '_write', autospec=True, side_effect=self._write)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write(self, buffer, batch):
+        self.batches.append([event.object_id for _, event in batch])
+        self.written.set()
+
+    def test_writes_in_batches_and_flushes_on_stop(self):
+        buffer = AuditBuffer(batch_size=3, flush_interval=0.05)
+        self.addCleanup(buffer.stop)
+        # 线程启动前放好，批次划分是确定的
+        for object_id in range(7):
+            buffer.queue.put(('default', _event(object_id)))
+        buffer._ensure_thread()
+        buffer.stop()
+        self.assertEqual(self.batches, [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertIsNone(buffer._thread)
+
+    def test_partial_batch_is_written_without_waiting_for_more(self):
+        buffer = AuditBuffer(batch_size=100, flush_interval=0.05)
+        self.addCleanup(buffer.stop)
+        buffer.put('default', _event(1))
+        self.assertTrue(self.written.wait(2))
+        self.assertEqual(self.batches, [[1]])
+        self.assertTrue(buffer._thread.is_alive())
+
+    def test_full_queue_writes_in_the_calling_thread(self):
+        buffer = AuditBuffer(size=1, enqueue_timeout=0.01)
+        with mock.patch.object(AuditBuffer, '_ensure_thread'), self.assertLogs('audit.buffer', 'WARNING'):
+            buffer.put('default', _event(1))
+            buffer.put('default', _event(2))
+        self.assertEqual((self.batches, buffer.overflowed), ([[2]], 1))
+        buffer.stop()
+        self.assertEqual(self.batches, [[2], [1]])
+
+
+class AuditRecordTests(TestCase):
+    def setUp(self):
+        self.employer = User.objects.create_user(username='audit_boss', password='x', role='employer')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.employer).key)
+
+    def test_request_changes_are_recorded_with_the_actor(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/projects/', {
+                'ProjectName': '审计项目', 'StartDate': date.today(), 'EndDate': date.today() + timedelta(days=30),
+                'Status': 'active', 'employer': self.employer.pk,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        event = AuditEvent.objects.get(model='project')
+        self.assertEqual((event.action, event.object_id), ('create', response.json()['ProjectID']))
+        self.assertEqual((event.actor_id, event.actor_name), (self.employer.pk, 'audit_boss'))
+        self.assertEqual(event.tenant_id, self.employer.pk)
+        self.assertEqual(event.changes['ProjectName'], '审计项目')
+
+    def test_buffered_events_are_persisted_on_flush(self):
+        buffer = AuditBuffer()
+        event = _event(42)
+        event.actor_id, event.actor_name = self.employer.pk, self.employer.username
+        buffer.queue.put(('default', event))
+        buffer.flush()
+        stored = AuditEvent.objects.get(object_id=42)
+        self.assertEqual((stored.actor_id, stored.actor_name), (self.employer.pk, 'audit_boss'))
@@ -0,0 +1,66 @@
+from django.utils.dateparse import parse_datetime
+from rest_framework import permissions, viewsets
+from rest_framework.exceptions import ValidationError
+
+from .models import AuditEvent
+from .serializers import AuditEventSerializer
+
+MAX_LIMIT = 200
+
+
+class IsEmployerOrStaff(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_staff or request.access.is_employer
+
+
+def _parse_int(params, name):
+    try:
+        return int(params[name])
+    except ValueError:
+        raise ValidationError({'error': f'{name} must be an integer'})
+
+
+def _parse_time(params, name):
+    try:
+        value = parse_datetime(params[name])
+    except ValueError:
+        value = None
+    if value is None:
+        raise ValidationError({'error': f'{name} must be an ISO 8601 datetime'})
+    return value
+
+
+class AuditEventViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    审计记录查询，可按 actor、model + object_id、action、since/until 过滤（都走索引），
+    按时间倒序返回最多 limit 条；翻页时把上一页最后一条的 created_at 作为 until。
+    """
+    queryset = AuditEvent.objects.all()
+    serializer_class = AuditEventSerializer
+    permission_classes = [permissions.IsAuthenticated, IsEmployerOrStaff]
+
+    def get_queryset(self):
+        queryset = AuditEvent.objects.all()
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(tenant_id=self.request.user.tenant_id)
+        if self.action != 'list':
+            return queryset
+
+        params = self.request.query_params
+        if 'actor' in params:
+            queryset = queryset.filter(actor_id=_parse_int(params, 'actor'))
+        if 'model' in params:
+            queryset = queryset.filter(model=params['model'])
+        if 'object_id' in params:
+            if 'model' not in params:
+                raise ValidationError({'error': 'object_id requires model'})
+            queryset = queryset.filter(object_id=_parse_int(params, 'object_id'))
+        if 'action' in params:
+            queryset = queryset.filter(action=params['action'])
+        if 'since' in params:
+            queryset = queryset.filter(created_at__gte=_parse_time(params, 'since'))
+        if 'until' in params:
+            queryset = queryset.filter(created_at__lt=_parse_time(params, 'until'))
+
+        limit = _parse_int(params, 'limit') if 'limit' in params else 50
+        return queryset[:max(1, min(limit, MAX_LIMIT))]
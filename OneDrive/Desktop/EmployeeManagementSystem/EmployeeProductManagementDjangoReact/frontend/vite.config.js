@@ -2,7 +2,9 @@ import { defineConfig } from 'vite'
 import react from '@vitejs/plugin-react'
 
 // https://vitejs.dev/config/
-export default defineConfig({
+export default defineConfig(({ command }) => ({
+  // 生产构建由 Django 的 collectstatic 收集，资源地址在 /static/ 下
+  base: command === 'build' ? '/static/' : '/',
   plugins: [react()],
   server: {
     port: 3000,
@@ -13,4 +15,4 @@ export default defineConfig({
       },
     },
   },
-})
+}))
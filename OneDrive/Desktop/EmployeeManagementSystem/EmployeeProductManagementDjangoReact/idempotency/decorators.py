@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http.request import RawPostDataException
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+POLL_INTERVAL = 0.1
+
+
+def request_fingerprint(request):
+    try:
+        body = request.body
+    except RawPostDataException:
+        body = repr(sorted(request.data.items())).encode()
+    return hashlib.sha256(body).hexdigest()
+
+
+def _expired(now):
+    return Q(created_at__lt=now - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)) | Q(
+        status_code__isnull=True,
+        created_at__lt=now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT),
+    )
+
+
+def _claim(scope, key, fingerprint):
+    """插入一条处理中的记录；已存在则返回已有记录。返回 (记录, 是否由本请求创建)"""
+    now = timezone.now()
+    # 过期的记录和处理者已经崩溃的记录都可以被接管
+    IdempotencyKey.objects.filter(_expired(now), scope=scope, key=key).delete()
+    while True:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(scope=scope, key=key, request_hash=fingerprint), True
+        except IntegrityError:
+            pass
+        try:
+            return IdempotencyKey.objects.get(scope=scope, key=key), False
+        except IdempotencyKey.DoesNotExist:
+            continue
+
+
+def _wait_for(record):
+    """并发的重复请求等第一个请求完成，而不是再做一遍"""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        try:
+            record.refresh_from_db(fields=['status_code', 'response'])
+        except IdempotencyKey.DoesNotExist:
+            # 第一个请求失败并释放了 key
+            return None
+        if record.completed:
+            return record
+    return record
+
+
+def _replay(record):
+    return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def _owner(request, fingerprint):
+    """
+    key 的归属。匿名请求（注册）没有用户可区分，按请求体区分：别的客户端恰好用了同一个 key
+    也拿不到这次的响应，只有请求体完全相同的重试才会重放
+    """
+    if request.user.is_authenticated:
+        return str(request.user.pk)
+    return f"anonymous-{fingerprint[:32]}"
+
+
+def idempotent(view_method):
+    """让视图方法支持 Idempotency-Key 请求头：相同的 key 只执行一次，重试返回缓存的响应"""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'error': f'{HEADER} is too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        scope = f"{_owner(request, fingerprint)}:{request.method}:{request.path}"[:255]
+        record, created = _claim(scope, key, fingerprint)
+
+        if not created:
+            if record.request_hash != fingerprint:
+                return Response(
+                    {'error': f'{HEADER} was already used with a different request body'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if not record.completed:
+                record = _wait_for(record)
+                if record is None:
+                    return wrapper(self, request, *args, **kwargs)
+                if not record.completed:
+                    return Response(
+                        {'error': f'a request with this {HEADER} is still in progress'},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+            logger.info("Replaying idempotent response for %s", scope)
+            return _replay(record)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            # 失败的请求不占用 key，客户端可以用同一个 key 重试
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+            return response
+        record.status_code = response.status_code
+        record.response = response.data
+        record.save(update_fields=['status_code', 'response'])
+        return response
+    return wrapper
+
+
+class IdempotentCreateMixin:
+    """给 ModelViewSet 的 create 加上 Idempotency-Key 支持"""
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
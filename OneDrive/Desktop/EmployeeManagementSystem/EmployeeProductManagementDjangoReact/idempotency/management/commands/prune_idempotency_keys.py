@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from idempotency.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = '删除超过保留期的 Idempotency-Key 记录'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'已删除 {deleted} 条记录'))
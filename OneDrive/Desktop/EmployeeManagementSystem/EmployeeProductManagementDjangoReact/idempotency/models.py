@@ -0,0 +1,25 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+# Create your models here.
+
+class IdempotencyKey(models.Model):
+    """记录带 Idempotency-Key 的写请求及其响应，重试时直接返回第一次的结果"""
+    # 用户（匿名请求为请求体哈希）+ 方法 + 路径，同一个 key 在不同接口上互不影响
+    scope = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    # 为空表示第一次请求仍在处理
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
+    @property
+    def completed(self):
+        return self.status_code is not None
+
+    class Meta:
+        unique_together = ['scope', 'key']
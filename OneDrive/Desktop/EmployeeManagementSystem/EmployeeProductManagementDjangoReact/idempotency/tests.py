@@ -0,0 +1,108 @@
+import threading
+from datetime import date, timedelta
+from unittest import mock
+
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.models import User
+from product.models import Project
+from .decorators import HEADER, idempotent
+from .models import IdempotencyKey
+
+# Create your tests here.
+
+class IdempotentCreateTests(TestCase):
+    def setUp(self):
+        self.employer = User.objects.create_user(username='idem_boss', password='x', role='employer')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.employer).key)
+
+    def _create(self, name, key='key-1'):
+        return self.client.post('/api/projects/', {
+            'ProjectName': name, 'StartDate': date.today(), 'EndDate': date.today() + timedelta(days=30),
+            'Status': 'active', 'employer': self.employer.pk,
+        }, format='json', headers={HEADER: key})
+
+    def test_retry_replays_the_stored_response(self):
+        first = self._create('幂等项目')
+        self.assertEqual(first.status_code, 201, first.content)
+        retry = self._create('幂等项目')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Project.objects.count(), 1)
+        # 不同的 key 是新的请求
+        self.assertEqual(self._create('幂等项目', key='key-2').status_code, 201)
+        self.assertEqual(Project.objects.count(), 2)
+
+    def test_key_reused_with_a_different_body_is_rejected(self):
+        self.assertEqual(self._create('项目甲').status_code, 201)
+        response = self._create('项目乙')
+        self.assertEqual(response.status_code, 422)
+        self.assertIn('error', response.json())
+        self.assertEqual(list(Project.objects.values_list('ProjectName', flat=True)), ['项目甲'])
+
+
+class ConcurrentIdempotencyTests(TransactionTestCase):
+    """两个带同一个 key 的请求同时到达：第二个等第一个完成后重放，视图只执行一次"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='idem_user', password='x', role='employer')
+        self.calls = 0
+        self.first_started = threading.Event()
+        self.second_waiting = threading.Event()
+        self.first_done = threading.Event()
+
+    def _view(self):
+        test = self
+
+        class View:
+            @idempotent
+            def create(self, request):
+                test.calls += 1
+                test.first_started.set()
+                # 第二个请求开始等待之后才完成
+                test.second_waiting.wait(5)
+                return Response({'call': test.calls}, status=201)
+
+        return View()
+
+    def _request(self):
+        request = Request(APIRequestFactory().post('/api/things/', {'name': 'x'}, format='json', headers={HEADER: 'k'}))
+        request.user = self.user
+        return request
+
+    def _call(self, results, index):
+        try:
+            results[index] = self._view().create(self._request())
+        finally:
+            connections.close_all()
+
+    def _poll(self, interval):
+        # 第二个请求轮询时先让第一个请求跑完，两个线程不会同时访问数据库
+        self.second_waiting.set()
+        self.first_done.wait(5)
+
+    def test_concurrent_duplicate_waits_and_replays(self):
+        results = [None, None]
+        first = threading.Thread(target=self._call, args=(results, 0))
+        first.start()
+        self.assertTrue(self.first_started.wait(5))
+
+        with mock.patch('idempotency.decorators.time.sleep', side_effect=self._poll):
+            second = threading.Thread(target=self._call, args=(results, 1))
+            second.start()
+            first.join(5)
+            self.first_done.set()
+            second.join(5)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual([r.status_code for r in results], [201, 201])
+        self.assertEqual(results[1].data, results[0].data)
+        self.assertEqual(results[1]['Idempotent-Replayed'], 'true')
+        self.assertEqual(IdempotencyKey.objects.get().response, {'call': 1})
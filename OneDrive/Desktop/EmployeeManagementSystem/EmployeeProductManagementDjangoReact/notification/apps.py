@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class NotificationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "notification"
+
+    def ready(self):
+        from . import signals  # noqa: F401
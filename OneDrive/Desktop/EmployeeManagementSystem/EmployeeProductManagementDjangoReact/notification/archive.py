@@ -0,0 +1,90 @@
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection, router, transaction
+
+from search.backends import remove_objects
+from sync.signals import record_deletions
+from .models import (
+    ArchivedNotification,
+    ArchivedNotificationRecipient,
+    Notification,
+    NotificationRecipient,
+)
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = [ArchivedNotification._meta.db_table, ArchivedNotificationRecipient._meta.db_table]
+
+
+def archivable(cutoff):
+    """早于 cutoff 且所有接收者都已读的通知"""
+    return (
+        Notification.objects.filter(status='sent', DateSent__lt=cutoff)
+        .exclude(notificationrecipient__read=False)
+        .order_by('DateSent')
+    )
+
+
+def _month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def ensure_partitions(moments):
+    """Postgres 上为这些时间所在的月份建分区（已存在则跳过）"""
+    if connection.vendor != 'postgresql':
+        return
+    months = {_month_start(moment.astimezone(dt_timezone.utc)) for moment in moments}
+    with connection.cursor() as cursor:
+        for start in sorted(months):
+            end = _month_start(start + timedelta(days=32))
+            for table in PARTITIONED_TABLES:
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{table}_{start:%Y_%m}" PARTITION OF "{table}" '
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+
+
+def _delete(model, ids):
+    # 和删除用户的后台任务一样：墓碑批量写入，直接发 DELETE，不走 Python 端的级联收集和逐条信号
+    record_deletions(model, ids)
+    queryset = model.objects.filter(pk__in=ids)
+    return queryset._raw_delete(queryset.db)
+
+
+def archive_batch(ids):
+    """把一批通知及其接收记录搬到归档表，返回搬走的通知数"""
+    notifications = list(Notification.objects.filter(pk__in=ids).select_related('Sender'))
+    receipts = list(NotificationRecipient.objects.filter(notification_id__in=ids))
+    sent_at = {notification.pk: notification.DateSent for notification in notifications}
+    ensure_partitions(sent_at.values())
+
+    with transaction.atomic():
+        ArchivedNotification.objects.bulk_create([
+            ArchivedNotification(
+                NotificationID=notification.pk,
+                Message=notification.Message,
+                DateSent=notification.DateSent,
+                NotificationType=notification.NotificationType,
+                Sender_id=notification.Sender_id,
+                sender_name=notification.Sender.get_full_name() or notification.Sender.username,
+            )
+            for notification in notifications
+        ], ignore_conflicts=True)
+        ArchivedNotificationRecipient.objects.bulk_create([
+            ArchivedNotificationRecipient(
+                id=receipt.pk,
+                notification_id=receipt.notification_id,
+                recipient_id=receipt.recipient_id,
+                read_date=receipt.read_date,
+                DateSent=sent_at[receipt.notification_id],
+            )
+            for receipt in receipts
+        ], ignore_conflicts=True)
+        _delete(NotificationRecipient, list(
+            NotificationRecipient.objects.filter(notification_id__in=sent_at).values_list('pk', flat=True)
+        ))
+        remove_objects(Notification, list(sent_at), router.db_for_write(Notification))
+        _delete(Notification, list(sent_at))
+    logger.info("Archived %s notifications", len(notifications))
+    return len(notifications)
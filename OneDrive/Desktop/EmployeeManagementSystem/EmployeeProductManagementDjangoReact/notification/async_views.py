@@ -0,0 +1,43 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from accounts.async_auth import JSON_PARAMS, async_login_required
+from .models import ArchivedNotification, Notification, NotificationRecipient
+from .serializers import ArchivedNotificationSerializer, NotificationSerializer
+
+DEFAULT_INBOX_LIMIT = 50
+MAX_INBOX_LIMIT = 200
+
+
+def _int_param(request, name, default, maximum=None):
+    try:
+        value = max(int(request.GET.get(name, default)), 0)
+    except ValueError:
+        value = default
+    return min(value, maximum) if maximum else value
+
+
+@require_safe
+@async_login_required
+async def inbox(request):
+    limit = _int_param(request, 'limit', DEFAULT_INBOX_LIMIT, MAX_INBOX_LIMIT)
+    offset = _int_param(request, 'offset', 0)
+    # ?history=1 读归档表，默认只查热表
+    if request.GET.get('history') in ('1', 'true'):
+        queryset = ArchivedNotification.objects.visible_to(request.user)[offset:offset + limit]
+        notifications = [notification async for notification in queryset]
+        return JsonResponse(ArchivedNotificationSerializer(notifications, many=True).data, safe=False, json_dumps_params=JSON_PARAMS)
+    queryset = (
+        Notification.scoped.visible_to(request.user)
+        .select_related('Sender')
+        .order_by('-DateSent')[offset:offset + limit]
+    )
+    notifications = [notification async for notification in queryset]
+    return JsonResponse(NotificationSerializer(notifications, many=True).data, safe=False, json_dumps_params=JSON_PARAMS)
+
+
+@require_safe
+@async_login_required
+async def unread_count(request):
+    count = await NotificationRecipient.objects.filter(recipient=request.user, read=False).acount()
+    return JsonResponse({'unread': count})
@@ -0,0 +1,145 @@
+import calendar
+import logging
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from accounts.models import DepartmentClosure, User
+from .models import Notification, NotificationRecipient
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH_SIZE = 100
+# 处于 sending 超过这个时间的通知视为调度进程中途退出，重新排队
+SENDING_TIMEOUT = timedelta(minutes=10)
+
+
+def fan_out(notification, recipient_ids=None, department_ids=None):
+    """为通知创建接收记录：指定的用户加上指定部门子树下的用户；都为空时发给所有用户，发送者自己除外"""
+    # 接收记录可能在租户库，用户在默认库，不能连接查询
+    received = NotificationRecipient.objects.filter(notification=notification).values_list('recipient_id', flat=True)
+    users = User.objects.exclude(pk__in=[notification.Sender_id, *received])
+    if notification.tenant_id:
+        # 只发给同一租户的用户
+        users = users.filter(tenant_id=notification.tenant_id)
+    if recipient_ids or department_ids:
+        audience = Q(pk__in=recipient_ids or [])
+        if department_ids:
+            audience |= Q(department_node__in=DepartmentClosure.objects.filter(
+                ancestor_id__in=department_ids
+            ).values('descendant_id'))
+        users = users.filter(audience)
+    ids = list(users.values_list('pk', flat=True))
+    with transaction.atomic():
+        NotificationRecipient.objects.bulk_create(
+            [NotificationRecipient(notification=notification, recipient_id=pk) for pk in ids],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        Notification.objects.filter(pk=notification.pk).update(
+            recipient_count=F('recipient_count') + len(ids), updated_at=timezone.now()
+        )
+    notification.recipient_count += len(ids)
+
+
+def mark_read(notification_id, user):
+    """把用户的接收记录标为已读，首次标记时已读数加一；返回是否有变化"""
+    now = timezone.now()
+    with transaction.atomic():
+        changed = NotificationRecipient.objects.filter(
+            notification_id=notification_id, recipient=user, read=False
+        ).update(read=True, read_date=now, updated_at=now)
+        if changed:
+            Notification.objects.filter(pk=notification_id).update(
+                read_count=F('read_count') + changed, updated_at=now
+            )
+    return bool(changed)
+
+
+def next_occurrence(moment, recurrence, anchor=None):
+    """下一次发送时间；按月重复时对齐到第一次发送的日期（1/31 -> 2/28 -> 3/31），而不是上一次截断后的日期"""
+    if recurrence == 'daily':
+        return moment + timedelta(days=1)
+    if recurrence == 'weekly':
+        return moment + timedelta(weeks=1)
+    if recurrence == 'monthly':
+        year, month = divmod(moment.month, 12)
+        year, month = moment.year + year, month + 1
+        day = min((anchor or moment).day, calendar.monthrange(year, month)[1])
+        return moment.replace(year=year, month=month, day=day)
+    return None
+
+
+def claim_due(now, limit=CLAIM_BATCH_SIZE):
+    """抢占到期的定时通知，多个调度进程同时运行也不会重复发送"""
+    Notification.objects.filter(status='sending', updated_at__lt=now - SENDING_TIMEOUT).update(
+        status='scheduled', updated_at=now
+    )
+    due = Notification.objects.filter(status='scheduled', scheduled_at__lte=now).order_by('scheduled_at')
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            Notification.objects.filter(pk__in=ids).update(status='sending', updated_at=now)
+            return ids
+    # SQLite 没有行锁，用条件更新抢占，只有更新成功的进程负责发送
+    return [
+        pk for pk in due.values_list('pk', flat=True)[:limit]
+        if Notification.objects.filter(pk=pk, status='scheduled').update(status='sending', updated_at=now)
+    ]
+
+
+@transaction.atomic
+def deliver(notification_id, now=None):
+    now = now or timezone.now()
+    notification = Notification.objects.get(pk=notification_id)
+    fan_out(notification, notification.pending_recipients, notification.pending_departments)
+    notification.status = 'sent'
+    notification.DateSent = now
+    notification.save(update_fields=['status', 'DateSent', 'updated_at'])
+
+    anchor = notification.recurrence_anchor or notification.scheduled_at
+    following = next_occurrence(notification.scheduled_at, notification.recurrence, anchor)
+    # 调度进程停过一段时间时，错过的各次不再补发，只从当前时间之后的下一次继续
+    skipped = 0
+    while following and following <= now:
+        following = next_occurrence(following, notification.recurrence, anchor)
+        skipped += 1
+    if skipped:
+        logger.warning("Skipped %s missed occurrences of notification %s", skipped, notification_id)
+    # 周期通知：每次发送都是一条新通知，下一次作为新的定时通知排队
+    if following and (not notification.recurrence_until or following <= notification.recurrence_until):
+        Notification.objects.create(
+            Message=notification.Message,
+            NotificationType=notification.NotificationType,
+            Sender_id=notification.Sender_id,
+            tenant_id=notification.tenant_id,
+            status='scheduled',
+            scheduled_at=following,
+            recurrence=notification.recurrence,
+            recurrence_until=notification.recurrence_until,
+            recurrence_anchor=anchor,
+            pending_recipients=notification.pending_recipients,
+            pending_departments=notification.pending_departments,
+            project_id=notification.project_id,
+        )
+    logger.info("Delivered scheduled notification %s", notification_id)
+
+
+def deliver_due(now=None):
+    now = now or timezone.now()
+    delivered = failed = 0
+    while True:
+        ids = claim_due(now)
+        for pk in ids:
+            try:
+                deliver(pk, now)
+                delivered += 1
+            except Exception:
+                # 发送失败的通知放回队列，下次再试
+                logger.exception("Failed to deliver notification %s", pk)
+                failed += 1
+                Notification.objects.filter(pk=pk, status='sending').update(status='scheduled', updated_at=timezone.now())
+        if len(ids) < CLAIM_BATCH_SIZE or failed:
+            return delivered
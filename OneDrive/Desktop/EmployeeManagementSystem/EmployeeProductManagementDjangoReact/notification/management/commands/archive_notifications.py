@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notification.archive import archivable, archive_batch
+
+
+class Command(BaseCommand):
+    help = '把已读且超过保留天数的通知分批移到归档表'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        while True:
+            ids = list(archivable(cutoff).values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            total += archive_batch(ids)
+        self.stdout.write(self.style.SUCCESS(f'已归档 {total} 条通知'))
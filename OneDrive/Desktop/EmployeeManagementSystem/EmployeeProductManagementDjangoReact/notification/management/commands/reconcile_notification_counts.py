@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from notification.models import Notification, NotificationRecipient
+
+BATCH_SIZE = 1000
+
+
+def actual_counts():
+    receipts = NotificationRecipient.objects.filter(notification=OuterRef('pk')).values('notification')
+    return {
+        'actual_recipients': Coalesce(Subquery(receipts.annotate(n=Count('pk')).values('n')), 0),
+        'actual_read': Coalesce(Subquery(receipts.annotate(n=Count('pk', filter=Q(read=True))).values('n')), 0),
+    }
+
+
+class Command(BaseCommand):
+    help = '按 NotificationRecipient 重新计算通知的接收数和已读数，修正增量维护产生的偏差'
+
+    def handle(self, *args, **options):
+        fixed = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                Notification.objects.filter(pk__gt=last_pk).order_by('pk')
+                .annotate(**actual_counts())
+                .values_list('pk', 'recipient_count', 'read_count', 'actual_recipients', 'actual_read')[:BATCH_SIZE]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            now = timezone.now()
+            for pk, recipient_count, read_count, actual_recipients, actual_read in rows:
+                if (recipient_count, read_count) != (actual_recipients, actual_read):
+                    Notification.objects.filter(pk=pk).update(
+                        recipient_count=actual_recipients, read_count=actual_read, updated_at=now
+                    )
+                    fixed += 1
+        self.stdout.write(self.style.SUCCESS(f'已校正 {fixed} 条通知'))
@@ -0,0 +1,43 @@
+import heapq
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from notification.delivery import deliver_due
+from notification.models import Notification
+
+
+class Command(BaseCommand):
+    help = '发送到期的定时通知（常驻进程；--once 只处理一次后退出）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='发送当前到期的通知后退出')
+        parser.add_argument('--poll', type=float, default=30, help='重新加载定时队列的间隔（秒）')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            self.stdout.write(self.style.SUCCESS(f'已发送 {deliver_due()} 条通知'))
+            return
+
+        poll = options['poll']
+        while True:
+            close_old_connections()
+            deliver_due()
+            # 小顶堆只保存下一个轮询周期内到期的时间点，进程只在这些时间点或轮询时醒来
+            horizon = timezone.now() + timedelta(seconds=poll)
+            heap = list(
+                Notification.objects.filter(status='scheduled', scheduled_at__lte=horizon)
+                .values_list('scheduled_at', flat=True)
+            )
+            heapq.heapify(heap)
+            wake_at = time.monotonic() + poll
+            while heap and time.monotonic() < wake_at:
+                due = heapq.heappop(heap)
+                delay = (due - timezone.now()).total_seconds()
+                if delay > 0:
+                    time.sleep(max(min(delay, wake_at - time.monotonic()), 0))
+                deliver_due()
+            time.sleep(max(wake_at - time.monotonic(), 0))
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0002_notification_updated_at_and_more"),
+        ("product", "0003_project_updated_at_projectmember_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="pending_recipients",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="project",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="deadline_reminders",
+                to="product.project",
+            ),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="recurrence",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "None"),
+                    ("daily", "Daily"),
+                    ("weekly", "Weekly"),
+                    ("monthly", "Monthly"),
+                ],
+                default="",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="recurrence_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="scheduled_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("scheduled", "Scheduled"),
+                    ("sending", "Sending"),
+                    ("sent", "Sent"),
+                ],
+                default="sent",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["status", "scheduled_at"], name="notification_due_idx"
+            ),
+        ),
+    ]
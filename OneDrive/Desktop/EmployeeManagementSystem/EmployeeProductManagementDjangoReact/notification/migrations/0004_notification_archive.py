@@ -0,0 +1,129 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+ARCHIVE_TABLES = {
+    "ArchivedNotification": (
+        "notification_archivednotification",
+        """
+        "NotificationID" integer NOT NULL,
+        "Message" text NOT NULL,
+        "DateSent" timestamp with time zone NOT NULL,
+        "NotificationType" varchar(20) NOT NULL,
+        "Sender_id" bigint NOT NULL,
+        "sender_name" varchar(150) NOT NULL,
+        "archived_at" timestamp with time zone NOT NULL,
+        PRIMARY KEY ("NotificationID", "DateSent")
+        """,
+        ['"Sender_id"'],
+    ),
+    "ArchivedNotificationRecipient": (
+        "notification_archivednotificationrecipient",
+        """
+        "id" bigint NOT NULL,
+        "notification_id" integer NOT NULL,
+        "recipient_id" bigint NOT NULL,
+        "read_date" timestamp with time zone NULL,
+        "DateSent" timestamp with time zone NOT NULL,
+        PRIMARY KEY ("id", "DateSent")
+        """,
+        ['"notification_id"', '"recipient_id", "DateSent"'],
+    ),
+}
+
+
+def create_archive_tables(apps, schema_editor):
+    # Postgres 上归档表按 DateSent 做月度范围分区，月分区由 archive_notifications 按需创建；
+    # 分区表的主键必须包含分区键，其他数据库建普通表
+    if schema_editor.connection.vendor != "postgresql":
+        for model_name in ARCHIVE_TABLES:
+            schema_editor.create_model(apps.get_model("notification", model_name))
+        return
+    for table, columns, indexes in ARCHIVE_TABLES.values():
+        schema_editor.execute(
+            f'CREATE TABLE "{table}" ({columns}) PARTITION BY RANGE ("DateSent")'
+        )
+        schema_editor.execute(
+            f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT'
+        )
+        for i, index_columns in enumerate(indexes):
+            schema_editor.execute(
+                f'CREATE INDEX "{table[:50]}_idx{i}" ON "{table}" ({index_columns})'
+            )
+
+
+def drop_archive_tables(apps, schema_editor):
+    for table, _, _ in ARCHIVE_TABLES.values():
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{table}" CASCADE')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0003_notification_scheduling"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="ArchivedNotification",
+                    fields=[
+                        (
+                            "NotificationID",
+                            models.IntegerField(primary_key=True, serialize=False),
+                        ),
+                        ("Message", models.TextField()),
+                        ("DateSent", models.DateTimeField()),
+                        ("NotificationType", models.CharField(max_length=20)),
+                        ("sender_name", models.CharField(max_length=150)),
+                        ("archived_at", models.DateTimeField(auto_now_add=True)),
+                        (
+                            "Sender",
+                            models.ForeignKey(
+                                db_constraint=False,
+                                on_delete=django.db.models.deletion.DO_NOTHING,
+                                related_name="+",
+                                to=settings.AUTH_USER_MODEL,
+                            ),
+                        ),
+                    ],
+                    options={
+                        "ordering": ["-DateSent"],
+                    },
+                ),
+                migrations.CreateModel(
+                    name="ArchivedNotificationRecipient",
+                    fields=[
+                        (
+                            "id",
+                            models.BigIntegerField(primary_key=True, serialize=False),
+                        ),
+                        ("read_date", models.DateTimeField(blank=True, null=True)),
+                        ("DateSent", models.DateTimeField()),
+                        (
+                            "notification",
+                            models.ForeignKey(
+                                db_constraint=False,
+                                on_delete=django.db.models.deletion.DO_NOTHING,
+                                related_name="recipients",
+                                to="notification.archivednotification",
+                            ),
+                        ),
+                        (
+                            "recipient",
+                            models.ForeignKey(
+                                db_constraint=False,
+                                on_delete=django.db.models.deletion.DO_NOTHING,
+                                related_name="+",
+                                to=settings.AUTH_USER_MODEL,
+                            ),
+                        ),
+                    ],
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_tables, drop_archive_tables),
+    ]
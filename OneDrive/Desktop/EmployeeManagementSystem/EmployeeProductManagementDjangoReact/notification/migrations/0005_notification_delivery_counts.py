@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    Notification = apps.get_model("notification", "Notification")
+    NotificationRecipient = apps.get_model("notification", "NotificationRecipient")
+    receipts = NotificationRecipient.objects.filter(
+        notification=OuterRef("pk")
+    ).values("notification")
+    Notification.objects.update(
+        recipient_count=Coalesce(
+            Subquery(receipts.annotate(n=Count("pk")).values("n")), 0
+        ),
+        read_count=Coalesce(
+            Subquery(
+                receipts.annotate(n=Count("pk", filter=Q(read=True))).values("n")
+            ),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0004_notification_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="read_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="recipient_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0005_notification_delivery_counts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="pending_departments",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
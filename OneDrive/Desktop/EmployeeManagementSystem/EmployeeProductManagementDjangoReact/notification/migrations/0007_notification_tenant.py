@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def assign_tenants(apps, schema_editor):
+    Notification = apps.get_model("notification", "Notification")
+    User = apps.get_model("accounts", "User")
+    Notification.objects.update(
+        tenant_id=Subquery(
+            User.objects.filter(pk=OuterRef("Sender_id")).values("tenant_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0006_notification_pending_departments"),
+        ("accounts", "0009_user_tenant"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="tenant",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(assign_tenants, migrations.RunPython.noop),
+    ]
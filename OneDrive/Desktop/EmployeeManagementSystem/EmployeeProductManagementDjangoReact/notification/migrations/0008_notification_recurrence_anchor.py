@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notification", "0007_notification_tenant"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="recurrence_anchor",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
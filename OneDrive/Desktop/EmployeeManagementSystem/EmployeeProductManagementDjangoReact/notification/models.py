@@ -1,8 +1,18 @@
 from django.db import models
 from django.conf import settings
 
+from EmployeeProductManagementDjangoReact.tenancy import TenantManager
+
 # Create your models here.
 
+class NotificationQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        # 用户可见的通知（发送的和接收的）；用子查询而不是连接，两边都能走索引，也不需要 distinct
+        return self.filter(
+            models.Q(Sender=user) |
+            models.Q(pk__in=NotificationRecipient.objects.filter(recipient=user).values('notification_id'))
+        )
+
 class Notification(models.Model):
     NotificationID = models.AutoField(primary_key=True)
     Message = models.TextField()
@@ -23,17 +33,123 @@ class Notification(models.Model):
         through='NotificationRecipient'
     )
 
+    # 定时/周期通知：到 scheduled_at 时由调度进程（run_notification_scheduler）分发给接收者
+    status = models.CharField(max_length=20, default='sent', choices=[
+        ('scheduled', 'Scheduled'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent')
+    ])
+    scheduled_at = models.DateTimeField(null=True, blank=True)
+    recurrence = models.CharField(max_length=20, blank=True, default='', choices=[
+        ('', 'None'),
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly')
+    ])
+    recurrence_until = models.DateTimeField(null=True, blank=True)
+    # 周期的第一次发送时间，按月重复时各次都对齐到它的日期
+    recurrence_anchor = models.DateTimeField(null=True, blank=True)
+    # 待分发的接收者 id，为空表示发给所有用户
+    pending_recipients = models.JSONField(null=True, blank=True)
+    # 待分发的部门 id，分发时展开为部门子树下的所有用户
+    pending_departments = models.JSONField(null=True, blank=True)
+    # 根据项目截止日期自动生成的提醒
+    project = models.ForeignKey(
+        'product.Project',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='deadline_reminders'
+    )
+
+    # 发送统计，由分发和标记已读时用 F 表达式增量维护，reconcile_notification_counts 每晚校正
+    recipient_count = models.PositiveIntegerField(default=0)
+    read_count = models.PositiveIntegerField(default=0)
+
+    # 所属租户，与发送者相同
+    tenant = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = NotificationQuerySet.as_manager()
+    scoped = TenantManager.from_queryset(NotificationQuerySet)()
+
+    def save(self, *args, **kwargs):
+        if self.tenant_id is None and self.Sender_id:
+            self.tenant_id = self.Sender.tenant_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.NotificationType} - {self.DateSent}"
 
     class Meta:
         ordering = ['-DateSent']
+        indexes = [
+            # 调度进程只扫描到期的定时通知
+            models.Index(fields=['status', 'scheduled_at'], name='notification_due_idx'),
+        ]
 
 class NotificationRecipient(models.Model):
     notification = models.ForeignKey(Notification, on_delete=models.CASCADE)
     recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     read = models.BooleanField(default=False)
     read_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ['notification', 'recipient']
+
+class ArchivedNotificationQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        return self.filter(
+            models.Q(Sender_id=user.pk) |
+            models.Q(NotificationID__in=ArchivedNotificationRecipient.objects.filter(
+                recipient_id=user.pk
+            ).values('notification_id'))
+        )
+
+class ArchivedNotification(models.Model):
+    """已读且过期的通知（冷数据），由 archive_notifications 从热表迁入；
+    Postgres 上按 DateSent 每月一个分区"""
+    NotificationID = models.IntegerField(primary_key=True)
+    Message = models.TextField()
+    DateSent = models.DateTimeField()
+    NotificationType = models.CharField(max_length=20)
+    # 不建外键约束：删除用户时不必扫描历史数据
+    Sender = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    sender_name = models.CharField(max_length=150)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ArchivedNotificationQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-DateSent']
+
+class ArchivedNotificationRecipient(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    notification = models.ForeignKey(
+        ArchivedNotification,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='recipients'
+    )
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    read_date = models.DateTimeField(null=True, blank=True)
+    # 分区键，与所属通知的 DateSent 相同
+    DateSent = models.DateTimeField()
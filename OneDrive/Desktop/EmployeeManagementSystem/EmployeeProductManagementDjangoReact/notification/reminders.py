@@ -0,0 +1,34 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Notification
+
+
+def reminder_time(project):
+    remind_on = project.EndDate - timedelta(days=settings.PROJECT_DEADLINE_REMINDER_DAYS)
+    return timezone.make_aware(datetime.combine(remind_on, time(settings.PROJECT_DEADLINE_REMINDER_HOUR)))
+
+
+def schedule_deadline_reminder(project):
+    """按项目截止日期重新生成提醒；项目日期或成员变化时调用"""
+    Notification.objects.filter(project=project, status='scheduled').delete()
+    scheduled_at = reminder_time(project)
+    if project.Status == 'completed' or scheduled_at <= timezone.now():
+        return None
+
+    recipients = set(project.members.values_list('pk', flat=True))
+    if project.manager_id:
+        recipients.add(project.manager_id)
+    if not recipients:
+        return None
+    return Notification.objects.create(
+        Message=f"项目「{project.ProjectName}」将于 {project.EndDate} 截止",
+        NotificationType='important',
+        Sender_id=project.employer_id,
+        status='scheduled',
+        scheduled_at=scheduled_at,
+        pending_recipients=sorted(recipients),
+        project=project,
+    )
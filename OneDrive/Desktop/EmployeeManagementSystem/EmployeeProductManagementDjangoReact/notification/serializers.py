@@ -1,10 +1,11 @@
 from rest_framework import serializers
-from .models import Notification, NotificationRecipient
-from accounts.models import User
+from .models import ArchivedNotification, Notification, NotificationRecipient
+from django.utils import timezone
+from .delivery import fan_out
 
 class RecipientSerializer(serializers.Serializer):
     id = serializers.IntegerField()
-    type = serializers.CharField()  # 'employee' 或 'employer'
+    type = serializers.CharField()  # 'employee'、'employer' 或 'department'（id 为部门 id，发给整个子树）
 
 class NotificationSerializer(serializers.ModelSerializer):
     sender_name = serializers.SerializerMethodField()
@@ -13,36 +14,39 @@ class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = ['NotificationID', 'Message', 'DateSent', 'NotificationType', 
-                 'Sender', 'sender_name', 'recipients']
-        read_only_fields = ['NotificationID', 'DateSent', 'sender_name', 'Sender']
+                 'Sender', 'sender_name', 'recipients',
+                 'status', 'scheduled_at', 'recurrence', 'recurrence_until', 'project',
+                 'recipient_count', 'read_count']
+        read_only_fields = ['NotificationID', 'DateSent', 'sender_name', 'Sender', 'status', 'project',
+                            'recipient_count', 'read_count']
 
     def get_sender_name(self, obj):
         return obj.Sender.get_full_name() or obj.Sender.username
 
+    def validate(self, attrs):
+        if attrs.get('recurrence') and not attrs.get('scheduled_at'):
+            raise serializers.ValidationError({'error': '周期通知必须指定 scheduled_at'})
+        return attrs
+
     def create(self, validated_data):
         recipients_data = validated_data.pop('recipients', [])
+        # 没有指定接收者时发送给所有用户（发送者自己除外）
+        recipient_ids = [r['id'] for r in recipients_data if r['type'] != 'department'] or None
+        department_ids = [r['id'] for r in recipients_data if r['type'] == 'department'] or None
+        scheduled_at = validated_data.get('scheduled_at')
+
+        # 定时/周期通知先保存接收者，到期后由调度进程分发
+        if scheduled_at and (scheduled_at > timezone.now() or validated_data.get('recurrence')):
+            return super().create(dict(
+                validated_data, status='scheduled',
+                pending_recipients=recipient_ids, pending_departments=department_ids,
+            ))
+
         notification = super().create(validated_data)
-        
-        # 如果没有指定接收者，发送给所有用户
-        if not recipients_data:
-            # 发送给所有用户，除了发送者自己
-            for user in User.objects.all():
-                if user != notification.Sender:  # 不发给自己
-                    NotificationRecipient.objects.create(
-                        notification=notification,
-                        recipient=user
-                    )
-        else:
-            # 处理指定的接收者
-            for recipient in recipients_data:
-                try:
-                    user = User.objects.get(id=recipient['id'])
-                    if user != notification.Sender:  # 不发给自己
-                        NotificationRecipient.objects.create(
-                            notification=notification,
-                            recipient=user
-                        )
-                except User.DoesNotExist:
-                    continue
-        
-        return notification
\ No newline at end of file
+        fan_out(notification, recipient_ids, department_ids)
+        return notification
+
+class ArchivedNotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedNotification
+        fields = ['NotificationID', 'Message', 'DateSent', 'NotificationType', 'Sender', 'sender_name']
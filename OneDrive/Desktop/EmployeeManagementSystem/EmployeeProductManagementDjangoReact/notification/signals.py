@@ -0,0 +1,51 @@
+import threading
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from product.models import Project, ProjectMember
+from .reminders import schedule_deadline_reminder
+
+
+def _reschedule(project_id, using):
+    project = Project.objects.using(using).filter(pk=project_id).first()
+    # 项目整体被删除时提醒随项目级联删除
+    if project:
+        schedule_deadline_reminder(project)
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, **kwargs):
+    schedule_deadline_reminder(instance)
+
+
+# 每个线程、每个数据库一份：当前事务里成员有变化、提交后要重建提醒的项目
+_pending = threading.local()
+
+
+def _pending_project_ids(using):
+    if not hasattr(_pending, 'by_alias'):
+        _pending.by_alias = {}
+    return _pending.by_alias.setdefault(using, set())
+
+
+def _flush(using):
+    # 第一个执行的回调重建全部项目，同一事务里其余回调拿到的是空集合
+    project_ids = _pending_project_ids(using)
+    while project_ids:
+        _reschedule(project_ids.pop(), using)
+
+
+@receiver([post_save, post_delete], sender=ProjectMember)
+def project_member_changed(sender, instance, using, **kwargs):
+    # 提交后再重建：级联删除项目时成员先于项目删除，此时不能再为项目生成提醒；
+    # 批量修改成员时同一个项目只重建一次。成员可能写在租户库，按实际写入的库判断事务
+    if not transaction.get_connection(using).in_atomic_block:
+        _reschedule(instance.project_id, using)
+        return
+    _pending_project_ids(using).add(instance.project_id)
+    # 每次变化都挂一个回调：某个保存点回滚时只丢弃它自己的回调，集合里剩下的项目仍会在提交时重建
+    # （被回滚的项目多重建一次也无妨，提醒按项目当前状态生成）
+    transaction.on_commit(partial(_flush, using), using=using)
@@ -1,3 +1,285 @@
-from django.test import TestCase
+import unittest
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from EmployeeProductManagementDjangoReact.query_plans import QueryPlanTestCase
+from EmployeeProductManagementDjangoReact.tenancy import tenant_context
+from EmployeeProductManagementDjangoReact.testing import MultiDatabaseTestCase
+from accounts.deletion import purge_user
+from accounts.models import User, UserDeletionJob
+from product.models import Project, ProjectMember
+from .delivery import deliver, fan_out, mark_read, next_occurrence
+from .management.commands.reconcile_notification_counts import actual_counts
+from sync.models import Tombstone
+from .archive import PARTITIONED_TABLES
+from .models import ArchivedNotification, ArchivedNotificationRecipient, Notification, NotificationRecipient
 
 # Create your tests here.
+
+class NotificationQueryPlanTests(QueryPlanTestCase):
+    def test_inbox(self):
+        self.assertQueryPlan(
+            'inbox',
+            Notification.objects.visible_to(self.employee).select_related('Sender').order_by('-DateSent')[:50],
+        )
+
+    def test_sender_outbox(self):
+        self.assertQueryPlan(
+            'sender_outbox',
+            Notification.objects.visible_to(self.employer).select_related('Sender').order_by('-DateSent')[:50],
+        )
+
+    def test_unread_count(self):
+        self.assertQueryPlan(
+            'unread_count',
+            NotificationRecipient.objects.filter(recipient=self.employee, read=False),
+        )
+
+
+class RecurrenceTests(TestCase):
+    def setUp(self):
+        self.employer = User.objects.create_user(username='rec_boss', password='x', role='employer')
+        self.employee = User.objects.create_user(username='rec_emp', password='x', role='employee', tenant=self.employer)
+
+    def _recurring(self, scheduled_at, recurrence):
+        return Notification.objects.create(
+            Message='周报', NotificationType='info', Sender=self.employer, tenant_id=self.employer.tenant_id,
+            status='scheduled', scheduled_at=scheduled_at, recurrence=recurrence,
+            pending_recipients=[self.employee.pk],
+        )
+
+    def test_monthly_keeps_original_day(self):
+        moment = datetime(2025, 1, 31, 9, tzinfo=dt_timezone.utc)
+        dates = []
+        for _ in range(3):
+            moment = next_occurrence(moment, 'monthly', datetime(2025, 1, 31, tzinfo=dt_timezone.utc))
+            dates.append(moment.date())
+        self.assertEqual(dates, [date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)])
+
+    def test_monthly_anchor_is_carried_to_next_occurrence(self):
+        first = self._recurring(datetime(2025, 1, 31, 9, tzinfo=dt_timezone.utc), 'monthly')
+        deliver(first.pk, now=first.scheduled_at)
+        second = Notification.objects.get(status='scheduled')
+        self.assertEqual(second.scheduled_at.date(), date(2025, 2, 28))
+        deliver(second.pk, now=second.scheduled_at)
+        third = Notification.objects.get(status='scheduled')
+        self.assertEqual(third.scheduled_at.date(), date(2025, 3, 31))
+
+    def test_overdue_recurrence_skips_missed_occurrences(self):
+        now = timezone.now()
+        overdue = self._recurring(now - timedelta(days=30, hours=1), 'daily')
+        deliver(overdue.pk, now=now)
+        self.assertEqual(NotificationRecipient.objects.filter(recipient=self.employee).count(), 1)
+        following = Notification.objects.get(status='scheduled')
+        self.assertGreater(following.scheduled_at, now)
+        self.assertLessEqual(following.scheduled_at, now + timedelta(days=1))
+
+
+class DeadlineReminderTests(TestCase):
+    def test_member_changes_reschedule_once_per_transaction(self):
+        employer = User.objects.create_user(username='rem_boss', password='x', role='employer')
+        employees = [
+            User.objects.create_user(username=f'rem_emp{i}', password='x', role='employee', tenant=employer)
+            for i in range(3)
+        ]
+        project = Project.objects.create(
+            ProjectName='deadline', StartDate=date.today(), EndDate=date.today() + timedelta(days=30),
+            Status='active', employer=employer,
+        )
+        with mock.patch('notification.signals.schedule_deadline_reminder') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for employee in employees:
+                        ProjectMember.objects.create(project=project, employee=employee, role='developer')
+        self.assertEqual(schedule.call_count, 1)
+
+
+class TenantDatabaseReminderTests(MultiDatabaseTestCase):
+    """成员写在租户库时，按租户库的事务合并重建"""
+    extra_databases = ('tenant_a',)
+
+    def test_member_changes_reschedule_once_per_tenant_transaction(self):
+        employer = User.objects.create_user(username='rem_db_boss', password='x', role='employer')
+        with override_settings(TENANT_DATABASES={employer.pk: 'tenant_a'}), tenant_context(employer.pk):
+            employer.save()
+            employees = [
+                User.objects.create_user(username=f'rem_db_emp{i}', password='x', role='employee', tenant=employer)
+                for i in range(3)
+            ]
+            project = Project.objects.create(
+                ProjectName='deadline', StartDate=date.today(), EndDate=date.today() + timedelta(days=30),
+                Status='active', employer=employer,
+            )
+            self.assertEqual(project._state.db, 'tenant_a')
+            with mock.patch('notification.signals.schedule_deadline_reminder') as schedule:
+                with transaction.atomic(using='tenant_a'):
+                    for employee in employees:
+                        ProjectMember.objects.create(project=project, employee=employee, role='developer')
+                    self.assertEqual(schedule.call_count, 0)
+                self.assertEqual(schedule.call_count, 1)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.employer = User.objects.create_user(username='arc_boss', password='x', role='employer')
+        self.employee = User.objects.create_user(username='arc_emp', password='x', role='employee', tenant=self.employer)
+
+    def _notification(self, message, days_ago, read):
+        notification = Notification.objects.create(
+            Message=message, NotificationType='info', Sender=self.employer, tenant_id=self.employer.tenant_id,
+        )
+        NotificationRecipient.objects.create(notification=notification, recipient=self.employee, read=read)
+        # DateSent 是 auto_now_add，创建后再改成过去的时间
+        Notification.objects.filter(pk=notification.pk).update(DateSent=timezone.now() - timedelta(days=days_ago))
+        return notification
+
+    def _archive(self):
+        call_command('archive_notifications', days=180, batch_size=2, stdout=StringIO())
+
+    def test_read_old_notifications_move_to_archive_tables(self):
+        archived = [self._notification(f'旧通知{i}', 400 + i, read=True) for i in range(3)]
+        unread = self._notification('未读', 400, read=False)
+        recent = self._notification('最近', 10, read=True)
+
+        self._archive()
+
+        archived_ids = {notification.pk for notification in archived}
+        self.assertEqual(set(Notification.objects.values_list('pk', flat=True)), {unread.pk, recent.pk})
+        self.assertFalse(NotificationRecipient.objects.filter(notification_id__in=archived_ids).exists())
+        self.assertEqual(set(ArchivedNotification.objects.values_list('pk', flat=True)), archived_ids)
+        receipts = ArchivedNotificationRecipient.objects.filter(notification_id__in=archived_ids)
+        self.assertEqual({receipt.recipient_id for receipt in receipts}, {self.employee.pk})
+        row = ArchivedNotification.objects.get(pk=archived[0].pk)
+        self.assertEqual((row.Message, row.sender_name, row.Sender_id), ('旧通知0', 'arc_boss', self.employer.pk))
+        # 离线客户端通过墓碑得知热表里的行没了
+        self.assertEqual(
+            set(Tombstone.objects.filter(model='notification').values_list('object_id', flat=True)), archived_ids,
+        )
+        # 再跑一次没有可归档的
+        self._archive()
+        self.assertEqual(ArchivedNotification.objects.count(), 3)
+
+    def _history(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/notifications/history/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_archived_notifications_stay_readable_in_history(self):
+        notification = self._notification('归档后可查', 400, read=True)
+        self._archive()
+        rows = self._history(self.employee)
+        self.assertEqual([row['NotificationID'] for row in rows], [notification.pk])
+        self.assertEqual((rows[0]['Message'], rows[0]['sender_name']), ('归档后可查', 'arc_boss'))
+        self.assertEqual([row['NotificationID'] for row in self._history(self.employer)], [notification.pk])
+        outsider = User.objects.create_user(username='arc_other', password='x', role='employer')
+        self.assertEqual(self._history(outsider), [])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'monthly partitions only exist on PostgreSQL')
+    def test_partitions_are_created_for_archived_months(self):
+        notification = self._notification('分区', 400, read=True)
+        sent = Notification.objects.get(pk=notification.pk).DateSent.astimezone(dt_timezone.utc)
+        self._archive()
+        with connection.cursor() as cursor:
+            tables = set(connection.introspection.table_names(cursor))
+        for table in PARTITIONED_TABLES:
+            self.assertIn(f'{table}_{sent:%Y_%m}', tables)
+
+
+class DeliveryCountTests(TestCase):
+    """recipient_count / read_count 增量维护后与接收记录一致"""
+
+    def setUp(self):
+        self.employer = User.objects.create_user(username='cnt_boss', password='x', role='employer')
+        self.employees = [
+            User.objects.create_user(username=f'cnt_emp{i}', password='x', role='employee', tenant=self.employer)
+            for i in range(3)
+        ]
+
+    def _client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+        return client
+
+    def _counts(self, notification):
+        notification.refresh_from_db(fields=['recipient_count', 'read_count'])
+        return notification.recipient_count, notification.read_count
+
+    def assertCountsMatchReceipts(self):
+        rows = Notification.objects.annotate(**actual_counts()).values_list(
+            'recipient_count', 'read_count', 'actual_recipients', 'actual_read',
+        )
+        for recipient_count, read_count, actual_recipients, actual_read in rows:
+            self.assertEqual((recipient_count, read_count), (actual_recipients, actual_read))
+
+    def test_create_and_mark_read(self):
+        response = self._client(self.employer).post('/api/notifications/', {
+            'Message': '全员通知', 'NotificationType': 'info',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.json()['recipient_count'], response.json()['read_count']), (3, 0))
+        notification = Notification.objects.get(pk=response.json()['NotificationID'])
+
+        reader = self._client(self.employees[0])
+        for _ in range(2):
+            # 重复标记已读不重复计数
+            self.assertEqual(reader.post(f'/api/notifications/{notification.pk}/mark_read/').status_code, 200)
+        self.assertEqual(self._counts(notification), (3, 1))
+        self.assertCountsMatchReceipts()
+
+    def test_repeated_and_scheduled_fan_out(self):
+        notification = Notification.objects.create(Message='补发', NotificationType='info', Sender=self.employer)
+        fan_out(notification, [self.employees[0].pk])
+        # 已经收到的人不再计入，新加入的接收者才计入
+        fan_out(notification, [employee.pk for employee in self.employees])
+        fan_out(notification, [employee.pk for employee in self.employees])
+        self.assertEqual(self._counts(notification), (3, 0))
+
+        scheduled = Notification.objects.create(
+            Message='定时', NotificationType='info', Sender=self.employer, status='scheduled',
+            scheduled_at=timezone.now(), pending_recipients=[employee.pk for employee in self.employees[:2]],
+        )
+        deliver(scheduled.pk)
+        self.assertEqual(self._counts(scheduled), (2, 0))
+        self.assertCountsMatchReceipts()
+
+    def test_deleting_a_recipient_decrements_counts(self):
+        notifications = [
+            Notification.objects.create(Message=f'通知{i}', NotificationType='info', Sender=self.employer)
+            for i in range(3)
+        ]
+        for notification in notifications:
+            fan_out(notification)
+        leaving = self.employees[0]
+        mark_read(notifications[0].pk, leaving)
+        for notification in notifications:
+            mark_read(notification.pk, self.employees[1])
+
+        job = UserDeletionJob.objects.create(user_id=leaving.pk, username=leaving.username)
+        purge_user(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done', job.error)
+
+        self.assertEqual([self._counts(notification) for notification in notifications], [(2, 1)] * 3)
+        self.assertCountsMatchReceipts()
+        out = StringIO()
+        call_command('reconcile_notification_counts', stdout=out)
+        self.assertIn('已校正 0 条通知', out.getvalue())
+
+    def test_reconcile_fixes_drift(self):
+        notification = Notification.objects.create(Message='偏差', NotificationType='info', Sender=self.employer)
+        fan_out(notification)
+        Notification.objects.filter(pk=notification.pk).update(recipient_count=10, read_count=4)
+        out = StringIO()
+        call_command('reconcile_notification_counts', stdout=out)
+        self.assertIn('已校正 1 条通知', out.getvalue())
+        self.assertEqual(self._counts(notification), (3, 0))
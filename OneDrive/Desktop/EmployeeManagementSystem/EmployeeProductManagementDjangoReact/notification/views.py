@@ -1,34 +1,61 @@
 from django.shortcuts import render
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
+from idempotency.decorators import IdempotentCreateMixin
 from product.views import IsEmployerOrReadOnly
-from .models import Notification, NotificationRecipient
-from .serializers import NotificationSerializer
+from . import delivery
+from .models import ArchivedNotification, Notification, NotificationRecipient
+from .serializers import ArchivedNotificationSerializer, NotificationSerializer
 import logging
 from django.db import models
 from rest_framework.exceptions import PermissionDenied
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_HISTORY_LIMIT = 50
+MAX_HISTORY_LIMIT = 200
+
 # Create your views here.
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated, IsEmployerOrReadOnly]
 
+    def get_permissions(self):
+        # 接收者（员工）也可以标记已读
+        if self.action == 'mark_read':
+            return [permissions.IsAuthenticated()]
+        return super().get_permissions()
+
     def get_queryset(self):
         # 获取用户可见的通知（发送的和接收的）
-        user = self.request.user
-        return Notification.objects.filter(
-            models.Q(Sender=user) | models.Q(Recipients=user)
-        ).distinct().order_by('-DateSent')
+        return Notification.scoped.visible_to(self.request.user).select_related('Sender').order_by('-DateSent')
 
     def perform_create(self, serializer):
-        logger.info(f"Creating notification with data: {self.request.data}")
+        logger.info("Creating notification with data: %s", self.request.data)
         serializer.save(Sender=self.request.user)
 
     def perform_update(self, serializer):
         if self.get_object().Sender != self.request.user:
             raise PermissionDenied("只有发送者可以修改通知")
         serializer.save()
+
+    @action(detail=True, methods=['post'])
+    def mark_read(self, request, pk=None):
+        notification = self.get_object()
+        delivery.mark_read(notification.pk, request.user)
+        return Response({'status': 'read'})
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        # 归档的历史通知；普通列表只查热表
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_HISTORY_LIMIT)), 0), MAX_HISTORY_LIMIT)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({'error': 'limit and offset must be integers'}, status=400)
+        queryset = ArchivedNotification.objects.visible_to(request.user)[offset:offset + limit]
+        return Response(ArchivedNotificationSerializer(queryset, many=True).data)
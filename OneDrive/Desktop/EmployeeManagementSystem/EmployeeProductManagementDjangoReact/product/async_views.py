@@ -0,0 +1,27 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from accounts.async_auth import JSON_PARAMS, async_login_required
+from .models import Project
+from .serializers import ProjectSerializer
+
+
+def _project_queryset(user):
+    # 序列化用到的关联全部提前取出，序列化阶段不会再触发同步查询
+    return Project.scoped.visible_to(user).with_related()
+
+
+@require_safe
+@async_login_required
+async def project_list(request):
+    projects = [project async for project in _project_queryset(request.user)]
+    return JsonResponse(ProjectSerializer(projects, many=True).data, safe=False, json_dumps_params=JSON_PARAMS)
+
+
+@require_safe
+@async_login_required
+async def project_detail(request, pk):
+    project = await _project_queryset(request.user).filter(pk=pk).afirst()
+    if project is None:
+        return JsonResponse({'detail': 'No Project matches the given query.'}, status=404)
+    return JsonResponse(ProjectSerializer(project).data, json_dumps_params=JSON_PARAMS)
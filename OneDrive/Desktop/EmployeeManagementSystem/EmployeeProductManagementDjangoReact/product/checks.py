@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    # 时间线缓存靠版本号失效，进程内缓存的递增其他 worker 看不到
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend.endswith(('LocMemCache', 'DummyCache')):
+        return [Warning(
+            '默认缓存是进程内缓存，多个 worker 之间不会失效时间线缓存',
+            hint='设置 CACHE_URL 使用 Redis 等共享缓存',
+            id='product.W001',
+        )]
+    return []
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("product", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                fields=["StartDate", "EndDate"], name="project_date_range_idx"
+            ),
+        ),
+    ]
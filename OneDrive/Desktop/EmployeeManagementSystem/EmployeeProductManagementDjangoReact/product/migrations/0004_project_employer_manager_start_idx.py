@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("product", "0003_project_updated_at_projectmember_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                fields=["employer", "-StartDate"], name="project_employer_start_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(
+                fields=["manager", "-StartDate"], name="project_manager_start_idx"
+            ),
+        ),
+    ]
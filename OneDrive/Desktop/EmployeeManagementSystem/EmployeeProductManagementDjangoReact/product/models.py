@@ -1,8 +1,38 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from EmployeeProductManagementDjangoReact.tenancy import TenantManager
 
 # Create your models here.
 
+class ProjectQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        if user.role == 'employer':
+            # 雇主只能看到自己创建的项目
+            return self.filter(employer=user)
+        elif user.role == 'employee':
+            # 员工可以看到参与或管理的项目；用 UNION 而不是 OR，两边各走 employee / manager 索引
+            project_ids = ProjectMember.objects.filter(employee=user).order_by().values('project_id').union(
+                Project.objects.filter(manager=user).order_by().values('pk')
+            )
+            return self.filter(pk__in=project_ids)
+        return self.none()
+
+    def for_department(self, department_id):
+        # 成员或项目经理在该部门子树下的项目
+        users = get_user_model().objects.in_department(department_id).values('pk')
+        return self.filter(
+            models.Q(manager_id__in=users) |
+            models.Q(pk__in=ProjectMember.objects.filter(employee_id__in=users).values('project_id'))
+        )
+
+    def with_related(self):
+        # ProjectSerializer 用到的关联一次取齐
+        return self.select_related('manager', 'employer').prefetch_related(
+            models.Prefetch('projectmember_set', queryset=ProjectMember.objects.select_related('employee'))
+        )
+
 class Project(models.Model):
     ProjectID = models.AutoField(primary_key=True)
     ProjectName = models.CharField(max_length=100)
@@ -35,17 +65,30 @@ class Project(models.Model):
         limit_choices_to={'role': 'employee'}
     )
 
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ProjectQuerySet.as_manager()
+    scoped = TenantManager.from_queryset(ProjectQuerySet)('employer')
+
     def __str__(self):
         return self.ProjectName
 
     class Meta:
         ordering = ['-StartDate']
+        indexes = [
+            # 按时间窗口查询重叠项目（StartDate <= end AND EndDate >= start）
+            models.Index(fields=['StartDate', 'EndDate'], name='project_date_range_idx'),
+            # 雇主、经理的项目列表按默认排序（-StartDate）直接从索引读出，不用扫全表再排序
+            models.Index(fields=['employer', '-StartDate'], name='project_employer_start_idx'),
+            models.Index(fields=['manager', '-StartDate'], name='project_manager_start_idx'),
+        ]
 
 class ProjectMember(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, limit_choices_to={'role': 'employee'})
     join_date = models.DateField(auto_now_add=True)
     role = models.CharField(max_length=30)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ['project', 'employee']
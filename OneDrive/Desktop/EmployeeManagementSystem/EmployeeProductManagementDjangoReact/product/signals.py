@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Project, ProjectMember
+from .timeline import invalidate_timelines
+
+
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=ProjectMember)
+def project_changed(sender, **kwargs):
+    invalidate_timelines()
@@ -1,3 +1,98 @@
+from datetime import date, timedelta
+
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from EmployeeProductManagementDjangoReact.query_plans import QueryPlanTestCase
+from EmployeeProductManagementDjangoReact.tenancy import tenant_context
+from accounts.access import AccessContext
+from accounts.models import Department, User
+from .models import Project, ProjectMember
 
 # Create your tests here.
+
+class ProjectQueryPlanTests(QueryPlanTestCase):
+    def test_employee_visible_projects(self):
+        self.assertQueryPlan('employee_visible_projects', Project.objects.visible_to(self.employee))
+
+    def test_employer_projects(self):
+        # scoped 管理器在没有租户上下文时返回空结果，这里和请求里一样先确定租户
+        with tenant_context(self.employer.tenant_id):
+            self.assertQueryPlan('employer_projects', AccessContext(self.employer).projects())
+
+    def test_visible_project_ids(self):
+        self.assertQueryPlan(
+            'visible_project_ids',
+            # AccessContext.visible_project_ids 只取集合，不需要排序
+            Project.objects.visible_to(self.employee).order_by().values_list('pk', flat=True),
+        )
+
+    def test_project_members_prefetch(self):
+        # ProjectQuerySet.with_related 的成员预取
+        project_ids = list(Project.objects.values_list('pk', flat=True)[:20])
+        self.assertQueryPlan(
+            'project_members_prefetch',
+            ProjectMember.objects.filter(project__in=project_ids).select_related('employee'),
+        )
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.employer = User.objects.create_user(username='timeline_employer', password='x', role='employer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.employer)
+
+    def test_span_is_capped_per_granularity(self):
+        url = '/api/projects/timeline/'
+        params = {'employees': '1', 'start': '2020-01-01', 'end': '2024-12-31'}
+        self.assertEqual(self.client.get(url, {**params, 'granularity': 'day'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {**params, 'granularity': 'month'}).status_code, 200)
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.employer = User.objects.create_user(username='avail_boss', password='x', role='employer')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.employer).key)
+
+    def _employee(self, username, department):
+        return User.objects.create_user(
+            username=username, password='x', role='employee', department=department, tenant=self.employer,
+        )
+
+    def _availability(self, **params):
+        response = self.client.get('/api/projects/availability/', {
+            'start': date.today(), 'end': date.today() + timedelta(days=7), **params,
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        return {row['username']: row['project_count'] for row in response.json()}
+
+    def test_department_includes_sub_departments(self):
+        lead = self._employee('avail_lead', '研发部')
+        self._employee('avail_backend', '研发部/后端组')
+        self._employee('avail_sales', '市场部')
+        project = Project.objects.create(
+            ProjectName='排期', StartDate=date.today(), EndDate=date.today() + timedelta(days=30),
+            Status='active', employer=self.employer,
+        )
+        ProjectMember.objects.create(project=project, employee=lead, role='developer')
+        rd = Department.objects.get(name='研发部', tenant=self.employer)
+        backend = Department.objects.get(name='后端组', tenant=self.employer)
+
+        self.assertEqual(self._availability(department=rd.pk), {'avail_backend': 0, 'avail_lead': 1})
+        self.assertEqual(self._availability(department=backend.pk), {'avail_backend': 0})
+        self.assertEqual(self._availability(department=rd.pk, free='1'), {'avail_backend': 0})
+        # 改名后按节点而不是旧的部门名称查
+        rd.name = '研发中心'
+        rd.save()
+        self.assertEqual(set(self._availability(department=rd.pk)), {'avail_lead', 'avail_backend'})
+
+    def test_department_must_be_an_id_in_the_tenant(self):
+        self._employee('avail_lead', '研发部')
+        other = User.objects.create_user(username='avail_other', password='x', role='employer', department='研发部')
+        response = self.client.get('/api/projects/availability/', {
+            'start': date.today(), 'end': date.today(), 'department': '研发部',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self._availability(department=other.department_node_id), {})
@@ -0,0 +1,112 @@
+import hashlib
+from datetime import timedelta
+
+from django.core.cache import cache
+
+from .models import ProjectMember
+
+GRANULARITIES = ('day', 'week', 'month')
+# 每种粒度允许查询的最长时间跨度，限制桶的数量
+MAX_SPANS = {
+    'day': timedelta(days=366),
+    'week': timedelta(days=366 * 3),
+    'month': timedelta(days=366 * 10),
+}
+MAX_EMPLOYEES = 200
+
+# 版本号失效依赖各 worker 共用的缓存（settings.CACHES 配置 CACHE_URL）；
+# 默认的进程内缓存下，其他 worker 最多在超时前返回旧数据
+TIMELINE_CACHE_TIMEOUT = 300
+_VERSION_KEY = 'product:timeline:version'
+
+
+def bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_index(day, origin, granularity):
+    if granularity == 'week':
+        return (day - origin).days // 7
+    if granularity == 'month':
+        return (day.year - origin.year) * 12 + day.month - origin.month
+    return (day - origin).days
+
+
+def build_buckets(start, end, granularity):
+    buckets = []
+    day = bucket_start(start, granularity)
+    while day <= end:
+        buckets.append(day)
+        day = _next_bucket(day, granularity)
+    return buckets
+
+
+def build_timeline(projects, employee_ids, start, end, granularity, group_by='employee'):
+    """
+    返回 {'buckets': [...], 'series': {key: [count, ...]}}，
+    count 为该时间桶内处于进行中的项目分配数。
+    """
+    buckets = build_buckets(start, end, granularity)
+    origin = buckets[0]
+    # 一次查询取出窗口内所有分配：成员加入日期与项目起止日期的交集
+    rows = ProjectMember.objects.filter(
+        employee_id__in=employee_ids,
+        project__in=projects,
+        project__StartDate__lte=end,
+        project__EndDate__gte=start,
+    ).values_list('employee_id', 'project_id', 'join_date', 'project__StartDate', 'project__EndDate')
+
+    # 差分数组：每条分配 O(1)，最后一次前缀和得到每个桶的值
+    diffs = {}
+    for employee_id, project_id, join_date, project_start, project_end in rows:
+        alloc_start = max(project_start, join_date, start)
+        alloc_end = min(project_end, end)
+        if alloc_start > alloc_end:
+            continue
+        key = employee_id if group_by == 'employee' else project_id
+        diff = diffs.setdefault(key, [0] * (len(buckets) + 1))
+        diff[bucket_index(alloc_start, origin, granularity)] += 1
+        diff[bucket_index(alloc_end, origin, granularity) + 1] -= 1
+
+    keys = employee_ids if group_by == 'employee' else sorted(diffs)
+    series = {}
+    for key in keys:
+        diff = diffs.get(key)
+        values = []
+        running = 0
+        for delta in (diff or [0] * len(buckets))[:len(buckets)]:
+            running += delta
+            values.append(running)
+        series[str(key)] = values
+
+    return {
+        'granularity': granularity,
+        'buckets': [day.isoformat() for day in buckets],
+        'series': series,
+    }
+
+
+def timeline_cache_key(scope, employee_ids, start, end, granularity, group_by):
+    version = cache.get_or_set(_VERSION_KEY, 1, None)
+    raw = f"{scope}|{','.join(map(str, employee_ids))}|{start}|{end}|{granularity}|{group_by}"
+    return f"product:timeline:{version}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def invalidate_timelines():
+    # 版本号递增，旧缓存自然过期
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, 1, None)
@@ -4,44 +4,70 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Project, ProjectMember
 from .serializers import ProjectSerializer, ProjectMemberSerializer
+from .timeline import GRANULARITIES, MAX_EMPLOYEES, MAX_SPANS, TIMELINE_CACHE_TIMEOUT, build_timeline, timeline_cache_key
+from accounts.models import User
+from idempotency.decorators import IdempotentCreateMixin, idempotent
 import logging
-from django.db import models
-from rest_framework.exceptions import PermissionDenied
+from django.core.cache import cache
+from django.db import models, router
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import PermissionDenied, ValidationError
 
 logger = logging.getLogger(__name__)
 
 # Create your views here.
 
+def parse_date_range(request):
+    """从查询参数 start/end 解析日期区间（YYYY-MM-DD，闭区间）"""
+    try:
+        start = parse_date(request.query_params.get('start', ''))
+        end = parse_date(request.query_params.get('end', ''))
+    except ValueError:
+        start = end = None
+    if not start or not end:
+        raise ValidationError({'error': 'start and end must be dates in YYYY-MM-DD format'})
+    if start > end:
+        raise ValidationError({'error': '结束日期必须晚于开始日期'})
+    return start, end
+
+def parse_id_list(value):
+    try:
+        return sorted({int(item) for item in value.split(',') if item.strip()})
+    except ValueError:
+        raise ValidationError({'error': 'ids must be a comma separated list of integers'})
+
+def parse_department(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({'error': 'department must be an integer id'})
+
 class IsEmployerOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
         # Allow all users to perform read operations
         if request.method in permissions.SAFE_METHODS:
             return True
         # Only allow employers to perform write operations
-        return request.user.role == 'employer'
+        return request.access.is_employer
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated, IsEmployerOrReadOnly]
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'employer':
-            # Employers can see all projects they created
-            return Project.objects.filter(employer=user)
-        elif user.role == 'employee':
-            # Employees can see projects they participate in or manage
-            return Project.objects.filter(
-                models.Q(members=user) |
-                models.Q(manager=user)
-            ).distinct()
-        return Project.objects.none()
+        # 可见项目 id 在 request.access 上按请求缓存
+        queryset = self.request.access.projects().with_related()
+        department = self.request.query_params.get('department')
+        if department and self.action == 'list':
+            queryset = queryset.for_department(parse_department(department))
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(employer=self.request.user)
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def add_member(self, request, pk=None):
         project = self.get_object()
         employee_id = request.data.get('employee')
@@ -57,6 +83,69 @@ class ProjectViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=400)
 
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        # 统计每个员工在 [start, end] 内重叠的项目数，单条聚合查询完成
+        start, end = parse_date_range(request)
+        overlapping = models.Q(
+            member_projects__StartDate__lte=end,
+            member_projects__EndDate__gte=start,
+        )
+        # 与项目连接查询：项目在租户库时用该库里的用户副本
+        employees = User.scoped.using(router.db_for_read(Project)).filter(role='employee', is_active=True)
+
+        department = request.query_params.get('department')
+        if department:
+            # 部门及其所有下级部门的员工；部门树只在默认库，租户库的用户副本没有部门节点，先取出 id
+            members = User.scoped.in_department(parse_department(department)).values('pk')
+            if members.db != employees.db:
+                members = list(members.values_list('pk', flat=True))
+            employees = employees.filter(pk__in=members)
+
+        employees = employees.annotate(
+            project_count=models.Count('member_projects', filter=overlapping)
+        )
+        if request.query_params.get('free') in ('1', 'true'):
+            employees = employees.filter(project_count=0)
+
+        data = employees.order_by('project_count', 'id').values(
+            'id', 'username', 'name', 'department', 'project_count'
+        )
+        return Response(list(data))
+
+    @action(detail=False, methods=['get'])
+    def timeline(self, request):
+        start, end = parse_date_range(request)
+        employee_ids = parse_id_list(request.query_params.get('employees', ''))
+        if not employee_ids:
+            raise ValidationError({'error': 'employees is required'})
+        if len(employee_ids) > MAX_EMPLOYEES:
+            raise ValidationError({'error': f'at most {MAX_EMPLOYEES} employees per timeline'})
+        granularity = request.query_params.get('granularity', 'week')
+        if granularity not in GRANULARITIES:
+            raise ValidationError({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"})
+        if end - start > MAX_SPANS[granularity]:
+            raise ValidationError({'error': f'{granularity} timeline spans at most {MAX_SPANS[granularity].days} days'})
+        group_by = request.query_params.get('group_by', 'employee')
+        if group_by not in ('employee', 'project'):
+            raise ValidationError({'error': 'group_by must be employee or project'})
+
+        projects = self.get_queryset()
+        project_ids = parse_id_list(request.query_params.get('projects', ''))
+        if project_ids:
+            projects = projects.filter(pk__in=project_ids)
+
+        # 可见项目范围因人而异，缓存键里带上调用者
+        scope = f"{request.user.pk}:{','.join(map(str, project_ids))}"
+        key = timeline_cache_key(scope, employee_ids, start, end, granularity, group_by)
+        data = cache.get(key)
+        if data is None:
+            data = build_timeline(
+                projects.values('pk'), employee_ids, start, end, granularity, group_by
+            )
+            cache.set(key, data, TIMELINE_CACHE_TIMEOUT)
+        return Response(data)
+
     def perform_update(self, serializer):
-        logger.info(f"Updating project with data: {self.request.data}")
+        logger.info("Updating project with data: %s", self.request.data)
         serializer.save()
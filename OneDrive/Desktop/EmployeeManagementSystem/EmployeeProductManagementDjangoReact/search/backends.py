@@ -0,0 +1,194 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models
+
+from accounts.models import User
+from notification.models import Notification
+from product.models import Project
+
+# SQLite 下 FTS5 虚表名；rowid = object_id * KIND_SLOTS + kind code，
+# 这样按对象增量更新时可以直接按 rowid 定位
+FTS_TABLE = 'search_index'
+KIND_SLOTS = 4
+KIND_CODES = {'project': 1, 'notification': 2, 'user': 3}
+
+SEARCH_CONFIG = 'simple'
+
+# 各类型参与检索的字段，Postgres 的 GIN 表达式索引也按这里的定义创建
+SEARCH_FIELDS = {
+    'project': ('ProjectName',),
+    'notification': ('Message',),
+    'user': ('username', 'name', 'department', 'position'),
+}
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+# unicode61 分词器不切分中文，写入和查询时都按单字切开，查询用短语匹配相邻字
+_CJK_RE = re.compile(r'([\u3400-\u9fff])')
+
+
+def segment_cjk(text):
+    return _CJK_RE.sub(r' \1 ', text)
+
+
+def search_vector(kind):
+    return SearchVector(*SEARCH_FIELDS[kind], config=SEARCH_CONFIG)
+
+
+def tokenize(q):
+    return _TOKEN_RE.findall(q.lower())[:8]
+
+
+def kind_of(instance):
+    if isinstance(instance, Project):
+        return 'project'
+    if isinstance(instance, Notification):
+        return 'notification'
+    if isinstance(instance, User):
+        return 'user'
+    return None
+
+
+def visible_querysets(user):
+    return {
+        'project': Project.scoped.visible_to(user),
+        'notification': Notification.scoped.visible_to(user),
+        'user': User.scoped.filter(is_active=True),
+    }
+
+
+def uses_fts5(conn=connection):
+    return conn.vendor == 'sqlite'
+
+
+def document_body(instance, kind):
+    return segment_cjk(' '.join(str(getattr(instance, field) or '') for field in SEARCH_FIELDS[kind]))
+
+
+def _connection_for(instance):
+    # 索引与对象在同一个库（副本路由、独立数据库的租户）
+    return connections[instance._state.db or DEFAULT_DB_ALIAS]
+
+
+def index_object(instance):
+    kind = kind_of(instance)
+    conn = _connection_for(instance)
+    if kind is None or not uses_fts5(conn):
+        # Postgres 的表达式索引由数据库自动维护
+        return
+    rowid = instance.pk * KIND_SLOTS + KIND_CODES[kind]
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [rowid])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, body, kind, object_id) VALUES (%s, %s, %s, %s)",
+            [rowid, document_body(instance, kind), kind, instance.pk],
+        )
+
+
+def remove_object(instance):
+    kind = kind_of(instance)
+    conn = _connection_for(instance)
+    if kind is None or not uses_fts5(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+            [instance.pk * KIND_SLOTS + KIND_CODES[kind]],
+        )
+
+
+def remove_objects(model, ids, using=DEFAULT_DB_ALIAS):
+    """批量删除（不触发 post_delete）后同步清理索引"""
+    kind = kind_of(model())
+    conn = connections[using]
+    if kind is None or not uses_fts5(conn) or not ids:
+        return
+    with conn.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+            [[pk * KIND_SLOTS + KIND_CODES[kind]] for pk in ids],
+        )
+
+
+def search(user, q, kinds, offset, limit):
+    """
+    返回 (total, [(kind, object_id, rank), ...])，按相关度排序。
+    可见性过滤在同一条查询里完成。
+    """
+    tokens = tokenize(q)
+    if not tokens or not kinds:
+        return 0, []
+    # 索引与可见性子查询读同一个库
+    groups = {}
+    for kind, qs in visible_querysets(user).items():
+        if kind in kinds:
+            groups.setdefault(qs.db, {})[kind] = qs
+    if len(groups) == 1:
+        (db, querysets), = groups.items()
+        return _search_in(connections[db], tokens, querysets, offset, limit)
+    # 独立数据库的租户：用户在默认库，项目和通知在租户库，各库分别取前 offset + limit 条再按相关度合并
+    total, rows = 0, []
+    for db, querysets in groups.items():
+        count, found = _search_in(connections[db], tokens, querysets, 0, offset + limit)
+        total += count
+        rows.extend(found)
+    rows.sort(key=lambda row: (-row[2], row[0], row[1]))
+    return total, rows[offset:offset + limit]
+
+
+def _search_in(conn, tokens, querysets, offset, limit):
+    if uses_fts5(conn):
+        return _search_fts5(conn, tokens, querysets, offset, limit)
+    return _search_postgres(tokens, querysets, offset, limit)
+
+
+def _search_postgres(tokens, querysets, offset, limit):
+    query = SearchQuery(' & '.join(f"{token}:*" for token in tokens),
+                        config=SEARCH_CONFIG, search_type='raw')
+    ranked = []
+    for kind, qs in querysets.items():
+        vector = search_vector(kind)
+        ranked.append(
+            qs.order_by()
+            .annotate(document=vector)
+            .filter(document=query)
+            .annotate(
+                kind=models.Value(kind, output_field=models.CharField()),
+                object_id=models.F('pk'),
+                rank=SearchRank(vector, query),
+            )
+            .values_list('kind', 'object_id', 'rank')
+        )
+    combined = ranked[0].union(*ranked[1:], all=True)
+    total = combined.count()
+    rows = list(combined.order_by('-rank', 'kind', 'object_id')[offset:offset + limit])
+    return total, rows
+
+
+def _search_fts5(conn, tokens, querysets, offset, limit):
+    terms = []
+    for token in tokens:
+        segmented = segment_cjk(token).split()
+        if len(segmented) > 1:
+            terms.append('"%s"' % ' '.join(segmented))
+        else:
+            terms.append('"%s"*' % token)
+    match = ' '.join(terms)
+    clauses, params = [], []
+    for kind, qs in querysets.items():
+        sql, sql_params = qs.order_by().values('pk').query.sql_with_params()
+        clauses.append(f"(kind = %s AND object_id IN ({sql}))")
+        params.extend([kind, *sql_params])
+    where = f"{FTS_TABLE} MATCH %s AND ({' OR '.join(clauses)})"
+    params = [match, *params]
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {where}", params)
+        total = cursor.fetchone()[0]
+        # bm25 越小越相关，取反后与 Postgres 的 rank 方向一致
+        cursor.execute(
+            f"SELECT kind, object_id, -bm25({FTS_TABLE}) AS rank FROM {FTS_TABLE} "
+            f"WHERE {where} ORDER BY rank DESC, rowid LIMIT %s OFFSET %s",
+            [*params, limit, offset],
+        )
+        rows = cursor.fetchall()
+    return total, rows
@@ -0,0 +1,73 @@
+import re
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+FTS_TABLE = "search_index"
+KIND_SLOTS = 4
+
+# (app_label, model, kind, kind code, index name, fields)
+SEARCH_TARGETS = [
+    ("product", "Project", "project", 1, "project_search_gin", ("ProjectName",)),
+    ("notification", "Notification", "notification", 2, "notification_search_gin", ("Message",)),
+    ("accounts", "User", "user", 3, "user_search_gin", ("username", "name", "department", "position")),
+]
+
+CJK_RE = re.compile(r"([\u3400-\u9fff])")
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for app_label, model_name, _, _, index_name, fields in SEARCH_TARGETS:
+            model = apps.get_model(app_label, model_name)
+            schema_editor.add_index(
+                model,
+                GinIndex(SearchVector(*fields, config="simple"), name=index_name),
+            )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "body, kind UNINDEXED, object_id UNINDEXED, tokenize='unicode61')"
+        )
+        for app_label, model_name, kind, code, _, fields in SEARCH_TARGETS:
+            model = apps.get_model(app_label, model_name)
+            for row in model.objects.values_list("pk", *fields).iterator():
+                schema_editor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, body, kind, object_id) "
+                    "VALUES (%s, %s, %s, %s)",
+                    [
+                        row[0] * KIND_SLOTS + code,
+                        CJK_RE.sub(r" \1 ", " ".join(value or "" for value in row[1:])),
+                        kind,
+                        row[0],
+                    ],
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for app_label, model_name, _, _, index_name, fields in SEARCH_TARGETS:
+            model = apps.get_model(app_label, model_name)
+            schema_editor.remove_index(
+                model,
+                GinIndex(SearchVector(*fields, config="simple"), name=index_name),
+            )
+    elif vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ("accounts", "0004_user_user_role_department_idx"),
+        ("notification", "0001_initial"),
+        ("product", "0002_project_project_date_range_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
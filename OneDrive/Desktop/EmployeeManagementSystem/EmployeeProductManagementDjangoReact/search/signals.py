@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from notification.models import Notification
+from product.models import Project
+
+from .backends import index_object, remove_object
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Notification)
+@receiver(post_save, sender=User)
+def update_search_index(sender, instance, **kwargs):
+    index_object(instance)
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Notification)
+@receiver(post_delete, sender=User)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_object(instance)
@@ -0,0 +1,84 @@
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from notification.models import Notification, NotificationRecipient
+from product.models import Project, ProjectMember
+from .backends import uses_fts5
+
+# Create your tests here.
+
+class SearchVisibilityTests(TestCase):
+    """两个租户的数据都含同一个词，搜索结果只包含当前用户可见的对象"""
+
+    def setUp(self):
+        self.tenants = {}
+        for name in ('a', 'b'):
+            employer = User.objects.create_user(username=f'apollo_boss_{name}', password='x', role='employer')
+            member = User.objects.create_user(
+                username=f'apollo_member_{name}', password='x', role='employee', tenant=employer,
+            )
+            outsider = User.objects.create_user(
+                username=f'apollo_outsider_{name}', password='x', role='employee', tenant=employer,
+            )
+            joined = self._project(f'Apollo 登月 {name}', employer)
+            ProjectMember.objects.create(project=joined, employee=member, role='developer')
+            other = self._project(f'Apollo other {name}', employer)
+            received = self._notification(f'Apollo 登月 kickoff {name}', employer, member)
+            unreceived = self._notification(f'Apollo other notice {name}', employer, outsider)
+            self.tenants[name] = {
+                'employer': employer, 'member': member, 'outsider': outsider,
+                'joined': joined, 'other': other, 'received': received, 'unreceived': unreceived,
+            }
+
+    def _project(self, name, employer):
+        return Project.objects.create(
+            ProjectName=name, StartDate=date.today(), EndDate=date.today() + timedelta(days=30),
+            Status='active', employer=employer,
+        )
+
+    def _notification(self, message, sender, recipient):
+        notification = Notification.objects.create(Message=message, NotificationType='info', Sender=sender)
+        NotificationRecipient.objects.create(notification=notification, recipient=recipient)
+        return notification
+
+    def _search(self, user, q):
+        client = APIClient()
+        # token 认证才会绑定租户
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+        response = client.get('/api/search/', {'q': q})
+        self.assertEqual(response.status_code, 200, response.content)
+        return {(row['type'], row['id']) for row in response.json()['results']}
+
+    def test_backend_is_fts5(self):
+        self.assertTrue(uses_fts5(connection))
+
+    def test_employee_sees_own_tenant_and_visible_objects_only(self):
+        a = self.tenants['a']
+        self.assertEqual(self._search(a['member'], 'apollo'), {
+            ('project', a['joined'].pk),
+            ('notification', a['received'].pk),
+            ('user', a['employer'].pk), ('user', a['member'].pk), ('user', a['outsider'].pk),
+        })
+
+    def test_employer_sees_own_tenant_only(self):
+        b = self.tenants['b']
+        self.assertEqual(self._search(b['employer'], 'apollo'), {
+            ('project', b['joined'].pk), ('project', b['other'].pk),
+            ('notification', b['received'].pk), ('notification', b['unreceived'].pk),
+            ('user', b['employer'].pk), ('user', b['member'].pk), ('user', b['outsider'].pk),
+        })
+
+    def test_cjk_phrase_respects_tenant_and_visibility(self):
+        a, b = self.tenants['a'], self.tenants['b']
+        self.assertEqual(
+            self._search(a['member'], '登月'), {('project', a['joined'].pk), ('notification', a['received'].pk)},
+        )
+        self.assertEqual(self._search(a['outsider'], '登月'), set())
+        self.assertEqual(
+            self._search(b['employer'], '登月'), {('project', b['joined'].pk), ('notification', b['received'].pk)},
+        )
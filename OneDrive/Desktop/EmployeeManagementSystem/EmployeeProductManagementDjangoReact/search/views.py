@@ -0,0 +1,66 @@
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from accounts.models import User
+from notification.models import Notification
+from product.models import Project
+
+from .backends import SEARCH_FIELDS, search
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _positive_int(value, default):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+class SearchViewSet(viewsets.ViewSet):
+    def list(self, request):
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            raise ValidationError({'error': 'q is required'})
+        kinds = request.query_params.get('type')
+        kinds = set(kinds.split(',')) & set(SEARCH_FIELDS) if kinds else set(SEARCH_FIELDS)
+        page = _positive_int(request.query_params.get('page'), 1)
+        page_size = min(_positive_int(request.query_params.get('page_size'), DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+
+        total, rows = search(request.user, q, kinds, (page - 1) * page_size, page_size)
+        return Response({
+            'count': total,
+            'page': page,
+            'page_size': page_size,
+            'results': self._hydrate(rows),
+        })
+
+    def _hydrate(self, rows):
+        # 每种类型一次 in_bulk 取回展示字段
+        ids = {}
+        for kind, object_id, _ in rows:
+            ids.setdefault(kind, []).append(object_id)
+        objects = {
+            'project': Project.objects.in_bulk(ids.get('project', [])),
+            'notification': Notification.objects.in_bulk(ids.get('notification', [])),
+            'user': User.objects.in_bulk(ids.get('user', [])),
+        }
+
+        results = []
+        for kind, object_id, rank in rows:
+            obj = objects[kind].get(object_id)
+            if obj is None:
+                continue
+            if kind == 'project':
+                item = {'title': obj.ProjectName, 'status': obj.Status}
+            elif kind == 'notification':
+                item = {'title': obj.Message[:100], 'notification_type': obj.NotificationType,
+                        'date_sent': obj.DateSent}
+            else:
+                item = {'title': obj.name or obj.username, 'department': obj.department,
+                        'position': obj.position}
+            results.append({'type': kind, 'id': object_id, 'rank': rank, **item})
+        return results
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sync", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tombstone",
+            name="parent_id",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="tombstone",
+            name="tenant_id",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="tombstone",
+            name="user_id",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=models.Index(
+                fields=["tenant_id", "deleted_at"], name="tombstone_tenant_idx"
+            ),
+        ),
+    ]
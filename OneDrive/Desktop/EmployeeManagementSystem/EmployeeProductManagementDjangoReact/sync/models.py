@@ -0,0 +1,22 @@
+from django.db import models
+
+# Create your models here.
+
+class Tombstone(models.Model):
+    """被删除对象的记录，增量同步时告诉客户端删掉本地缓存"""
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    # 同步时按租户和可见性过滤，见 sync/signals.py 的 TOMBSTONE_FIELDS
+    tenant_id = models.BigIntegerField(null=True)
+    user_id = models.BigIntegerField(null=True)
+    parent_id = models.BigIntegerField(null=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.model}#{self.object_id}"
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['tenant_id', 'deleted_at'], name='tombstone_tenant_idx'),
+        ]
@@ -0,0 +1,71 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from accounts.models import User
+from EmployeeProductManagementDjangoReact.tenancy import get_current_tenant
+from notification.models import Notification, NotificationRecipient
+from product.models import Project, ProjectMember
+
+from .models import Tombstone
+
+# 模型 -> 同步接口中的名字
+SYNCED_MODELS = {
+    User: 'user',
+    Project: 'project',
+    ProjectMember: 'project_member',
+    Notification: 'notification',
+    NotificationRecipient: 'notification_recipient',
+}
+
+# 模型 -> 墓碑的 (租户, 相关用户, 上级对象) 取值字段，用于决定谁能在同步中看到这条删除：
+# 项目的经理、成员关系的员工、通知的发送者、接收记录的接收者；成员关系属于项目，接收记录属于通知
+TOMBSTONE_FIELDS = {
+    User: ('tenant_id', None, None),
+    Project: ('employer_id', 'manager_id', None),
+    ProjectMember: ('project__employer_id', 'employee_id', 'project_id'),
+    Notification: ('tenant_id', 'Sender_id', None),
+    NotificationRecipient: ('notification__tenant_id', 'recipient_id', 'notification_id'),
+}
+
+
+def _value(instance, path):
+    for name in path.split('__'):
+        instance = getattr(instance, name)
+    return instance
+
+
+def record_deletions(model, ids):
+    """批量写入墓碑，供绕过 post_delete 信号的批量删除使用；须在删除之前调用"""
+    tenant_field, user_field, parent_field = TOMBSTONE_FIELDS[model]
+    rows = model._base_manager.filter(pk__in=ids).values('pk', *filter(None, TOMBSTONE_FIELDS[model]))
+    Tombstone.objects.bulk_create(
+        [
+            Tombstone(
+                model=SYNCED_MODELS[model],
+                object_id=row['pk'],
+                tenant_id=row[tenant_field],
+                user_id=row.get(user_field),
+                parent_id=row.get(parent_field),
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=ProjectMember)
+@receiver(post_delete, sender=Notification)
+@receiver(post_delete, sender=NotificationRecipient)
+def object_deleted(sender, instance, **kwargs):
+    tenant_field, user_field, parent_field = TOMBSTONE_FIELDS[sender]
+    # 租户要跨关联读取时优先用当前租户，级联删除时不必逐条查询上级对象
+    tenant_id = get_current_tenant() if '__' in tenant_field else None
+    Tombstone.objects.create(
+        model=SYNCED_MODELS[sender],
+        object_id=instance.pk,
+        tenant_id=tenant_id or _value(instance, tenant_field),
+        user_id=getattr(instance, user_field) if user_field else None,
+        parent_id=getattr(instance, parent_field) if parent_field else None,
+    )
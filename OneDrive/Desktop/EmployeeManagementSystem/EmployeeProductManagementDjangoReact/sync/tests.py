@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from product.models import Project, ProjectMember
+
+# Create your tests here.
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.employer = User.objects.create_user(username='sync_boss', password='x', role='employer')
+        self.employee = User.objects.create_user(username='sync_emp', password='x', role='employee', tenant=self.employer)
+        self.other_employer = User.objects.create_user(username='sync_other', password='x', role='employer')
+        self.joined = self._project(self.employer, 'joined')
+        self.hidden = self._project(self.employer, 'hidden')
+        self.foreign = self._project(self.other_employer, 'foreign')
+        # 项目早于游标修改过，增量里本来不会出现
+        Project.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def _project(self, employer, name):
+        return Project.objects.create(
+            ProjectName=name, StartDate=date.today(), EndDate=date.today() + timedelta(days=30),
+            Status='active', employer=employer,
+        )
+
+    def _client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+        return client
+
+    def _cursor(self, client):
+        # 回退到重叠窗口之前，测试里的写入都晚于游标
+        cursor = int(client.get('/api/sync/').json()['cursor'])
+        return str(cursor - 3_000_000)
+
+    def test_new_membership_includes_its_project(self):
+        client = self._client(self.employee)
+        cursor = self._cursor(client)
+        ProjectMember.objects.create(project=self.joined, employee=self.employee, role='developer')
+        data = client.get('/api/sync/', {'since': cursor}).json()
+        self.assertEqual([p['ProjectID'] for p in data['projects']], [self.joined.pk])
+        self.assertEqual([m['project'] for m in data['project_members']], [self.joined.pk])
+
+    def test_tombstones_are_scoped_to_tenant_and_visibility(self):
+        ProjectMember.objects.create(project=self.joined, employee=self.employee, role='developer')
+        client = self._client(self.employee)
+        cursor = self._cursor(client)
+        joined, hidden = self.joined.pk, self.hidden.pk
+        for project in (self.joined, self.hidden, self.foreign):
+            project.delete()
+        deleted = client.get('/api/sync/', {'since': cursor}).json()['deleted']
+        self.assertEqual(deleted['project'], [joined])
+
+        deleted = self._client(self.employer).get('/api/sync/', {'since': cursor}).json()['deleted']
+        self.assertEqual(deleted['project'], sorted([joined, hidden]))
+
+    def test_removed_member_gets_project_deletion(self):
+        membership = ProjectMember.objects.create(project=self.joined, employee=self.employee, role='developer')
+        client = self._client(self.employee)
+        cursor = self._cursor(client)
+        membership_id = membership.pk
+        membership.delete()
+        deleted = client.get('/api/sync/', {'since': cursor}).json()['deleted']
+        self.assertEqual(deleted['project_member'], [membership_id])
+        self.assertEqual(deleted['project'], [self.joined.pk])
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from accounts.models import User
+from accounts.serializers import UserSerializer
+from EmployeeProductManagementDjangoReact.tenancy import get_current_tenant
+from notification.models import Notification, NotificationRecipient
+from notification.serializers import NotificationSerializer
+from product.models import ProjectMember
+from product.serializers import ProjectSerializer
+
+from .models import Tombstone
+from .signals import SYNCED_MODELS
+
+# 游标前后留出的重叠时间，避免并发事务提交晚于游标而漏掉变更；客户端按 id 覆盖即可
+CURSOR_OVERLAP = timedelta(seconds=2)
+
+
+def encode_cursor(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_cursor(value):
+    try:
+        return datetime.fromtimestamp(int(value) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValidationError({'error': 'invalid cursor'})
+
+
+def visible_deletions(user, access, tombstones):
+    """
+    调用者能看到的删除：同租户内，用户全部可见；项目和成员关系按项目可见性，
+    通知按发送者和接收记录，接收记录只给接收者自己。
+    被移出项目时，项目本身也作为删除返回。
+    """
+    visible_projects = access.visible_project_ids
+    own_receipts = {t.parent_id for t in tombstones if t.model == 'notification_recipient' and t.user_id == user.pk}
+    own_memberships = {t.parent_id for t in tombstones if t.model == 'project_member' and t.user_id == user.pk}
+    deleted_projects = {
+        t.object_id for t in tombstones
+        if t.model == 'project' and (access.is_employer or t.user_id == user.pk or t.object_id in own_memberships)
+    }
+    # 员工的成员关系被删除且项目已不可见（被移出项目）
+    deleted_projects |= {pk for pk in own_memberships if pk not in visible_projects}
+
+    deleted = {name: set() for name in SYNCED_MODELS.values()}
+    deleted['project'] = deleted_projects
+    for t in tombstones:
+        if t.model == 'user':
+            visible = True
+        elif t.model == 'project_member':
+            visible = (access.is_employer or t.user_id == user.pk
+                       or t.parent_id in visible_projects or t.parent_id in deleted_projects)
+        elif t.model == 'notification':
+            visible = t.user_id == user.pk or t.object_id in own_receipts
+        elif t.model == 'notification_recipient':
+            visible = t.user_id == user.pk
+        else:
+            continue
+        if visible:
+            deleted[t.model].add(t.object_id)
+    return deleted
+
+
+class SyncViewSet(viewsets.ViewSet):
+    def list(self, request):
+        now = timezone.now()
+        since = request.query_params.get('since')
+        retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+        # 没有游标，或游标早于墓碑保留期：返回全量
+        full = not since or decode_cursor(since) < now - retention
+        changed = {} if full else {'updated_at__gt': decode_cursor(since) - CURSOR_OVERLAP}
+
+        user = request.user
+        access = request.access
+
+        users = User.scoped.filter(**changed).prefetch_related(*UserSerializer.prefetches())
+        projects = access.projects().with_related()
+        members = ProjectMember.objects.filter(project__in=access.projects().values('pk'))
+        if not full:
+            # 新加入项目时项目本身的 updated_at 不变，按变化的成员关系把项目和它的全部成员一起返回
+            changed_members = members.filter(**changed)
+            projects = projects.filter(Q(**changed) | Q(pk__in=changed_members.values('project_id')))
+            members = members.filter(Q(**changed) | Q(project__in=projects.values('pk')))
+        notifications = Notification.scoped.visible_to(user).select_related('Sender').filter(**changed)
+        receipts = NotificationRecipient.objects.filter(recipient=user, **changed)
+
+        # 停用的账号对客户端等同于删除
+        active_users = [u for u in users if u.is_active]
+        deleted = {name: set() for name in SYNCED_MODELS.values()}
+        if not full:
+            tombstones = Tombstone.objects.filter(
+                tenant_id=get_current_tenant(),
+                deleted_at__gt=decode_cursor(since) - CURSOR_OVERLAP,
+            ).only('model', 'object_id', 'user_id', 'parent_id')
+            deleted = visible_deletions(user, access, list(tombstones))
+        deleted['user'].update(u.pk for u in users if not u.is_active)
+
+        return Response({
+            'cursor': encode_cursor(now),
+            'full': full,
+            'users': UserSerializer(active_users, many=True).data,
+            'projects': ProjectSerializer(projects, many=True).data,
+            'project_members': list(members.values('id', 'project', 'employee', 'role', 'join_date')),
+            'notifications': NotificationSerializer(notifications, many=True).data,
+            'notification_recipients': list(receipts.values('id', 'notification', 'read', 'read_date')),
+            'deleted': {name: sorted(ids) for name, ids in deleted.items()},
+        })